@@ -32,6 +32,13 @@ class Config:
     LLM_TEMPERATURE = MODEL_CONFIG["llm"]["temperature"]
     LLM_MAX_TOKENS = MODEL_CONFIG["llm"]["max_tokens"]
     LLM_TOP_P = MODEL_CONFIG["llm"]["top_p"]
+    LLM_KEEP_ALIVE = MODEL_CONFIG["llm"].get("keep_alive", "30m")
+    LLM_WARMUP_ON_START = MODEL_CONFIG["llm"].get("warmup_on_start", True)
+    LLM_PING_INTERVAL = MODEL_CONFIG["llm"].get("ping_interval_seconds", 240)
+    LLM_BUSINESS_HOURS = MODEL_CONFIG["llm"].get("business_hours", "07:00-23:00")
+    LLM_PREFIX_MODE = MODEL_CONFIG["llm"].get("prefix_mode", "chat")
+    LLM_ANSWER_MAX_TOKENS = MODEL_CONFIG["llm"].get("answer_max_tokens", 300)
+    LLM_TIMEOUT = MODEL_CONFIG["llm"].get("timeout_seconds", 30)
 
     # Chunking
     CHUNK_SIZE = MODEL_CONFIG["chunking"]["chunk_size"]
@@ -39,6 +46,38 @@ class Config:
     CHUNK_SEPARATORS = MODEL_CONFIG["chunking"]["separators"]
     MIN_CHUNK_SIZE = MODEL_CONFIG["chunking"]["min_chunk_size"]
 
+    # Retrieval: variant collapsing
+    VARIANT_OVERFETCH = MODEL_CONFIG.get("retrieval", {}).get("variant_overfetch", 3)
+    VARIANT_MAX_FETCH = MODEL_CONFIG.get("retrieval", {}).get("max_fetch", 60)
+
+    # Cross-encoder re-ranking
+    RERANK = MODEL_CONFIG.get("rerank") or {}
+
+    # Context packing
+    CONTEXT_TOKEN_BUDGET = MODEL_CONFIG.get("context", {}).get("token_budget", 600)
+    CONTEXT_TOKENIZER = MODEL_CONFIG.get("context", {}).get("tokenizer")
+
+    # Intent routing and store info for canned answers
+    INTENT_ROUTER = MODEL_CONFIG.get("intent_router") or {}
+    STORE_INFO = MODEL_CONFIG.get("store") or {}
+
+    # Conversation memory
+    CONVERSATION = MODEL_CONFIG.get("conversation") or {}
+
+    CONTEXTUALIZE = MODEL_CONFIG.get("contextualize") or {}
+
+    # Load shedding (extractive answers while the LLM is saturated)
+    LOAD_SHEDDING = MODEL_CONFIG.get("load_shedding") or {}
+
+    # Precomputed answers (quick replies + FAQ)
+    PRECOMPUTED_ANSWERS_PATH = PROCESSED_DATA_DIR / "precomputed_answers.json"
+    PRECOMPUTED_MAX_AGE_HOURS = MODEL_CONFIG.get("precomputed_answers", {}).get("max_age_hours", 24)
+    FAQ_QUESTIONS = MODEL_CONFIG.get("precomputed_answers", {}).get("faq") or []
+
+    # Pre-fork serving
+    SERVING = MODEL_CONFIG.get("serving") or {}
+    SERVING_WORKERS = int(os.getenv("VCUTE_WORKERS", SERVING.get("workers", 0)))
+
     # Vector store
     COLLECTION_NAME = MODEL_CONFIG["vectorstore"]["collection_name"]
     VECTORSTORE_DISTANCE = MODEL_CONFIG["vectorstore"]["distance_metric"]
@@ -49,8 +88,14 @@ class Config:
     # Vector store
     TOP_K_RESULTS = 5
     
+    # Logging
+    LOG_LEVEL = os.getenv("VCUTE_LOG_LEVEL", MODEL_CONFIG.get("logging", {}).get("level", "INFO"))
+    LOG_JSON = MODEL_CONFIG.get("logging", {}).get("json", True)
+    LOG_PAYLOAD_SAMPLE_RATE = MODEL_CONFIG.get("logging", {}).get("payload_sample_rate", 0.05)
+
     # Ollama
     OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+    OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", MODEL_CONFIG["llm"].get("num_parallel", 1)))
     OLLAMA_EXECUTABLE = r"C:\Users\DELL\AppData\Local\Programs\Ollama\ollama.exe"
     
     # Test method
@@ -4,13 +4,14 @@ import json
 import time
 import os
 import re
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse, urlunparse
 import csv
 from datetime import datetime
 import logging
 from dataclasses import dataclass
 from typing import List, Dict
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 # # Setup logging
 # logging.basicConfig(
@@ -83,6 +84,12 @@ class HungPhatCrawler:
         # Store crawled URLs to avoid duplicates
         self.crawled_urls = set()
         self.products = []
+
+        # Product links already parsed during pagination discovery, keyed by page URL
+        self.page_links = {}
+
+        # Listing pages that still failed after retries (skipped, not end of catalog)
+        self.failed_urls = set()
     
     def setup_logging(self):
         """Setup logging with dynamic log file path"""
@@ -148,23 +155,152 @@ class HungPhatCrawler:
             logging.error(f"Error fetching {url}: {e}")
             return None
     
-    # THAY ĐỔI: Thay vì tìm category links, generate pagination URLs
-    def discover_pagination_urls(self):
-        """Generate pagination URLs for collections/all pages"""
-        logging.info("Generating pagination URLs...")
-        
+    # THAY ĐỔI: Dò số trang thực tế thay vì hardcode trang 1-10
+    def discover_pagination_urls(self, window=4, max_pages=100, use_sitemap=True):
+        """Discover pagination URLs by probing collections/all pages in parallel windows
+
+        Pages are fetched ``window`` at a time and probing stops at the first
+        page that is missing (404) or yields no new product links, so the
+        request count tracks the real catalog size. A page that keeps failing
+        for another reason (timeout, 5xx) is skipped, not taken as the end;
+        a whole window of failures means the site is down and stops probing.
+        Product links found while probing are cached in ``self.page_links``
+        and reused by ``extract_product_links_from_page``.
+        """
+        logging.info("Discovering pagination URLs...")
+
         pagination_urls = []
-        for page in range(1, 11):  # Pages 1-10
-            url = f"{self.base_url}/collections/all?q=&page={page}&view=grid"
-            pagination_urls.append(url)
-        
+        seen_links = set()
+        page = 1
+        done = False
+
+        with ThreadPoolExecutor(max_workers=window) as executor:
+            while not done and page <= max_pages:
+                batch = [
+                    self.build_pagination_url(n)
+                    for n in range(page, min(page + window, max_pages + 1))
+                ]
+                responses = list(executor.map(self.fetch_listing_page, batch))
+
+                # Evaluate pages in order so the stop point is deterministic
+                for page_url, response in zip(batch, responses):
+                    if response is None:
+                        if page_url not in self.failed_urls:
+                            logging.info(f"{page_url} not found, stopping pagination")
+                            done = True
+                            break
+                        # Keep it: extract_product_links_from_page fetches it again later
+                        pagination_urls.append(page_url)
+                        continue
+
+                    links = self.parse_product_links(response.content, page_url)
+                    new_links = [link for link in links if link['url'] not in seen_links]
+                    if not new_links:
+                        logging.info(f"No new products on {page_url}, stopping pagination")
+                        done = True
+                        break
+
+                    seen_links.update(link['url'] for link in new_links)
+                    self.page_links[page_url] = new_links
+                    pagination_urls.append(page_url)
+
+                if all(url in self.failed_urls for url in batch):
+                    logging.error(f"Pages {page}-{page + len(batch) - 1} all failed, stopping pagination")
+                    done = True
+
+                page += len(batch)
+                if not done:
+                    time.sleep(self.delay)  # Rate limit per window, not per page
+
+        # Sitemap may list products that are hidden from collections/all
+        if use_sitemap:
+            sitemap_links = [
+                link for link in self.discover_sitemap_product_links()
+                if link['url'] not in seen_links
+            ]
+            if sitemap_links:
+                sitemap_url = f"{self.base_url}/sitemap.xml"
+                self.page_links[sitemap_url] = sitemap_links
+                pagination_urls.append(sitemap_url)
+                logging.info(f"Sitemap added {len(sitemap_links)} products not listed in pagination")
+
         # Save pagination URLs for reference - SỬA ĐƯỜNG DẪN
         with open(f'{self.output_dir}/metadata/pagination_urls.json', 'w', encoding='utf-8') as f:
             json.dump(pagination_urls, f, ensure_ascii=False, indent=2)
-        
-        logging.info(f"Generated {len(pagination_urls)} pagination URLs")
+
+        logging.info(f"Discovered {len(pagination_urls)} pagination URLs "
+                     f"({len(seen_links)} product links)")
         return pagination_urls
-    
+
+    def build_pagination_url(self, page):
+        """Build collections/all URL for a given page number"""
+        return f"{self.base_url}/collections/all?q=&page={page}&view=grid"
+
+    def fetch_listing_page(self, url, retries=3):
+        """Fetch a listing page without the per-request sleep (used by parallel probing)
+
+        Returns None for a missing page (404) right away. Timeouts, connection
+        errors and other HTTP errors are retried with backoff; if they persist
+        the URL is added to ``self.failed_urls`` and None is returned.
+        """
+        for attempt in range(retries):
+            try:
+                response = self.session.get(url, timeout=10)
+                if response.status_code == 404:
+                    logging.info(f"Not found: {url}")
+                    return None
+                response.raise_for_status()
+
+                self.crawled_urls.add(url)
+                logging.info(f"Successfully fetched: {url}")
+                return response
+
+            except requests.RequestException as e:
+                logging.warning(f"Error fetching {url} (attempt {attempt + 1}/{retries}): {e}")
+                if attempt + 1 < retries:
+                    time.sleep(self.delay * 2 ** attempt)
+
+        logging.error(f"Giving up on {url} after {retries} attempts")
+        self.failed_urls.add(url)
+        return None
+
+    def discover_sitemap_product_links(self):
+        """Collect product links from sitemap.xml (and nested sitemaps) when available"""
+        sitemap_urls = [f"{self.base_url}/sitemap.xml"]
+        product_links = []
+        seen_urls = set()
+        visited = set()
+
+        while sitemap_urls:
+            sitemap_url = sitemap_urls.pop()
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+
+            response = self.fetch_listing_page(sitemap_url)
+            if response is None:
+                continue
+
+            soup = BeautifulSoup(response.content, 'html.parser')
+            for loc in soup.find_all('loc'):
+                url = loc.get_text(strip=True)
+                if urlparse(url).path.endswith('.xml'):
+                    # Only follow product sitemaps, not pages/blogs/collections
+                    if 'product' in url.lower():
+                        sitemap_urls.append(url)
+                    continue
+                url = self.normalize_product_url(url)
+                if self.is_product_url(url) and url not in seen_urls:
+                    seen_urls.add(url)
+                    product_links.append({
+                        'url': url,
+                        'source_page': sitemap_url,
+                        'title': ''
+                    })
+
+        logging.info(f"Found {len(product_links)} product links in sitemap")
+        return product_links
+
     def classify_category(self, text):
         """Classify product category based on text"""
         text_lower = text.lower()
@@ -185,13 +321,22 @@ class HungPhatCrawler:
     def extract_product_links_from_page(self, page_url):
         """Extract product links from single pagination page"""
         logging.info(f"Extracting product links from: {page_url}")
-        
+
+        # Reuse links already parsed during pagination discovery
+        if page_url in self.page_links:
+            return self.page_links[page_url]
+
         page = self.get_page(page_url)
         if not page:
             return []
-            
-        soup = BeautifulSoup(page.content, 'html.parser')
+
+        return self.parse_product_links(page.content, page_url)
+
+    def parse_product_links(self, content, page_url):
+        """Parse product links from a listing page's HTML"""
+        soup = BeautifulSoup(content, 'html.parser')
         product_links = []
+        seen_urls = set()
         
         # Look for product links - update selectors based on actual HTML structure
         product_selectors = [
@@ -211,10 +356,11 @@ class HungPhatCrawler:
                 href = link.get('href')
                 
                 if href and self.is_product_url(href):
-                    full_url = urljoin(self.base_url, href)
+                    full_url = self.normalize_product_url(href)
                     
                     # Only add if not already collected
-                    if full_url not in [p['url'] for p in product_links]:
+                    if full_url not in seen_urls:
+                        seen_urls.add(full_url)
                         product_links.append({
                             'url': full_url,
                             'source_page': page_url,
@@ -224,6 +370,12 @@ class HungPhatCrawler:
         logging.info(f"Found {len(product_links)} product links from {page_url}")
         return product_links
 
+    def normalize_product_url(self, url):
+        """Absolute product URL without query, fragment or trailing slash (dedupe key)"""
+        parsed = urlparse(urljoin(self.base_url, url))
+        path = parsed.path.rstrip('/') or '/'
+        return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), path, '', '', ''))
+
     def is_product_url(self, url):
         """Check if URL is a product page (not category/other)"""
         # Filter out unwanted URLs
@@ -1,105 +1,236 @@
 import os
-import requests
-from urllib.parse import urlparse
+import json
+import asyncio
+import hashlib
 import time
-from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 import logging
 
+import aiohttp
+
 class ImageDownloader:
-    def __init__(self, base_dir="hungphat_data/images", max_workers=5):
+    """Async image downloader with content-addressed storage
+
+    Files are stored once under ``products/<sha256><ext>``; each product gets a
+    manifest in ``manifests/<product_id>.json`` pointing at those files, so
+    images shared across variants/products are only kept once. ``url_index.json``
+    remembers the ETag/Last-Modified of every URL so re-runs can skip unchanged
+    images with a HEAD request.
+    """
+
+    def __init__(self, base_dir="hungphat_data/images", max_workers=5, per_host_limit=4):
         self.base_dir = base_dir
         self.max_workers = max_workers
-        self.downloaded = set()
-        
+        self.per_host_limit = per_host_limit
+        self.products_dir = f"{base_dir}/products"
+        self.manifests_dir = f"{base_dir}/manifests"
+        self.url_index_file = f"{base_dir}/url_index.json"
+        self.url_index = self.load_url_index()
+        self.stats = {}
+
         # Create directories
-        os.makedirs(f"{base_dir}/products", exist_ok=True)
+        os.makedirs(self.products_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
         os.makedirs(f"{base_dir}/thumbnails", exist_ok=True)
-        
-    def download_single_image(self, url, filename, max_size_mb=10):
-        """Download a single image"""
-        if filename in self.downloaded:
+
+    def load_url_index(self):
+        """Load url -> {sha256, file, etag, last_modified} index from previous runs"""
+        if os.path.exists(self.url_index_file):
+            with open(self.url_index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def save_url_index(self):
+        with open(self.url_index_file, 'w', encoding='utf-8') as f:
+            json.dump(self.url_index, f, ensure_ascii=False, indent=2)
+
+    async def is_unchanged(self, session, url):
+        """Check via HEAD whether a previously downloaded URL is still the same file"""
+        entry = self.url_index.get(url)
+        if not entry or not os.path.exists(entry['file']):
+            return False
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        if not headers:
+            # Nothing to validate against: content-addressed file is good enough
             return True
-            
+
         try:
-            response = requests.get(url, timeout=15, stream=True)
-            response.raise_for_status()
-            
-            # Check content type
-            content_type = response.headers.get('content-type', '')
-            if not content_type.startswith('image/'):
-                logging.warning(f"Not an image: {url}")
-                return False
-            
-            # Check file size
-            if 'content-length' in response.headers:
-                size_mb = int(response.headers['content-length']) / (1024 * 1024)
-                if size_mb > max_size_mb:
-                    logging.warning(f"Image too large ({size_mb:.1f}MB): {url}")
-                    return False
-            
-            # Download and save
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-            with open(filename, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
-            self.downloaded.add(filename)
-            logging.info(f"Downloaded: {filename}")
+            async with session.head(url, headers=headers, allow_redirects=True) as response:
+                if response.status == 304:
+                    return True
+                etag = response.headers.get('ETag')
+                return bool(etag) and etag == entry.get('etag')
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            # Keep the cached copy if the server is unreachable or slow
             return True
-            
+
+    async def download_single_image(self, session, url, max_size_mb=10):
+        """Stream a single image to disk, returning its index entry or None"""
+        ext = self.get_file_extension(url)
+        tmp_file = f"{self.products_dir}/.{hashlib.md5(url.encode('utf-8')).hexdigest()}.part"
+        max_bytes = max_size_mb * 1024 * 1024
+
+        try:
+            if await self.is_unchanged(session, url):
+                self.stats['skipped'] += 1
+                return self.url_index[url]
+
+            async with session.get(url) as response:
+                response.raise_for_status()
+
+                # Check content type
+                content_type = response.headers.get('content-type', '')
+                if not content_type.startswith('image/'):
+                    logging.warning(f"Not an image: {url}")
+                    return None
+
+                # Check file size
+                if response.content_length and response.content_length > max_bytes:
+                    logging.warning(f"Image too large ({response.content_length / (1024 * 1024):.1f}MB): {url}")
+                    return None
+
+                # Stream to a temp file while hashing
+                sha256 = hashlib.sha256()
+                size = 0
+                with open(tmp_file, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        size += len(chunk)
+                        if size > max_bytes:
+                            raise ValueError(f"Image larger than {max_size_mb}MB")
+                        sha256.update(chunk)
+                        f.write(chunk)
+
+                digest = sha256.hexdigest()
+                filename = f"{self.products_dir}/{digest}{ext}"
+                if os.path.exists(filename):
+                    os.remove(tmp_file)
+                    self.stats['duplicate_content'] += 1
+                else:
+                    os.replace(tmp_file, filename)
+                    self.stats['bytes'] += size
+
+                entry = {
+                    'sha256': digest,
+                    'file': filename,
+                    'etag': response.headers.get('ETag', ''),
+                    'last_modified': response.headers.get('Last-Modified', '')
+                }
+                self.url_index[url] = entry
+                self.stats['downloaded'] += 1
+                logging.info(f"Downloaded: {url} -> {filename}")
+                return entry
+
         except Exception as e:
             logging.error(f"Failed to download {url}: {e}")
-            return False
-    
-    def download_product_images(self, products_data):
-        """Download all product images with threading"""
-        download_tasks = []
-        
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            return None
+
+    def collect_image_urls(self, products_data):
+        """Map product id -> {role: [urls]} for main and gallery images"""
+        product_images = {}
         for product in products_data:
             product_id = product['product_info']['id']
             images = product['images']
-            
-            # Main images
-            for i, img_url in enumerate(images.get('main', [])):
-                if img_url:
-                    ext = self.get_file_extension(img_url)
-                    filename = f"{self.base_dir}/products/{product_id}_main_{i}{ext}"
-                    download_tasks.append((img_url, filename))
-            
-            # Gallery images  
-            for i, img_url in enumerate(images.get('gallery', [])):
-                if img_url:
-                    ext = self.get_file_extension(img_url)
-                    filename = f"{self.base_dir}/products/{product_id}_gallery_{i}{ext}"
-                    download_tasks.append((img_url, filename))
-        
-        # Download with thread pool
-        logging.info(f"Starting download of {len(download_tasks)} images...")
-        
-        success_count = 0
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = [
-                executor.submit(self.download_single_image, url, filename)
-                for url, filename in download_tasks
-            ]
-            
-            for future in futures:
-                if future.result():
-                    success_count += 1
-                time.sleep(0.5)  # Rate limiting
-        
-        logging.info(f"Successfully downloaded {success_count}/{len(download_tasks)} images")
+            product_images[product_id] = {
+                role: [url for url in images.get(role, []) if url]
+                for role in ('main', 'gallery')
+            }
+        return product_images
+
+    async def download_all(self, urls):
+        """Download unique URLs concurrently with global and per-host limits"""
+        connector = aiohttp.TCPConnector(limit=self.max_workers, limit_per_host=self.per_host_limit)
+        timeout = aiohttp.ClientTimeout(total=60, sock_read=15)
+
+        # At most max_workers requests in flight: ClientTimeout's total also counts
+        # time spent waiting for a pooled connection, so queued requests would time out
+        slots = asyncio.Semaphore(self.max_workers)
+
+        async def download(session, url):
+            async with slots:
+                return await self.download_single_image(session, url)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            # One failing URL must not abort the run (manifests are written afterwards)
+            results = await asyncio.gather(*[
+                download(session, url) for url in urls
+            ], return_exceptions=True)
+
+        entries = {}
+        for url, result in zip(urls, results):
+            if isinstance(result, BaseException):
+                logging.error(f"Failed to download {url}: {result!r}")
+                result = None
+            entries[url] = result
+        return entries
+
+    def write_manifests(self, product_images, entries):
+        """Write one manifest per product pointing at content-addressed files"""
+        for product_id, roles in product_images.items():
+            manifest = {
+                role: [
+                    {'url': url, 'sha256': entries[url]['sha256'], 'file': entries[url]['file']}
+                    for url in urls if entries.get(url)
+                ]
+                for role, urls in roles.items()
+            }
+            with open(f"{self.manifests_dir}/{product_id}.json", 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    def download_product_images(self, products_data):
+        """Download all product images with asyncio, deduplicated by URL and content"""
+        product_images = self.collect_image_urls(products_data)
+
+        # The same URL is often shared across variants: fetch it once
+        image_refs = [url for roles in product_images.values() for urls in roles.values() for url in urls]
+        unique_urls = list(dict.fromkeys(image_refs))
+
+        self.stats = {'downloaded': 0, 'skipped': 0, 'duplicate_content': 0, 'bytes': 0}
+        logging.info(f"Starting download of {len(unique_urls)} unique images "
+                     f"({len(image_refs)} references)...")
+
+        start_time = time.time()
+        entries = asyncio.run(self.download_all(unique_urls))
+        elapsed = time.time() - start_time
+
+        self.write_manifests(product_images, entries)
+        self.save_url_index()
+
+        success_count = sum(1 for entry in entries.values() if entry)
+        unique_files = len({entry['sha256'] for entry in entries.values() if entry})
+        dedupe_ratio = 1 - unique_files / len(image_refs) if image_refs else 0.0
+        throughput = self.stats['bytes'] / (1024 * 1024) / elapsed if elapsed > 0 else 0.0
+
+        self.stats.update({
+            'references': len(image_refs),
+            'unique_urls': len(unique_urls),
+            'unique_files': unique_files,
+            'dedupe_ratio': dedupe_ratio,
+            'elapsed_seconds': elapsed,
+            'throughput_mb_s': throughput,
+            'images_per_second': success_count / elapsed if elapsed > 0 else 0.0
+        })
+
+        logging.info(f"Successfully downloaded {success_count}/{len(unique_urls)} images "
+                     f"({self.stats['skipped']} unchanged, {self.stats['duplicate_content']} duplicate content)")
+        logging.info(f"Throughput: {throughput:.2f} MB/s, {self.stats['images_per_second']:.1f} images/s; "
+                     f"dedupe ratio: {dedupe_ratio:.1%} ({unique_files} files for {len(image_refs)} references)")
         return success_count
-    
+
     def get_file_extension(self, url):
         """Extract file extension from URL"""
         parsed = urlparse(url)
         path = parsed.path
-        
+
         if '.' in path:
             ext = os.path.splitext(path)[1]
             if ext.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
                 return ext
-        
-        return '.jpg'  # Default extension
\ No newline at end of file
+
+        return '.jpg'  # Default extension
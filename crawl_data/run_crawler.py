@@ -13,7 +13,7 @@ import logging
 # Updated main() function in run_crawler.py
 def main():
     parser = argparse.ArgumentParser(description='Hùng Phát JSC Product Crawler')
-    parser.add_argument('--mode', choices=['discover', 'crawl', 'process', 'download'], 
+    parser.add_argument('--mode', choices=['discover', 'crawl', 'process', 'download', 'thumbnails'], 
                        default='crawl', help='Crawling mode')
     parser.add_argument('--limit', type=int, default=None, 
                        help='Limit number of products to crawl')
@@ -36,7 +36,7 @@ def main():
             from hungphat_crawler import HungPhatCrawler
             crawler = HungPhatCrawler(delay=args.delay)
             pagination_urls = crawler.discover_pagination_urls()
-            print(f"Generated {len(pagination_urls)} pagination URLs")
+            print(f"Discovered {len(pagination_urls)} pagination URLs")
             print(f"Check logs at: {args.output}/crawler.log")
             
         elif args.mode == 'crawl':
@@ -123,6 +123,18 @@ def main():
             success_count = downloader.download_product_images(data)
             print(f"Downloading images to: {args.output}/images/")
             print(f"Downloaded {success_count} images")
+            print(f"Dedupe ratio: {downloader.stats['dedupe_ratio']:.1%} "
+                  f"({downloader.stats['unique_files']} files for {downloader.stats['references']} references)")
+            print(f"Throughput: {downloader.stats['throughput_mb_s']:.2f} MB/s")
+
+        elif args.mode == 'thumbnails':
+            # Thumbnails from downloaded images (run --mode download first)
+            from thumbnail_generator import ThumbnailGenerator
+
+            generator = ThumbnailGenerator(f"{args.output}/images")
+            rendered = generator.generate()
+            print(f"Rendered thumbnails for {rendered} images")
+            print(f"Thumbnail index: {generator.index_file}")
             
     except KeyboardInterrupt:
         print("\nCrawling interrupted by user")
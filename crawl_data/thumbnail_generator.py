@@ -0,0 +1,141 @@
+import os
+import json
+import glob
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+# Fixed-size variants sent to Messenger (name -> bounding box)
+THUMBNAIL_SIZES = {
+    'small': (160, 160),
+    'medium': (480, 480)
+}
+
+THUMBNAIL_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True}
+}
+
+def thumbnail_paths(thumbnails_dir, sha256):
+    """Output paths for one source image: {size: {format: path}}"""
+    return {
+        size_name: {
+            ext: f"{thumbnails_dir}/{sha256}_{size_name}.{ext}"
+            for ext in THUMBNAIL_FORMATS
+        }
+        for size_name in THUMBNAIL_SIZES
+    }
+
+def render_thumbnails(source_file, sha256, thumbnails_dir):
+    """Render every size/format of one image (runs in a worker process)"""
+    outputs = thumbnail_paths(thumbnails_dir, sha256)
+    largest = max(THUMBNAIL_SIZES.values())
+
+    with Image.open(source_file) as img:
+        # JPEG draft mode decodes at a reduced scale directly (much cheaper than full decode + resize)
+        if img.format == 'JPEG':
+            img.draft('RGB', largest)
+
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Largest first so smaller sizes resize from an already reduced image
+        for size_name, size in sorted(THUMBNAIL_SIZES.items(), key=lambda item: item[1], reverse=True):
+            img.thumbnail(size, Image.LANCZOS)
+            for ext, save_kwargs in THUMBNAIL_FORMATS.items():
+                img.save(outputs[size_name][ext], **save_kwargs)
+
+    return sha256
+
+class ThumbnailGenerator:
+    """Generate fixed-size thumbnails for downloaded product images
+
+    Works from the per-product manifests written by ``ImageDownloader``.
+    Thumbnails are keyed by the source image's sha256, so an image shared by
+    several products is rendered once and re-runs only process new content.
+    """
+
+    def __init__(self, base_dir="hungphat_data/images", max_workers=None):
+        self.base_dir = base_dir
+        self.max_workers = max_workers or os.cpu_count()
+        self.manifests_dir = f"{base_dir}/manifests"
+        self.thumbnails_dir = f"{base_dir}/thumbnails"
+        self.index_file = f"{self.thumbnails_dir}/index.json"
+
+        os.makedirs(self.thumbnails_dir, exist_ok=True)
+
+    def load_manifests(self):
+        """Load product id -> manifest from ImageDownloader output"""
+        manifests = {}
+        for manifest_file in glob.glob(f"{self.manifests_dir}/*.json"):
+            product_id = os.path.splitext(os.path.basename(manifest_file))[0]
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifests[product_id] = json.load(f)
+        return manifests
+
+    def is_processed(self, sha256):
+        """Check whether every output for this content hash already exists"""
+        return all(
+            os.path.exists(path)
+            for formats in thumbnail_paths(self.thumbnails_dir, sha256).values()
+            for path in formats.values()
+        )
+
+    def generate(self):
+        """Render missing thumbnails on a process pool and write the product index"""
+        manifests = self.load_manifests()
+
+        # Unique source images by content hash
+        sources = {}
+        for manifest in manifests.values():
+            for images in manifest.values():
+                for image in images:
+                    sources.setdefault(image['sha256'], image['file'])
+
+        pending = {sha: path for sha, path in sources.items() if not self.is_processed(sha)}
+        logging.info(f"Thumbnails: {len(sources)} unique images, "
+                     f"{len(sources) - len(pending)} already processed, {len(pending)} to render")
+
+        failed = set()
+        if pending:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    sha: executor.submit(render_thumbnails, path, sha, self.thumbnails_dir)
+                    for sha, path in pending.items()
+                }
+                for sha, future in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logging.error(f"Failed to render thumbnails for {pending[sha]}: {e}")
+                        failed.add(sha)
+
+        index = self.build_index(manifests, failed)
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+
+        rendered = len(pending) - len(failed)
+        logging.info(f"Rendered thumbnails for {rendered} images, index saved to {self.index_file}")
+        return rendered
+
+    def build_index(self, manifests, failed=()):
+        """Map product id -> {role: [{sha256, thumbnails}]}"""
+        index = {}
+        for product_id, manifest in manifests.items():
+            index[product_id] = {
+                role: [
+                    {
+                        'sha256': image['sha256'],
+                        'thumbnails': thumbnail_paths(self.thumbnails_dir, image['sha256'])
+                    }
+                    for image in images if image['sha256'] not in failed
+                ]
+                for role, images in manifest.items()
+            }
+        return index
@@ -0,0 +1,83 @@
+import json
+from typing import Dict, List, Optional
+
+import httpx
+
+from facebook_bot.api.messenger_api import MessengerAPI
+from facebook_bot.config.facebook_config import FacebookConfig
+from src.utils.metrics import metrics
+from src.utils.logger import get_logger
+
+logger = get_logger("messenger")
+
+class AsyncMessengerAPI:
+    """Asyncio Facebook Messenger API client (same payloads as MessengerAPI)
+
+    One pooled httpx.AsyncClient with keep-alive connections to the Graph API
+    is shared by all conversations; a send only holds the event loop while
+    writing and parsing, never while waiting for Facebook.
+    """
+
+    def __init__(self, max_connections: int = 64, timeout: float = 10):
+        FacebookConfig.validate_config()
+        self.access_token = FacebookConfig.PAGE_ACCESS_TOKEN
+        self.messages_url = FacebookConfig.MESSAGES_URL
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                params={"access_token": self.access_token},
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def send_message(self, recipient_id: str, message_text: str,
+                           quick_replies: Optional[List[Dict]] = None) -> bool:
+        """Send text message to user"""
+        response = await self._send_request(self._message_payload(recipient_id, message_text, quick_replies))
+        return self._delivered(response)
+
+    async def send_messages(self, recipient_id: str, messages: List[str],
+                            quick_replies: Optional[List[Dict]] = None) -> bool:
+        """Send several messages in order (quick replies on the last); stops at the first failure"""
+        for i, text in enumerate(messages):
+            last = i == len(messages) - 1
+            if not await self.send_message(recipient_id, text, quick_replies if last else None):
+                return False
+        return bool(messages)
+
+    async def send_typing_indicator(self, recipient_id: str, typing_on: bool = True) -> bool:
+        payload = {
+            "recipient": {"id": recipient_id},
+            "sender_action": "typing_on" if typing_on else "typing_off"
+        }
+        return await self._send_request(payload) is not None
+
+    async def _send_request(self, payload: Dict) -> Optional[Dict]:
+        """Send request to Facebook Graph API"""
+        try:
+            with metrics.span("messenger.send_request"):
+                response = await self._ensure_client().post(self.messages_url, content=json.dumps(payload))
+            if response.status_code == 200:
+                return response.json()
+            logger.error(f"Facebook API error: {response.status_code} - {response.text}")
+            return None
+        except httpx.HTTPError as e:
+            logger.error(f"Request error: {e}")
+            return None
+
+    # Same payloads and delivery check as the sync client
+    _message_payload = MessengerAPI._message_payload
+    _delivered = staticmethod(MessengerAPI._delivered)
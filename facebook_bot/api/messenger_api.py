@@ -1,7 +1,10 @@
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
 from facebook_bot.config.facebook_config import FacebookConfig
+from src.utils.metrics import metrics
 
 class MessengerAPI:
     """Facebook Messenger API Client"""
@@ -11,39 +14,74 @@ class MessengerAPI:
         FacebookConfig.validate_config()
         self.access_token = FacebookConfig.PAGE_ACCESS_TOKEN
         self.messages_url = FacebookConfig.MESSAGES_URL
+        
+        # Keep-alive connection pool to the Graph API shared by all sends
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self.session.params = {"access_token": self.access_token}
+        self.session.headers.update({"Content-Type": "application/json"})
+        
+        # Sender threads for multi-message replies (ordering is kept per reply, not by the pool)
+        self._sender = ThreadPoolExecutor(max_workers=8, thread_name_prefix="messenger-send")
+    
+    def _message_payload(self, recipient_id: str, message_text: str,
+                         quick_replies: Optional[List[Dict]] = None) -> Dict:
+        # Build message payload
+        message_data = {
+            "text": message_text
+        }
+        
+        # Add quick replies if provided
+        if quick_replies:
+            message_data["quick_replies"] = quick_replies
+        
+        return {
+            "recipient": {"id": recipient_id},
+            "message": message_data,
+            "messaging_type": "RESPONSE"
+        }
     
     def send_message(self, recipient_id: str, message_text: str, 
                     quick_replies: Optional[List[Dict]] = None) -> bool:
         """Send text message to user"""
         try:
-            # Build message payload
-            message_data = {
-                "text": message_text
-            }
-            
-            # Add quick replies if provided
-            if quick_replies:
-                message_data["quick_replies"] = quick_replies
-            
-            payload = {
-                "recipient": {"id": recipient_id},
-                "message": message_data,
-                "messaging_type": "RESPONSE"
-            }
-            
             # Send request
-            response = self._send_request(payload)
-            
-            if response and response.get("message_id"):
-                return True
-            else:
-                print(f"Failed to send message: {response}")
-                return False
+            response = self._send_request(self._message_payload(recipient_id, message_text, quick_replies))
+            return self._delivered(response)
                 
         except Exception as e:
             print(f"Error sending message: {e}")
             return False
     
+    def send_messages(self, recipient_id: str, messages: List[str],
+                      quick_replies: Optional[List[Dict]] = None) -> bool:
+        """Send several messages in order (quick replies attached to the last one)
+        
+        Each request is prepared while the previous one is in flight, but a
+        message is only sent after the previous one was accepted, so the user
+        sees them in order. Stops at the first failure.
+        """
+        try:
+            in_flight = None
+            for i, text in enumerate(messages):
+                last = i == len(messages) - 1
+                prepared = self._prepare(self._message_payload(recipient_id, text, quick_replies if last else None))
+                if in_flight is not None and not self._delivered(in_flight.result()):
+                    return False
+                in_flight = self._sender.submit(self._send_prepared, prepared)
+            return in_flight is not None and self._delivered(in_flight.result())
+        
+        except Exception as e:
+            print(f"Error sending messages: {e}")
+            return False
+    
+    @staticmethod
+    def _delivered(response: Optional[Dict]) -> bool:
+        if response and response.get("message_id"):
+            return True
+        print(f"Failed to send message: {response}")
+        return False
+    
     def send_typing_indicator(self, recipient_id: str, typing_on: bool = True) -> bool:
         """Send typing indicator"""
         try:
@@ -68,17 +106,17 @@ class MessengerAPI:
     
     def _send_request(self, payload: Dict) -> Optional[Dict]:
         """Send request to Facebook Graph API"""
+        return self._send_prepared(self._prepare(payload))
+    
+    def _prepare(self, payload: Dict) -> requests.PreparedRequest:
+        return self.session.prepare_request(
+            requests.Request("POST", self.messages_url, data=json.dumps(payload))
+        )
+    
+    @metrics.timed("messenger.send_request")
+    def _send_prepared(self, prepared: requests.PreparedRequest) -> Optional[Dict]:
         try:
-            params = {"access_token": self.access_token}
-            headers = {"Content-Type": "application/json"}
-            
-            response = requests.post(
-                self.messages_url,
-                params=params,
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=10
-            )
+            response = self.session.send(prepared, timeout=10)
             
             if response.status_code == 200:
                 return response.json()
@@ -88,4 +126,4 @@ class MessengerAPI:
                 
         except requests.exceptions.RequestException as e:
             print(f"Request error: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -20,7 +20,7 @@ class FacebookConfig:
     APP_SECRET = os.getenv('FACEBOOK_APP_SECRET')
     
     # API URLs
-    GRAPH_API_URL = "https://graph.facebook.com/v19.0"
+    GRAPH_API_URL = os.getenv('FACEBOOK_GRAPH_API_URL', "https://graph.facebook.com/v19.0")
     MESSAGES_URL = f"{GRAPH_API_URL}/me/messages"
     
     # Webhook Settings
@@ -61,6 +61,8 @@ class BotSettings:
     
     # Response Settings
     MAX_RESPONSE_LENGTH = 2000  # Facebook message limit
+    MESSAGE_MODE = os.getenv('BOT_MESSAGE_MODE', 'split')  # "split" long answers into messages or "truncate"
+    MAX_MESSAGES_PER_RESPONSE = 3
     TYPING_DELAY = 2  # Seconds to show "typing" indicator
     
     # RAG Settings
@@ -76,4 +78,12 @@ class BotSettings:
         {"content_type": "text", "title": "Balo laptop", "payload": "BALO_LAPTOP"},
         {"content_type": "text", "title": "Tui xach", "payload": "TUI_XACH"},
         {"content_type": "text", "title": "Gia re", "payload": "GIA_RE"}
-    ]
\ No newline at end of file
+    ]
+    
+    # Fixed query behind each quick-reply payload (answers are precomputed)
+    POSTBACK_QUERIES = {
+        'VALI_20': 'Vali 20 inch tot nhat',
+        'BALO_LAPTOP': 'Balo laptop chat luong cao',
+        'TUI_XACH': 'Tui xach dep va ben',
+        'GIA_RE': 'San pham gia re duoi 500k'
+    }
\ No newline at end of file
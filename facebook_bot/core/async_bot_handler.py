@@ -0,0 +1,182 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Set
+
+from facebook_bot.api.async_messenger_api import AsyncMessengerAPI
+from facebook_bot.config.facebook_config import BotSettings
+from src.query.async_llama3_client import AsyncLlama3Client, GenerationCancelled
+from src.query.llama3_client import LLMTimeout
+from src.utils.metrics import metrics
+from src.utils.logger import get_logger, log_payload
+from src.utils.single_flight import AsyncSingleFlight
+
+logger = get_logger("bot")
+
+class AsyncHungPhatBot:
+    """Event-loop front end for HungPhatBot (used by server/asgi_app.py)
+
+    Reuses the sync bot's RAG engine, precomputed answers and formatter.
+    CPU work (routing, embedding, retrieval, formatting) runs on a small
+    thread pool; Ollama and Graph API calls are awaited, so a conversation
+    waiting on the LLM costs a coroutine, not a thread. Generations draw on
+    the engine's LLM slots and identical concurrent questions share one, as in
+    RAGEngine._complete. A newer message from the same sender stops the wait
+    for the previous one (its generation is cancelled unless others share it).
+    """
+
+    def __init__(self, bot, cpu_threads: int = 4, llm: AsyncLlama3Client = None,
+                 messenger: AsyncMessengerAPI = None):
+        self.bot = bot
+        self.rag_engine = bot.rag_engine
+        self.llm = llm or AsyncLlama3Client(slots=self.rag_engine.llm_slots)
+        self.generations = AsyncSingleFlight()
+        self._answering: Dict[str, asyncio.Task] = {}
+        self._superseded: Set[asyncio.Task] = set()  # cancelled by a newer message, not by shutdown
+        self.messenger = messenger or AsyncMessengerAPI()
+        self.cpu = ThreadPoolExecutor(max_workers=cpu_threads, thread_name_prefix="cpu")
+
+    async def run_cpu(self, func, *args):
+        """Run on the CPU pool, keeping the request's metrics trace (contextvars)"""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.cpu, functools.partial(context.run, func, *args))
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
+        await self.messenger.aclose()
+        self.cpu.shutdown(wait=False)
+
+    async def handle_event(self, messaging_event: Dict) -> None:
+        """One Messenger event (text, attachment, postback, delivery/read receipts)"""
+        sender_id = messaging_event.get('sender', {}).get('id')
+        if not sender_id:
+            return
+
+        if 'message' in messaging_event:
+            message = messaging_event['message']
+            if 'text' in message:
+                await self.handle_message(sender_id, message['text'])
+            elif 'attachments' in message:
+                attachment_response = "Toi nhan duoc file/hinh cua ban! Tuy nhien, toi chi co the tra loi cau hoi bang text. Hay hoi toi ve san pham vali, balo nhe!"
+                await self.messenger.send_message(sender_id, attachment_response)
+                logger.info("Attachment reply sent", extra={"sender_id": sender_id})
+
+        elif 'postback' in messaging_event:
+            payload = messaging_event['postback'].get('payload', '')
+            logger.info("Postback received", extra={"sender_id": sender_id, "payload": payload})
+            await self.handle_message(sender_id, BotSettings.POSTBACK_QUERIES.get(payload, payload))
+
+        elif 'delivery' in messaging_event:
+            logger.debug("Message delivered", extra={"sender_id": sender_id,
+                                                     "count": len(messaging_event['delivery'].get('mids', []))})
+        elif 'read' in messaging_event:
+            logger.debug("Message read", extra={"sender_id": sender_id})
+
+    async def handle_message(self, sender_id: str, message_text: str) -> bool:
+        with metrics.request("message", sender_id=sender_id, server="asgi") as trace:
+            trace["ok"] = await self._handle_message(sender_id, message_text)
+            return trace["ok"]
+
+    async def _handle_message(self, sender_id: str, message_text: str) -> bool:
+        try:
+            logger.info("Message received", extra={"sender_id": sender_id, "chars": len(message_text)})
+            log_payload(logger, "Message text", message_text)
+            await self.messenger.send_typing_indicator(sender_id, True)
+
+            # Fixed questions come from memory (remembering their products for follow-ups);
+            # everything else goes through RAG
+            response = await self.run_cpu(self.bot.answers.answer, message_text, sender_id)
+            if response is not None:
+                metrics.inc("answers_served", source="precomputed")
+                if self.bot.answers.is_stale():
+                    self.bot.answers.refresh_async()
+            else:
+                response = await self.query(message_text, sender_id)
+            log_payload(logger, "RAG response", response)
+
+            await self.messenger.send_typing_indicator(sender_id, False)
+
+            # Format and send: long answers go out as several ordered messages
+            if BotSettings.MESSAGE_MODE == "split":
+                messages = await self.run_cpu(self.bot.formatter.format_messages, response, "friendly")
+                success = await self.messenger.send_messages(sender_id, messages)
+            else:
+                formatted = await self.run_cpu(self.bot.formatter.format_for_facebook, response, "friendly")
+                success = await self.messenger.send_message(sender_id, formatted)
+
+            if success:
+                logger.info("Response sent", extra={"sender_id": sender_id})
+            else:
+                logger.error("Failed to send response", extra={"sender_id": sender_id})
+            return success
+
+        except GenerationCancelled:
+            # The sender asked something newer; that message gets the reply
+            logger.info("Reply superseded by a newer message", extra={"sender_id": sender_id})
+            return True
+        except Exception as e:
+            logger.exception(f"Error handling message: {e}")
+            await self.messenger.send_message(sender_id, BotSettings.FALLBACK_RESPONSE)
+            return False
+
+    async def query(self, question: str, sender_id: str = None) -> str:
+        """RAGEngine.query with the LLM call awaited instead of blocking a thread"""
+        rag = self.rag_engine
+        plan = await self.run_cpu(rag.prepare, question, sender_id)
+        if plan.needs_llm:
+            try:
+                plan.response = await self._complete(plan)
+            except GenerationCancelled:
+                raise
+            except Exception as e:
+                plan.response = rag.llm_fallback(plan, e)
+        return await self.run_cpu(rag.finish, plan)
+
+    async def _complete(self, plan) -> str:
+        """Await the (possibly shared) generation; raises GenerationCancelled when superseded"""
+        previous = self._answering.get(plan.sender_id)
+        if previous is not None and not previous.done():
+            self._superseded.add(previous)
+            previous.cancel()
+            metrics.inc("llm_cancelled")
+
+        task = asyncio.ensure_future(self.generations.do(plan.key, lambda: self._generate(plan)))
+        if plan.sender_id is not None:
+            self._answering[plan.sender_id] = task
+        try:
+            response, shared = await task
+        except asyncio.CancelledError:
+            if task not in self._superseded:
+                raise  # the handler itself was cancelled (shutdown)
+            raise GenerationCancelled(f"Reply for {plan.sender_id} superseded by a newer message")
+        finally:
+            self._superseded.discard(task)
+            if self._answering.get(plan.sender_id) is task:
+                del self._answering[plan.sender_id]
+
+        if shared:
+            metrics.inc("rag_coalesced")
+        metrics.inc("rag_answers", mode="llm")
+        return response
+
+    async def _generate(self, plan) -> str:
+        """One LLM call, reporting queue wait and latency to the shedder (as in RAGEngine._generate)"""
+        rag = self.rag_engine
+        timings = {}
+        try:
+            response = await self.llm.generate_with_prefix(
+                plan.static_prefix,
+                plan.dynamic_suffix,
+                timings=timings,
+                temperature=0.3,
+                max_tokens=rag.max_answer_tokens
+            )
+        except LLMTimeout:
+            if "generate" in timings:
+                # As slow as an answer gets: counts toward shedding
+                rag.load_shedder.record(timings["queue_wait"], timings["generate"])
+            raise
+        rag.load_shedder.record(timings["queue_wait"], timings["generate"])
+        return response
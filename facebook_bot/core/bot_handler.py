@@ -9,22 +9,31 @@ sys.path.append(str(project_root))                  # For facebook_bot modules
 
 # Now imports should work
 from query.rag_engine import RAGEngine
+from src.query.precomputed_answers import PrecomputedAnswers
 from facebook_bot.api.messenger_api import MessengerAPI
 from facebook_bot.core.response_formatter import ResponseFormatter
 from facebook_bot.config.facebook_config import BotSettings
+from src.utils.metrics import metrics
+from src.utils.logger import get_logger, log_payload
+
+logger = get_logger("bot")
 
 class HungPhatBot:
     """Main Facebook Bot Handler"""
     
     def __init__(self):
         """Initialize bot with RAG engine"""
-        print("[BOT] Initializing Hung Phat Bot...")
+        logger.info("Initializing Hung Phat Bot...")
         
         try:
             # Initialize RAG Engine
-            print("[BOT] Loading RAG Engine...")
+            logger.info("Loading RAG Engine...")
             self.rag_engine = RAGEngine()
-            print("[BOT] RAG Engine loaded successfully")
+            logger.info("RAG Engine loaded successfully")
+            
+            # Quick-reply and FAQ answers served from memory (regenerated when stale)
+            self.answers = PrecomputedAnswers(self.rag_engine)
+            self.answers.load()
             
             # Initialize Messenger API
             self.messenger = MessengerAPI()
@@ -32,56 +41,88 @@ class HungPhatBot:
             # Initialize Response Formatter
             self.formatter = ResponseFormatter()
             
+            # Don't generate more text than the formatter will send
+            self.rag_engine.max_answer_tokens = min(self.rag_engine.max_answer_tokens,
+                                                    self.formatter.answer_token_budget())
+            
             # Bot state
             self.active = True
             
-            print("[BOT] Hung Phat Bot ready!")
+            logger.info("Hung Phat Bot ready")
             
         except Exception as e:
-            print(f"[ERROR] Error initializing bot: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Error initializing bot: {e}")
             raise
     
+    def warm_up(self) -> None:
+        """Load the embedding model, Chroma collection and Llama3 before the first user needs them"""
+        with metrics.span("bot.warm_up"):
+            # Pre-load Llama3 and keep it resident so the first user doesn't pay model load time
+            self.rag_engine.llama3_client.start_lifecycle()
+            self.rag_engine.initialize()
+        logger.info("Models loaded")
+        if self.answers.is_stale():
+            self.answers.refresh_async()
+    
+    def preload(self) -> None:
+        """Pre-fork master: load models, vector index and Llama3 once, without background threads"""
+        with metrics.span("bot.preload"):
+            self.rag_engine.preload()
+            self.rag_engine.llama3_client.warm_up()
+    
+    def after_fork(self) -> None:
+        """Pre-forked worker: start the background work that didn't survive fork()"""
+        self.rag_engine.after_fork()
+        self.rag_engine.llama3_client.start_lifecycle(warm_up=False)
+        if self.answers.is_stale():
+            self.answers.refresh_async()
+    
     def handle_message(self, sender_id: str, message_text: str) -> bool:
         """Handle incoming message from user"""
+        with metrics.request("message", sender_id=sender_id) as trace:
+            trace["ok"] = self._handle_message(sender_id, message_text)
+            return trace["ok"]
+
+    def _handle_message(self, sender_id: str, message_text: str) -> bool:
+        """Run RAG, format and send the reply (timed by handle_message)"""
         try:
-            print(f"[MESSAGE] Received from {sender_id}: {message_text}")
-            sys.stdout.flush()
+            logger.info("Message received", extra={"sender_id": sender_id, "chars": len(message_text)})
+            log_payload(logger, "Message text", message_text)
             
             # Send typing indicator
             self.messenger.send_typing_indicator(sender_id, True)
             
-            # Process message with RAG
-            print("[RAG] Processing with RAG...")
-            sys.stdout.flush()
-            response = self.rag_engine.query(message_text)
-            print(f"[RAG] Response from RAG: {response}")
-            
-            # Format response for Facebook
-            formatted_response = self.formatter.format_for_facebook(response, tone="friendly")
-            print(f"[FORMATTED RESPONSE] Formatted response: {formatted_response}")
+            # Fixed questions come from memory (remembering their products for follow-ups);
+            # everything else goes through RAG
+            response = self.answers.answer(message_text, sender_id)
+            if response is not None:
+                metrics.inc("answers_served", source="precomputed")
+                if self.answers.is_stale():
+                    self.answers.refresh_async()
+            else:
+                response = self.rag_engine.query(message_text, sender_id=sender_id)
+            log_payload(logger, "RAG response", response)
             
             # Send typing indicator off
             self.messenger.send_typing_indicator(sender_id, False)
             
-            # Send response
-            success = self.messenger.send_message(sender_id, formatted_response)
+            # Format and send: long answers go out as several ordered messages
+            if BotSettings.MESSAGE_MODE == "split":
+                messages = self.formatter.format_messages(response, tone="friendly")
+                success = self.messenger.send_messages(sender_id, messages)
+            else:
+                formatted_response = self.formatter.format_for_facebook(response, tone="friendly")
+                success = self.messenger.send_message(sender_id, formatted_response)
             
             if success:
-                print(f"[SUCCESS] Response sent to {sender_id}")
-                sys.stdout.flush()
+                logger.info("Response sent", extra={"sender_id": sender_id})
                 return True
             else:
-                print(f"[ERROR] Failed to send response to {sender_id}")
-                sys.stdout.flush()
+                logger.error("Failed to send response", extra={"sender_id": sender_id})
                 return False
                 
         except Exception as e:
-            print(f"[ERROR] Error handling message: {e}")
-            sys.stdout.flush()
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Error handling message: {e}")
             
             # Send error message
             error_msg = BotSettings.FALLBACK_RESPONSE
@@ -91,21 +132,14 @@ class HungPhatBot:
     def handle_postback(self, sender_id: str, payload: str) -> bool:
         """Handle postback from quick reply buttons"""
         try:
-            print(f"[POSTBACK] Received from {sender_id}: {payload}")
+            logger.info("Postback received", extra={"sender_id": sender_id, "payload": payload})
             
             # Map payload to query
-            query_map = {
-                'VALI_20': 'Vali 20 inch tot nhat',
-                'BALO_LAPTOP': 'Balo laptop chat luong cao',
-                'TUI_XACH': 'Tui xach dep va ben',
-                'GIA_RE': 'San pham gia re duoi 500k'
-            }
-            
-            query = query_map.get(payload, payload)
+            query = BotSettings.POSTBACK_QUERIES.get(payload, payload)
             return self.handle_message(sender_id, query)
             
         except Exception as e:
-            print(f"[ERROR] Error handling postback: {e}")
+            logger.exception(f"Error handling postback: {e}")
             return False
     
     def send_welcome_message(self, sender_id: str):
@@ -130,14 +164,15 @@ class HungPhatBot:
             )
             
             if success:
-                print(f"[WELCOME] Welcome message sent successfully to {sender_id}")
+                logger.info("Welcome message sent", extra={"sender_id": sender_id})
             else:
-                print(f"[ERROR] Failed to send welcome message to {sender_id}")
+                logger.error("Failed to send welcome message", extra={"sender_id": sender_id})
                 
         except Exception as e:
-            print(f"[ERROR] Error sending welcome message: {e}")
+            logger.exception(f"Error sending welcome message: {e}")
     
     def shutdown(self):
         """Gracefully shutdown bot"""
-        print("[BOT] Shutting down Hung Phat Bot...")
+        logger.info("Shutting down Hung Phat Bot...")
+        self.rag_engine.llama3_client.stop_lifecycle()
         self.active = False
\ No newline at end of file
@@ -1,6 +1,109 @@
+import random
 import re
-#from typing import str
+from typing import List
 from facebook_bot.config.facebook_config import BotSettings
+from src.utils.metrics import metrics
+
+# Tone conversion mappings (formal -> tone)
+TONE_MAPPINGS = {
+    "friendly": {
+        # Pronouns - more casual
+        "tôi": "tớ",
+        "Tôi": "Tớ", 
+        "mình": "tớ",
+        "Mình": "Tớ",
+        
+        # Negations - softer
+        "không": "hơm",
+        "Không": "Hơm",
+        "không có": "hơm có",
+        "Không có": "Hơm có",
+        
+        # Politeness - more casual
+        "anh": "cậu",
+        "chị": "cậu", 
+        "bạn": "cậu",
+        "Bạn": "Cậu",
+        
+        # Responses - friendlier
+        "được": "okela",
+        "có thể": "có thể nhé",
+        "rồi": "rồi đó",
+        "nhé": "nha",
+        "ạ": "á",
+        
+        # Common phrases
+        "xin chào": "chào cậu",
+        "Xin chào": "Chào cậu",
+        "cảm ơn": "thanks",
+        "Cảm ơn": "Thanks",
+    },
+    
+    "playful": {
+        # More playful conversions
+        "tôi": "tui",
+        "Tôi": "Tui",
+        "không": "hong",
+        "Không": "Hong", 
+        "rồi": "ròi",
+        "được": "dc",
+        "có": "cóa",
+        "thế": "zậy",
+        "gì": "dzì",
+        "nhé": "nè",
+        "ạ": "ớ",
+    },
+    
+    "casual": {
+        # Casual but not too playful  
+        "tôi": "mình",
+        "Tôi": "Mình",
+        "không": "ko",
+        "Không": "Ko",
+        "được": "được nè", 
+        "có thể": "có thể đó",
+        "nhé": "nhá",
+        "ạ": "ó",
+    }
+}
+
+# Product type emojis
+EMOJI_MAP = {
+    'vali': '🧳',
+    'balo': '🎒', 
+    'túi xách': '👜',
+    'giá': '💰',
+    'khuyên': '👍',
+    'tốt': '⭐',
+    'chất lượng': '✨',
+    'TSA': '🔒',
+    'bánh xe': '🎡',
+    'nhẹ': '🪶',
+    'bền': '💪',
+    'inch': '📏'
+}
+
+def _alternation(words) -> str:
+    # Longest first so "không có" wins over "không"
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+# One compiled pattern per tone, replaced in a single pass via dict lookup
+_TONE_PATTERNS = {
+    tone: (re.compile(r'\b(?:' + _alternation(mapping) + r')\b'), mapping)
+    for tone, mapping in TONE_MAPPINGS.items()
+}
+_EMOJI_PATTERN = re.compile(_alternation(EMOJI_MAP))
+_WHITESPACE_RE = re.compile(r'\s+')
+_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?…])\s+')
+
+CONTINUATION_NOTE = "\n\n💬 Hỏi tôi thêm để biết chi tiết hơn nhé!"
+
+# Room left for the call to action / continuation note on a message
+CTA_RESERVE = 60
+# Rough llama3 characters per token for Vietnamese answers
+CHARS_PER_TOKEN = 2.5
+_SENTENCE_BREAK_RE = re.compile(r'([.!?])\s*([A-Z])')
 
 class ResponseFormatter:
     """Format RAG responses for Facebook Messenger"""
@@ -8,20 +111,11 @@ class ResponseFormatter:
     def __init__(self):
         self.max_length = BotSettings.MAX_RESPONSE_LENGTH
     
+    @metrics.timed("formatter.format_for_facebook")
     def format_for_facebook(self, rag_response: str, tone: str = "friendly") -> str:
         """Format RAG response for Facebook Messenger with tone conversion"""
         try:
-            # Clean and format the response
-            formatted = self._clean_text(rag_response)
-            
-            # Convert tone BEFORE adding emojis
-            formatted = self._convert_tone(formatted, tone)
-            
-            # Add casual expressions
-            formatted = self._add_casual_expressions(formatted)
-            
-            # Add emojis
-            formatted = self._add_emojis(formatted)
+            formatted = self._format_body(rag_response, tone)
             
             # Truncate if needed
             formatted = self._truncate_if_needed(formatted)
@@ -35,43 +129,104 @@ class ResponseFormatter:
             print(f"⚠️ Error formatting response: {e}")
             return BotSettings.FALLBACK_RESPONSE
     
+    @metrics.timed("formatter.format_messages")
+    def format_messages(self, rag_response: str, tone: str = "friendly") -> List[str]:
+        """Format a response as one or more Messenger messages (split instead of truncated)"""
+        try:
+            formatted = self._format_body(rag_response, tone)
+            
+            # Call to action goes on the last message only
+            messages = self.split_messages(formatted, self.max_length - CTA_RESERVE)
+            messages[-1] = self._add_call_to_action(messages[-1])
+            return messages
+        
+        except Exception as e:
+            print(f"⚠️ Error formatting response: {e}")
+            return [BotSettings.FALLBACK_RESPONSE]
+    
+    def _format_body(self, rag_response: str, tone: str) -> str:
+        # Clean and format the response
+        formatted = self._clean_text(rag_response)
+        
+        # Convert tone BEFORE adding emojis
+        formatted = self._convert_tone(formatted, tone)
+        
+        # Add casual expressions
+        formatted = self._add_casual_expressions(formatted)
+        
+        # Add emojis
+        return self._add_emojis(formatted)
+    
+    def split_messages(self, text: str, max_length: int = None) -> List[str]:
+        """Split text into chunks of at most max_length on paragraph, then sentence, then word boundaries
+        
+        At most BotSettings.MAX_MESSAGES_PER_RESPONSE chunks are returned; the
+        last one is truncated with a continuation note if text remains.
+        """
+        max_length = max_length or self.max_length
+        pieces = []
+        for paragraph in _PARAGRAPH_RE.split(text.strip()):
+            if len(paragraph) <= max_length:
+                pieces.append(paragraph)
+                continue
+            for sentence in _SENTENCE_END_RE.split(paragraph):
+                while len(sentence) > max_length:
+                    cut = sentence.rfind(' ', 0, max_length)
+                    cut = cut if cut > 0 else max_length
+                    pieces.append(sentence[:cut])
+                    sentence = sentence[cut:].lstrip()
+                pieces.append(sentence)
+        
+        # Greedily pack pieces into messages (paragraph breaks kept inside a message)
+        messages = []
+        for piece in filter(None, pieces):
+            if messages and len(messages[-1]) + 2 + len(piece) <= max_length:
+                messages[-1] += "\n\n" + piece
+            else:
+                messages.append(piece)
+        if not messages:
+            return [""]
+        
+        limit = BotSettings.MAX_MESSAGES_PER_RESPONSE
+        if len(messages) > limit:
+            messages = messages[:limit]
+            messages[-1] += CONTINUATION_NOTE
+        return messages
+    
+    def answer_token_budget(self) -> int:
+        """Generation budget (tokens) that still fits in the messages we are willing to send"""
+        chars = (self.max_length - CTA_RESERVE) * BotSettings.MAX_MESSAGES_PER_RESPONSE
+        if BotSettings.MESSAGE_MODE != "split":
+            chars = self.max_length - CTA_RESERVE
+        # Tone conversion and emojis grow the text; keep ~10% headroom
+        return int(chars * 0.9 / CHARS_PER_TOKEN)
+    
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text"""
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text.strip())
+        text = _WHITESPACE_RE.sub(' ', text.strip())
         
         # Fix common formatting issues
         text = text.replace('- ', '• ')  # Use bullet points
         text = text.replace('*', '')     # Remove asterisks
         
         # Ensure proper spacing around punctuation
-        text = re.sub(r'([.!?])\s*([A-Z])', r'\1\n\n\2', text)
+        text = _SENTENCE_BREAK_RE.sub(r'\1\n\n\2', text)
         
         return text
     
     def _add_emojis(self, text: str) -> str:
-        """Add relevant emojis to make response more engaging"""
-        # Product type emojis
-        emoji_map = {
-            'vali': '🧳',
-            'balo': '🎒', 
-            'túi xách': '👜',
-            'giá': '💰',
-            'khuyên': '👍',
-            'tốt': '⭐',
-            'chất lượng': '✨',
-            'TSA': '🔒',
-            'bánh xe': '🎡',
-            'nhẹ': '🪶',
-            'bền': '💪',
-            'inch': '📏'
-        }
-        
-        for keyword, emoji in emoji_map.items():
-            if keyword.lower() in text.lower():
-                text = text.replace(keyword, f"{keyword} {emoji}", 1)  # Only first occurrence
+        """Add relevant emojis to make response more engaging (first occurrence of each keyword)"""
+        seen = set()
         
-        return text
+        def add_emoji(match):
+            keyword = match.group(0)
+            if keyword in seen:
+                return keyword
+            seen.add(keyword)
+            return f"{keyword} {EMOJI_MAP[keyword]}"
+        
+        return _EMOJI_PATTERN.sub(add_emoji, text)
     
     def _truncate_if_needed(self, text: str) -> str:
         """Truncate text if too long for Facebook"""
@@ -87,7 +242,7 @@ class ResponseFormatter:
             truncated = truncated[:last_sentence + 1]
         
         # Add continuation message
-        truncated += "\n\n💬 Hỏi tôi thêm để biết chi tiết hơn nhé!"
+        truncated += CONTINUATION_NOTE
         
         return truncated
     
@@ -114,83 +269,9 @@ class ResponseFormatter:
         return text + cta
     
     def _convert_tone(self, text: str, tone: str = "friendly") -> str:
-        """Convert formal tone to friendly/casual tone"""
-        
-        # Define tone conversion mappings
-        tone_mappings = {
-            "friendly": {
-                # Pronouns - more casual
-                "tôi": "tớ",
-                "Tôi": "Tớ", 
-                "mình": "tớ",
-                "Mình": "Tớ",
-                
-                # Negations - softer
-                "không": "hơm",
-                "Không": "Hơm",
-                "không có": "hơm có",
-                "Không có": "Hơm có",
-                
-                # Politeness - more casual
-                "anh": "cậu",
-                "chị": "cậu", 
-                "bạn": "cậu",
-                "Bạn": "Cậu",
-                
-                # Responses - friendlier
-                "được": "okela",
-                "có thể": "có thể nhé",
-                "rồi": "rồi đó",
-                "nhé": "nha",
-                "ạ": "á",
-                
-                # Common phrases
-                "xin chào": "chào cậu",
-                "Xin chào": "Chào cậu",
-                "cảm ơn": "thanks",
-                "Cảm ơn": "Thanks",
-            },
-            
-            "playful": {
-                # More playful conversions
-                "tôi": "tui",
-                "Tôi": "Tui",
-                "không": "hong",
-                "Không": "Hong", 
-                "rồi": "ròi",
-                "được": "dc",
-                "có": "cóa",
-                "thế": "zậy",
-                "gì": "dzì",
-                "nhé": "nè",
-                "ạ": "ớ",
-            },
-            
-            "casual": {
-                # Casual but not too playful  
-                "tôi": "mình",
-                "Tôi": "Mình",
-                "không": "ko",
-                "Không": "Ko",
-                "được": "được nè", 
-                "có thể": "có thể đó",
-                "nhé": "nhá",
-                "ạ": "ó",
-            }
-        }
-        
-        # Get the mapping for specified tone
-        mapping = tone_mappings.get(tone, tone_mappings["friendly"])
-        
-        # Apply conversions
-        converted_text = text
-        for formal, casual in mapping.items():
-            # Use word boundaries to avoid partial replacements
-            import re
-            pattern = r'\b' + re.escape(formal) + r'\b'
-            converted_text = re.sub(pattern, casual, converted_text)
-        
-        return converted_text
+        """Convert formal tone to friendly/casual tone (one regex pass)"""
+        pattern, mapping = _TONE_PATTERNS.get(tone, _TONE_PATTERNS["friendly"])
+        return pattern.sub(lambda match: mapping[match.group(0)], text)
 
     def _add_casual_expressions(self, text: str) -> str:
         """Add casual expressions and interjections"""
@@ -201,7 +282,6 @@ class ResponseFormatter:
         ]
         
         # Add random casual expression occasionally
-        import random
         if random.random() < 0.3:  # 30% chance
             expression = random.choice(casual_additions)
             # Add at end of sentences randomly
@@ -12,6 +12,7 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 from src.indexing.chroma_indexer import ChromaIndexer
 from src.indexing.llamaindex_builder import LlamaIndexBuilder
+from src.embedding.model_registry import model_registry, rss_mb
 from config.settings import Config
 
 def main():
@@ -85,12 +86,36 @@ def main():
         print(f"❌ LlamaIndex error: {e}")
         print("💡 ChromaDB indexing successful, skip LlamaIndex for now")
     
+    # Step 3.3: Precompute quick-reply / FAQ answers against the new index
+    print("\n💬 Step 3.3: Precomputing quick-reply and FAQ answers...")
+    answer_count = precompute_answers()
+    
     print("\n✅ Index building completed!")
     print(f"📊 Summary:")
     print(f"   - ChromaDB documents: {info.get('document_count', 0)}")
     print(f"   - Vector store path: {Config.VECTORSTORE_DIR}")
+    print(f"   - Precomputed answers: {answer_count}")
+    print(f"   - Models loaded: {len(model_registry.loaded())} (process RSS {rss_mb():.0f} MB)")
     print(f"   - Our RAG engine: ✅ (use test_rag_fixed.py)")
 
+def precompute_answers() -> int:
+    """Generate answers for the fixed postback queries and FAQ list"""
+    try:
+        from src.query.rag_engine import RAGEngine
+        from src.query.precomputed_answers import PrecomputedAnswers
+        
+        rag = RAGEngine()
+        rag.initialize()
+        count = PrecomputedAnswers(rag).build()
+        rag.templates.stop_watching()
+        print(f"✅ Precomputed {count} answers -> {Config.PRECOMPUTED_ANSWERS_PATH}")
+        return count
+    except Exception as e:
+        print(f"⚠️  Answer precomputation failed: {e}")
+        print("💡 Questions that failed keep their previous answer (or go through live RAG);")
+        print("   the bot retries the build in the background while the answers are stale")
+        return 0
+
 if __name__ == "__main__":
     main()
 
@@ -153,5 +178,8 @@ def main_chromadb_only():
         else:
             print("❌ No results")
     
+    precompute_answers()
+    
     print("\n✅ ChromaDB indexing completed!")
+    print(f"📊 Models loaded: {len(model_registry.loaded())} (process RSS {rss_mb():.0f} MB)")
     print("💡 Use our RAG engine (test_rag_fixed.py) for complete RAG functionality")
\ No newline at end of file
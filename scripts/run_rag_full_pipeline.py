@@ -1,98 +1,59 @@
 # 📝 File: rag_pipeline/scripts/run_full_pipeline.py
 #!/usr/bin/env python3
-"""Run complete RAG pipeline from start to finish"""
+"""Run complete RAG pipeline from start to finish
+
+Steps run in one process and share the embedding model / Chroma client.
+A step is skipped when its inputs, parameters and upstream steps are
+unchanged since its last successful run (use --force to rebuild).
+"""
 
 import sys
-import subprocess
-from pathlib import Path
+import argparse
 import time
+from pathlib import Path
 
-def run_step(step_script: str, step_name: str) -> bool:
-    """Run a pipeline step"""
-    print(f"\n{'='*60}")
-    print(f"🚀 RUNNING: {step_name}")
-    print(f"{'='*60}")
-    
-    start_time = time.time()
-    
-    try:
-        result = subprocess.run([
-            sys.executable, step_script
-        ], cwd=Path(__file__).parent, check=True, capture_output=False)
-        
-        elapsed = time.time() - start_time
-        print(f"\n✅ {step_name} completed in {elapsed:.1f}s")
-        return True
-        
-    except subprocess.CalledProcessError as e:
-        elapsed = time.time() - start_time
-        print(f"\n❌ {step_name} failed after {elapsed:.1f}s")
-        print(f"Error code: {e.returncode}")
-        return False
+# Add project root to Python path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.pipeline.runner import format_report
+from src.pipeline.rag_pipeline import create_runner
 
 def main():
     """Run full RAG pipeline"""
+    parser = argparse.ArgumentParser(description="Run the RAG pipeline (preprocess -> embed -> index -> answers/smoke_test)")
+    parser.add_argument("steps", nargs="*", help="Target steps (default: all); their dependencies run first")
+    parser.add_argument("--force", action="store_true", help="Re-run steps even if nothing changed")
+    parser.add_argument("--list", action="store_true", help="Print the steps in run order and exit")
+    args = parser.parse_args()
+
+    runner = create_runner(force=args.force)
+    if args.list:
+        for name in runner.order():
+            deps = runner.steps[name].deps
+            print(f"{name}" + (f"  (after {', '.join(deps)})" if deps else ""))
+        return 0
+
     print("🌟 HÙNG PHÁT RAG PIPELINE - FULL EXECUTION")
     print("=" * 60)
-    print("This will run the complete RAG pipeline:")
-    print("1. Data Preprocessing")
-    print("2. Embedding Generation") 
-    print("3. Vector Indexing")
-    print("4. RAG Testing")
-    print("5. Facebook Testing")
-    print("6. Webhook Testing")
-    print("=" * 60)
-    
-    # Confirm execution
-    response = input("\n🤔 Do you want to proceed? (y/N): ").lower().strip()
-    if response != 'y':
-        print("❌ Pipeline execution cancelled")
-        return
-    
+
     total_start = time.time()
-    
-    # Pipeline steps
-    steps = [
-        ("01_preprocess_data.py", "Step 1: Data Preprocessing"),
-        ("02_generate_embeddings.py", "Step 2: Embedding Generation"),
-        ("03_build_index.py", "Step 3: Vector Indexing"),
-        ("04_test_rag.py", "Step 4: RAG Testing"),
-        ("05_start_facebook_bot.py", "Step 5: Facebook Testing"),
-        ("06_test_facebook_webhook.py", "Step 6: Webhook Testing")
-    ]
-    
-    # Execute steps
-    success_count = 0
-    for step_script, step_name in steps:
-        success = run_step(step_script, step_name)
-        if success:
-            success_count += 1
-        else:
-            print(f"\n💥 Pipeline failed at: {step_name}")
-            break
-    
-    # Final summary
+    report = runner.run(args.steps or None)
     total_elapsed = time.time() - total_start
-    
+
     print(f"\n{'='*60}")
     print("🎯 PIPELINE EXECUTION SUMMARY")
     print(f"{'='*60}")
-    print(f"⏱️  Total time: {total_elapsed:.1f}s")
-    print(f"✅ Successful steps: {success_count}/{len(steps)}")
-    
-    if success_count == len(steps):
-        print("🎉 FULL PIPELINE COMPLETED SUCCESSFULLY!")
-        print("\n🚀 Your RAG system is ready!")
-        print("   - ChromaDB indexed with product data")
-        print("   - LlamaIndex configured with Llama3")
-        print("   - Ready for queries and integration")
-        
-        print("\n🎯 Next actions:")
-        print("   - Test with custom queries")
-        print("   - Integrate with Facebook bot")
-        print("   - Deploy as API service")
-    else:
-        print("❌ Pipeline incomplete - please check errors above")
+    print(format_report(report))
+    print(f"⏱️  Wall time: {total_elapsed:.1f}s")
+
+    failed = [row["step"] for row in report if row["status"] in ("failed", "blocked")]
+    if failed:
+        print(f"❌ Pipeline incomplete - failed or blocked: {', '.join(failed)}")
+        return 1
+
+    print("🎉 FULL PIPELINE COMPLETED SUCCESSFULLY!")
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -1,8 +1,10 @@
 #import functools
+import os
 import sys
+import threading
+import time
 from pathlib import Path
-from flask import Flask, request
-import json
+from flask import Flask, request, Response
 
 # Add project paths
 project_root = Path(__file__).parent.parent
@@ -10,18 +12,58 @@ sys.path.append(str(project_root))
 sys.path.append(str(project_root / "facebook_bot"))
 
 try:
-    from facebook_bot.core.bot_handler import HungPhatBot
+    # The bot (RAG engine, models) is imported by the loader thread, not here
     from facebook_bot.config.facebook_config import FacebookConfig
+    from src.utils.metrics import metrics
+    from src.utils.logger import get_logger, log_payload
 except ImportError as e:
     print(f"[ERROR] Import failed: {e}")
     print("[INFO] Please install dependencies: pip install flask requests")
     sys.exit(1)
 
+logger = get_logger("server")
+
 # Initialize Flask app
 app = Flask(__name__)
 
-# Initialize bot (will be done in main)
+# Initialize bot (in the background, started by create_app)
 bot = None
+bot_status = "not initialized"  # -> loading -> warming_up -> ready | failed
+bot_error = None
+
+def load_bot():
+    """Import and construct the bot, then load its models; /health answers meanwhile"""
+    global bot, bot_status, bot_error
+    start = time.perf_counter()
+    try:
+        bot_status = "loading"
+        from facebook_bot.core.bot_handler import HungPhatBot
+        bot = HungPhatBot()
+        
+        # Messages are accepted from here on; the first one waits for warm-up if needed
+        bot_status = "warming_up"
+        bot.warm_up()
+        bot_status = "ready"
+        logger.info(f"Bot ready in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        bot_status, bot_error = "failed", str(e)
+        logger.exception(f"Failed to load bot: {e}")
+
+# Requests being handled in this process (thread id -> start), for the pre-fork watchdog
+_in_flight = {}
+
+@app.before_request
+def track_request_start():
+    _in_flight[threading.get_ident()] = time.monotonic()
+
+@app.teardown_request
+def track_request_end(error=None):
+    _in_flight.pop(threading.get_ident(), None)
+
+def oldest_request_seconds() -> float:
+    """Age of the longest-running request in this process (0 when idle)"""
+    starts = list(_in_flight.values())
+    return time.monotonic() - min(starts) if starts else 0.0
 
 @app.route('/')
 def home():
@@ -37,12 +79,14 @@ def home():
 def health():
     """Detailed health check"""
     try:
-        rag_status = "ready" if bot and bot.rag_engine else "not initialized"
+        if bot_status == "failed":
+            return {"status": "unhealthy", "error": bot_error}, 503
         return {
-            "status": "healthy",
+            "status": "healthy" if bot_status == "ready" else "starting",
+            "pid": os.getpid(),
             "components": {
                 "flask_server": "running",
-                "rag_engine": rag_status,
+                "rag_engine": bot_status,
                 "facebook_webhook": "active"
             },
             "webhook_url": f"{request.host_url.rstrip('/')}{FacebookConfig.WEBHOOK_PATH}"
@@ -50,6 +94,11 @@ def health():
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}, 500
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Per-stage latency quantiles and counters in Prometheus text format"""
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/test')
 def test_endpoint():
     """Test endpoint for webhook verification"""
@@ -69,18 +118,18 @@ def webhook_verify():
         token = request.args.get('hub.verify_token')
         challenge = request.args.get('hub.challenge')
         
-        print(f"[WEBHOOK] Verification: mode={mode}, token={token}")
+        logger.info("Webhook verification request", extra={"mode": mode})
         
         # Check if mode and token are correct
         if mode == 'subscribe' and token == FacebookConfig.VERIFY_TOKEN:
-            print("[WEBHOOK] Verification successful!")
+            logger.info("Webhook verification successful")
             return challenge
         else:
-            print("[WEBHOOK] Verification failed!")
+            logger.warning("Webhook verification failed", extra={"mode": mode})
             return "Verification failed", 403
             
     except Exception as e:
-        print(f"[ERROR] Webhook verification error: {e}")
+        logger.exception(f"Webhook verification error: {e}")
         return "Verification error", 500
 
 @app.route(FacebookConfig.WEBHOOK_PATH, methods=['POST'])
@@ -88,13 +137,12 @@ def webhook_receive():
     """Receive messages from Facebook"""
     try:
         data = request.get_json()
-        print(f"[WEBHOOK] Received data: {json.dumps(data, indent=2)}")
-        sys.stdout.flush()
+        log_payload(logger, "Webhook payload", data)
         
         if not bot:
-            print("[ERROR] Bot not initialized")
-            sys.stdout.flush()
-            return "Bot not ready", 500
+            # Still starting: Facebook redelivers events that aren't acknowledged
+            logger.warning("Bot not ready", extra={"status": bot_status})
+            return "Bot not ready", 503
         
         # Process each entry
         for entry in data.get('entry', []):
@@ -115,8 +163,7 @@ def webhook_receive():
                         
                         # Process message and get response
                         response = bot.handle_message(sender_id, message_text)
-                        print(f"[RESPONSE] Text response to {sender_id}: {response}")
-                        sys.stdout.flush()
+                        logger.debug("Text message handled", extra={"sender_id": sender_id, "ok": response})
                     
                     # Handle attachments (images, files, etc.)
                     elif 'attachments' in message:                        
@@ -124,8 +171,7 @@ def webhook_receive():
                         
                         # Send response and log it
                         bot.messenger.send_message(sender_id, attachment_response)
-                        print(f"[RESPONSE] Attachment response to {sender_id}: {attachment_response}")
-                        sys.stdout.flush()
+                        logger.info("Attachment reply sent", extra={"sender_id": sender_id})
                 
                 # Handle postbacks (button clicks)
                 elif 'postback' in messaging_event:
@@ -134,29 +180,22 @@ def webhook_receive():
                     
                     # Process postback and get response
                     response = bot.handle_postback(sender_id, payload)
-                    print(f"[RESPONSE] Postback response to {sender_id}: {response}")
-                    sys.stdout.flush()
+                    logger.debug("Postback handled", extra={"sender_id": sender_id, "payload": payload, "ok": response})
                 
                 # Handle delivery receipts and read confirmations
                 elif 'delivery' in messaging_event:
                     delivered_mids = messaging_event['delivery'].get('mids', [])
                     watermark = messaging_event['delivery'].get('watermark', 'unknown')
-                    print(f"[DELIVERY] Message delivered to {sender_id}: {len(delivered_mids)} messages, watermark={watermark}")
-                    sys.stdout.flush()
+                    logger.debug("Message delivered", extra={"sender_id": sender_id, "count": len(delivered_mids), "watermark": watermark})
                 
                 elif 'read' in messaging_event:
                     read_watermark = messaging_event['read'].get('watermark', 'unknown')
-                    print(f"[READ] Message read by {sender_id}: watermark={read_watermark}")
-                    sys.stdout.flush()
+                    logger.debug("Message read", extra={"sender_id": sender_id, "watermark": read_watermark})
         
         return "OK", 200
         
     except Exception as e:
-        print(f"[ERROR] Webhook processing error: {e}")
-        sys.stdout.flush()
-        import traceback
-        print(f"[ERROR] Full traceback: {traceback.format_exc()}")
-        sys.stdout.flush()
+        logger.exception(f"Webhook processing error: {e}")
         return "Processing error", 500
 
 @app.errorhandler(404)
@@ -167,35 +206,59 @@ def not_found(error):
 def internal_error(error):
     return {"error": "Internal server error", "details": str(error)}, 500
 
-def create_app():
-    """Create and configure Flask app"""
-    global bot
+def create_app(background: bool = True):
+    """Create and configure Flask app
+    
+    background=False (pre-fork master, see gunicorn.conf.py) loads everything
+    before returning, so forked workers inherit loaded models.
+    """
+    global bot, bot_status
     
     try:
-        print("[INFO] Starting Hung Phat Facebook Bot Server...")
+        logger.info("Starting Hung Phat Facebook Bot Server...")
         
         # Validate configuration
         FacebookConfig.print_config_status()
         FacebookConfig.validate_config()
         
-        # Initialize bot
-        print("[INFO] Initializing bot...")
-        bot = HungPhatBot()
+        if not background:
+            from facebook_bot.core.bot_handler import HungPhatBot
+            from config.settings import Config
+            bot = HungPhatBot()
+            
+            # A follow-up can reach a different worker: keep conversations in SQLite
+            sqlite_path = Config.SERVING.get("conversation_sqlite_path")
+            if sqlite_path:
+                bot.rag_engine.conversations.use_backend(Config.PROJECT_ROOT / sqlite_path)
+            
+            bot.preload()
+            bot_status = "ready"
+            logger.info("Models loaded, ready to fork workers")
+            return app
         
-        print("[SUCCESS] Server ready!")
+        # Load the bot and its models in the background so the server is up immediately
+        logger.info("Initializing bot in the background...")
+        threading.Thread(target=load_bot, name="bot-loader", daemon=True).start()
+        
+        logger.info("Server ready")
         return app
         
     except Exception as e:
-        print(f"[ERROR] Failed to create app: {e}")
+        logger.exception(f"Failed to create app: {e}")
         raise
 
+def after_fork():
+    """Pre-fork worker start: restart what didn't survive fork()"""
+    if bot is not None:
+        bot.after_fork()
+
 if __name__ == '__main__':
     try:
         app = create_app()
         
-        print(f"[INFO] Starting server on port {FacebookConfig.WEBHOOK_PORT}...")
-        print(f"[INFO] Webhook URL: http://localhost:{FacebookConfig.WEBHOOK_PORT}{FacebookConfig.WEBHOOK_PATH}")
-        print("[INFO] Use ngrok to expose this to Facebook!")
+        logger.info(f"Starting server on port {FacebookConfig.WEBHOOK_PORT}...")
+        logger.info(f"Webhook URL: http://localhost:{FacebookConfig.WEBHOOK_PORT}{FacebookConfig.WEBHOOK_PATH}")
+        logger.info("Use ngrok to expose this to Facebook!")
         
         # Run Flask app
         app.run(
@@ -206,6 +269,6 @@ if __name__ == '__main__':
         )
         
     except KeyboardInterrupt:
-        print("\n[INFO] Server stopped by user")
+        logger.info("Server stopped by user")
     except Exception as e:
-        print(f"[ERROR] Server error: {e}")
\ No newline at end of file
+        logger.exception(f"Server error: {e}")
\ No newline at end of file
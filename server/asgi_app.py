@@ -0,0 +1,187 @@
+"""ASGI webhook server (Starlette + uvicorn)
+
+    python server/asgi_app.py
+    uvicorn server.asgi_app:app --port 5000
+
+Same routes and responses as server/app.py. The webhook acknowledges each
+POST right away and answers in a background task: embedding, retrieval and
+formatting run on a small thread pool (serving.asgi_cpu_threads), while
+Ollama and Graph API calls are awaited on the event loop, so hundreds of
+conversations waiting on the LLM don't need hundreds of threads.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+# Add project paths
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "facebook_bot"))
+
+try:
+    # The bot (RAG engine, models) is imported by the loader task, not here
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, PlainTextResponse
+    from starlette.routing import Route
+    from config.settings import Config
+    from facebook_bot.config.facebook_config import FacebookConfig
+    from src.utils.metrics import metrics
+    from src.utils.logger import get_logger, log_payload
+except ImportError as e:
+    print(f"[ERROR] Import failed: {e}")
+    print("[INFO] Please install dependencies: pip install starlette uvicorn httpx")
+    sys.exit(1)
+
+logger = get_logger("server")
+
+# Initialize bot (in the background, started by the lifespan)
+bot = None
+bot_status = "not initialized"  # -> loading -> warming_up -> ready | failed
+bot_error = None
+
+# Message tasks still running (the loop only keeps weak references)
+_tasks = set()
+
+async def load_bot():
+    """Construct the bot and load its models on the CPU pool; /health answers meanwhile"""
+    global bot, bot_status, bot_error
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        bot_status = "loading"
+        from facebook_bot.core.bot_handler import HungPhatBot
+        from facebook_bot.core.async_bot_handler import AsyncHungPhatBot
+        sync_bot = await loop.run_in_executor(None, HungPhatBot)
+        bot = AsyncHungPhatBot(sync_bot, cpu_threads=Config.SERVING.get("asgi_cpu_threads", 4))
+
+        # Messages are accepted from here on; the first one waits for warm-up if needed
+        bot_status = "warming_up"
+        await loop.run_in_executor(None, sync_bot.warm_up)
+        bot_status = "ready"
+        logger.info(f"Bot ready in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        bot_status, bot_error = "failed", str(e)
+        logger.exception(f"Failed to load bot: {e}")
+
+@asynccontextmanager
+async def lifespan(app):
+    logger.info("Starting Hung Phat Facebook Bot Server (ASGI)...")
+    FacebookConfig.print_config_status()
+    FacebookConfig.validate_config()
+
+    # Load the bot and its models in the background so the server is up immediately
+    loader = asyncio.create_task(load_bot())
+    logger.info("Server ready")
+    yield
+
+    loader.cancel()
+    if _tasks:
+        await asyncio.wait(_tasks, timeout=10)
+    if bot is not None:
+        await bot.aclose()
+        bot.bot.shutdown()
+
+async def home(request: Request):
+    """Health check endpoint"""
+    return JSONResponse({
+        "status": "running",
+        "service": "Hung Phat Facebook Bot",
+        "webhook": f"POST {FacebookConfig.WEBHOOK_PATH}",
+        "health": "OK"
+    })
+
+async def health(request: Request):
+    """Detailed health check"""
+    if bot_status == "failed":
+        return JSONResponse({"status": "unhealthy", "error": bot_error}, status_code=503)
+    return JSONResponse({
+        "status": "healthy" if bot_status == "ready" else "starting",
+        "pid": os.getpid(),
+        "components": {
+            "asgi_server": "running",
+            "rag_engine": bot_status,
+            "facebook_webhook": "active",
+            "pending_messages": len(_tasks)
+        },
+        "webhook_url": f"{str(request.base_url).rstrip('/')}{FacebookConfig.WEBHOOK_PATH}"
+    })
+
+async def metrics_endpoint(request: Request):
+    """Per-stage latency quantiles and counters in Prometheus text format"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+async def test_endpoint(request: Request):
+    """Test endpoint for webhook verification"""
+    return JSONResponse({
+        "message": "Webhook server is working!",
+        "timestamp": str(Path(__file__).stat().st_mtime),
+        "webhook_path": FacebookConfig.WEBHOOK_PATH,
+        "verify_token": FacebookConfig.VERIFY_TOKEN
+    })
+
+async def webhook_verify(request: Request):
+    """Verify webhook with Facebook"""
+    mode = request.query_params.get('hub.mode')
+    token = request.query_params.get('hub.verify_token')
+    challenge = request.query_params.get('hub.challenge')
+
+    logger.info("Webhook verification request", extra={"mode": mode})
+    if mode == 'subscribe' and token == FacebookConfig.VERIFY_TOKEN:
+        logger.info("Webhook verification successful")
+        return PlainTextResponse(challenge or "")
+    logger.warning("Webhook verification failed", extra={"mode": mode})
+    return PlainTextResponse("Verification failed", status_code=403)
+
+async def webhook_receive(request: Request):
+    """Receive messages from Facebook: acknowledge now, answer in the background"""
+    try:
+        data = await request.json()
+        log_payload(logger, "Webhook payload", data)
+
+        if not bot:
+            # Still starting: Facebook redelivers events that aren't acknowledged
+            logger.warning("Bot not ready", extra={"status": bot_status})
+            return PlainTextResponse("Bot not ready", status_code=503)
+
+        for entry in data.get('entry', []):
+            for messaging_event in entry.get('messaging', []):
+                task = asyncio.create_task(bot.handle_event(messaging_event))
+                _tasks.add(task)
+                task.add_done_callback(_tasks.discard)
+
+        return PlainTextResponse("OK")
+
+    except Exception as e:
+        logger.exception(f"Webhook processing error: {e}")
+        return PlainTextResponse("Processing error", status_code=500)
+
+async def not_found(request: Request, exc):
+    return JSONResponse({"error": "Endpoint not found", "webhook": FacebookConfig.WEBHOOK_PATH}, status_code=404)
+
+async def internal_error(request: Request, exc):
+    return JSONResponse({"error": "Internal server error", "details": str(exc)}, status_code=500)
+
+app = Starlette(
+    routes=[
+        Route("/", home),
+        Route("/health", health),
+        Route("/metrics", metrics_endpoint),
+        Route("/test", test_endpoint),
+        Route(FacebookConfig.WEBHOOK_PATH, webhook_verify, methods=["GET"]),
+        Route(FacebookConfig.WEBHOOK_PATH, webhook_receive, methods=["POST"]),
+    ],
+    exception_handlers={404: not_found, 500: internal_error},
+    lifespan=lifespan,
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    logger.info(f"Starting server on port {FacebookConfig.WEBHOOK_PORT}...")
+    logger.info(f"Webhook URL: http://localhost:{FacebookConfig.WEBHOOK_PORT}{FacebookConfig.WEBHOOK_PATH}")
+    uvicorn.run(app, host='0.0.0.0', port=FacebookConfig.WEBHOOK_PORT, log_level="warning")
@@ -0,0 +1,89 @@
+"""Pre-fork production server (Linux/macOS)
+
+    gunicorn -c server/gunicorn.conf.py
+
+The master process loads the bot once - embedding model, Chroma collection
+and its HNSW index, intent centroids, Llama3 warm-up - then forks the
+workers, which share those read-only pages copy-on-write. gc.freeze() keeps
+the garbage collector from touching (and so copying) them in the workers.
+
+Supervision: gunicorn replaces workers that exit or stop heartbeating for
+worker_timeout_seconds; the watchdog below recycles a worker whose oldest
+request has run past request_timeout_seconds; workers are recycled after
+max_requests. Settings: `serving` in config/models.yaml.
+"""
+
+import gc
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import Config
+from facebook_bot.config.facebook_config import FacebookConfig
+
+settings = Config.SERVING
+cores = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{FacebookConfig.WEBHOOK_PORT}"
+workers = Config.SERVING_WORKERS or cores
+worker_class = "gthread"
+threads = settings.get("threads", 8)
+preload_app = True
+wsgi_app = "server.app:create_app(background=False)"
+chdir = str(project_root)
+
+timeout = settings.get("worker_timeout_seconds", 60)
+graceful_timeout = 30
+max_requests = settings.get("max_requests", 0)
+max_requests_jitter = max_requests // 10
+
+request_timeout = settings.get("request_timeout_seconds", 180)
+torch_threads = settings.get("torch_threads") or max(1, cores // workers)
+
+# Forking while another thread holds a lock can deadlock the child. The master
+# (which preloads the app after reading this file) keeps torch / tokenizers
+# single-threaded; the template watcher is stopped at the end of preload and
+# the log listener is stopped around each fork (src/utils/logger.py). Workers
+# restart both and get their own torch pool in post_fork, and a new Ollama
+# HTTP client so they don't share the master's pooled connection
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+try:
+    import torch
+    torch.set_num_threads(1)
+except ImportError:
+    pass
+
+def when_ready(server):
+    # Everything loaded so far lives for the whole process: stop tracking it
+    gc.freeze()
+    server.log.info(f"Models loaded in master, forking {workers} workers ({threads} threads each)")
+
+def post_fork(server, worker):
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+    from server import app as server_app
+    server_app.after_fork()
+
+    def watchdog():
+        while worker.alive:
+            time.sleep(5)
+            stuck = server_app.oldest_request_seconds()
+            if stuck > request_timeout:
+                # Stop accepting, let the other requests finish, master forks a replacement
+                worker.log.error(f"Request stuck for {stuck:.0f}s, recycling worker {worker.pid}")
+                worker.alive = False
+
+    threading.Thread(target=watchdog, name="worker-watchdog", daemon=True).start()
+
+def worker_exit(server, worker):
+    server.log.info(f"Worker {worker.pid} exited")
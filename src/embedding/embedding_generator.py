@@ -9,9 +9,9 @@ from config.settings import Config
 class EmbeddingGenerator:
     """Generate embeddings for documents"""
     
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, client: SentenceTransformerClient = None):
         self.model_name = model_name or Config.EMBEDDING_MODEL
-        self.client = SentenceTransformerClient(self.model_name)
+        self.client = client or SentenceTransformerClient(self.model_name)
         
     def load_documents(self, docs_path: Path) -> List[Dict]:
         """Load documents from JSON"""
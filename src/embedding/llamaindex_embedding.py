@@ -0,0 +1,43 @@
+from typing import Any, List
+
+from llama_index.bridge.pydantic import PrivateAttr
+from llama_index.embeddings.base import BaseEmbedding
+
+from config.settings import Config
+from src.embedding.sentence_transformer_client import SentenceTransformerClient
+
+class SharedSentenceTransformerEmbedding(BaseEmbedding):
+    """LlamaIndex embedding interface over our SentenceTransformerClient
+
+    Replaces HuggingFaceEmbedding, which loaded its own copy of the same
+    weights; this one uses the model from the process-wide registry.
+    """
+
+    _client: Any = PrivateAttr()
+    _normalize: bool = PrivateAttr()
+
+    def __init__(self, client: SentenceTransformerClient = None, model_name: str = None,
+                 normalize: bool = None, **kwargs: Any):
+        model_name = model_name or (client.model_name if client else Config.EMBEDDING_MODEL)
+        super().__init__(model_name=model_name, **kwargs)
+        self._client = client or SentenceTransformerClient(model_name)
+        self._normalize = Config.EMBEDDING_NORMALIZE if normalize is None else normalize
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "SharedSentenceTransformerEmbedding"
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        return self._client.encode(texts, normalize_embeddings=self._normalize, show_progress=False).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from src.utils.metrics import metrics
+from src.utils.logger import get_logger
+
+logger = get_logger("models")
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def resolve_device(device: str = None) -> str:
+    """'auto' / None -> cuda when available, else cpu"""
+    if device in (None, "auto"):
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    return device
+
+def _load_sentence_transformer(model_name: str, device: str, **kwargs):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device, **kwargs)
+
+def _load_cross_encoder(model_name: str, device: str, **kwargs):
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name, device=device, **kwargs)
+
+BACKENDS: Dict[str, Callable] = {
+    "sentence_transformer": _load_sentence_transformer,
+    "cross_encoder": _load_cross_encoder,
+}
+
+class ModelHandle:
+    """Shared view of one loaded model
+
+    Inference on sentence-transformers models is thread-safe (no state is
+    written during encode/predict), so callers on different threads run their
+    forward passes concurrently. Any other attribute is read straight from
+    the model.
+    """
+
+    def __init__(self, key: Tuple, model):
+        self.key = key
+        self.model_name, self.backend, self.device = key[:3]
+        self.model = model
+
+    def encode(self, *args, **kwargs):
+        return self.model.encode(*args, **kwargs)
+
+    def predict(self, *args, **kwargs):
+        return self.model.predict(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+class ModelRegistry:
+    """Process-wide cache: each (model, backend, device) is loaded once
+
+    Everything that needs the embedding model (RAGEngine, EmbeddingGenerator,
+    the LlamaIndex adapter, scripts) goes through here, so the weights exist
+    once per process however many clients wrap them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._handles: Dict[Tuple, ModelHandle] = {}
+        self.loads: List[Dict] = []
+
+    def get(self, model_name: str, backend: str = "sentence_transformer", device: str = None,
+            **kwargs) -> ModelHandle:
+        """Handle for the model, loading it on first use (other callers wait for that load)"""
+        device = resolve_device(device)
+        key = (model_name, backend, device, tuple(sorted(kwargs.items())))
+        handle = self._handles.get(key)
+        if handle is not None:
+            return handle
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            handle = self._handles.get(key)
+            if handle is not None:
+                return handle
+
+            rss_before = rss_mb()
+            start = time.perf_counter()
+            model = BACKENDS[backend](model_name, device, **kwargs)
+            load = {
+                "model": model_name, "backend": backend, "device": device,
+                "seconds": round(time.perf_counter() - start, 2),
+                "rss_before_mb": round(rss_before, 1), "rss_after_mb": round(rss_mb(), 1),
+            }
+            self.loads.append(load)
+            metrics.inc("models_loaded", backend=backend)
+            logger.info(f"Loaded {backend} {model_name} on {device}", extra=load)
+
+            handle = self._handles[key] = ModelHandle(key, model)
+            return handle
+
+    def loaded(self) -> List[Tuple]:
+        return list(self._handles)
+
+    def clear(self) -> None:
+        """Forget all handles (models are freed once no client holds them)"""
+        with self._lock:
+            self._handles.clear()
+            self._key_locks.clear()
+
+model_registry = ModelRegistry()
@@ -1,25 +1,27 @@
 # 📝 File: rag_pipeline/src/embedding/sentence_transformer_client.py
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from typing import List, Union
-import torch
+from src.embedding.model_registry import model_registry
+from src.utils.logger import get_logger
+
+logger = get_logger("embedding")
 
 class SentenceTransformerClient:
-    """Wrapper for sentence-transformers models"""
+    """Wrapper for sentence-transformers models (weights shared through the model registry)"""
     
-    def __init__(self, model_name: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"):
+    def __init__(self, model_name: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+                 device: str = None):
         self.model_name = model_name
         self.model = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = device  # None: cuda when available, picked at load time
         
     def load_model(self):
-        """Load the sentence transformer model"""
-        print(f"📥 Loading model: {self.model_name}")
-        print(f"🔧 Using device: {self.device}")
-        
-        self.model = SentenceTransformer(self.model_name, device=self.device)
-        
-        print("✅ Model loaded successfully")
+        """Load the sentence transformer model (shared with every other client of the same model)"""
+        if self.model is None:
+            handle = model_registry.get(self.model_name, device=self.device)
+            self.device = handle.device
+            self.model = handle
+            logger.info("Embedding model ready", extra={"model": self.model_name, "device": self.device})
         return self.model
     
     def encode(self, texts: Union[str, List[str]], 
@@ -34,8 +36,6 @@ class SentenceTransformerClient:
         if isinstance(texts, str):
             texts = [texts]
         
-        print(f"🔢 Generating embeddings for {len(texts)} texts...")
-        
         embeddings = self.model.encode(
             texts,
             batch_size=batch_size,
@@ -44,7 +44,7 @@ class SentenceTransformerClient:
             convert_to_numpy=True
         )
         
-        print(f"✅ Generated embeddings: {embeddings.shape}")
+        logger.debug("Generated embeddings", extra={"texts": len(texts), "shape": list(embeddings.shape)})
         return embeddings
     
     def get_embedding_dimension(self) -> int:
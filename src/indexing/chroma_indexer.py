@@ -1,6 +1,4 @@
 # 📝 File: rag_pipeline/src/indexing/chroma_indexer.py
-import chromadb
-from chromadb.config import Settings
 from typing import List, Dict
 from pathlib import Path
 import json
@@ -17,7 +15,9 @@ class ChromaIndexer:
         # Create directory
         self.persist_directory.mkdir(parents=True, exist_ok=True)
         
-        # Initialize ChromaDB client
+        # Initialize ChromaDB client (imported here: chromadb takes ~1s to import)
+        import chromadb
+        from chromadb.config import Settings
         self.client = chromadb.PersistentClient(
             path=str(self.persist_directory),
             settings=Settings(anonymized_telemetry=False)
@@ -138,6 +138,23 @@ class ChromaIndexer:
         
         return results
     
+    def get_by_ids(self, ids: List[str]) -> Dict:
+        """Fetch documents by id, in search() result format and in the given order"""
+        if self.collection is None:
+            self.create_collection()
+        
+        results = self.collection.get(ids=list(ids), include=['documents', 'metadatas'])
+        rows = {doc_id: (doc, metadata) for doc_id, doc, metadata
+                in zip(results['ids'], results['documents'], results['metadatas'])}
+        found = [doc_id for doc_id in ids if doc_id in rows]
+        
+        return {
+            "ids": [found],
+            "documents": [[rows[doc_id][0] for doc_id in found]],
+            "metadatas": [[rows[doc_id][1] for doc_id in found]],
+            "distances": [[0.0] * len(found)],
+        }
+    
     def get_collection_info(self) -> Dict:
         """Get collection information"""
         if self.collection is None:
@@ -2,28 +2,25 @@
 
 from llama_index import VectorStoreIndex, StorageContext, ServiceContext
 from llama_index.vector_stores import ChromaVectorStore
-from llama_index.embeddings import HuggingFaceEmbedding
 from llama_index.llms import Ollama
 import chromadb
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from config.settings import Config
+from src.embedding.llamaindex_embedding import SharedSentenceTransformerEmbedding
 
 class LlamaIndexBuilder:
     """Build LlamaIndex with ChromaDB backend - FIXED VERSION"""
     
-    def __init__(self, chroma_client=None):  # ← ADD: Accept existing client
+    def __init__(self, chroma_client=None, embedding_client=None):  # ← ADD: Accept existing client
         self.chroma_client = chroma_client  # ← REUSE existing client
         self.vector_store = None
         self.index = None
         self.query_engine = None
         
-        # Setup embedding model
-        self.embed_model = HuggingFaceEmbedding(
-            model_name=Config.EMBEDDING_MODEL,
-            max_length=Config.MAX_LENGTH
-        )
+        # Setup embedding model (same weights as RAGEngine / indexing, via the model registry)
+        self.embed_model = SharedSentenceTransformerEmbedding(client=embedding_client)
         
         # Setup LLM
         self.llm = Ollama(
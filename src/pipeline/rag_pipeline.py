@@ -0,0 +1,124 @@
+import json
+import pickle
+from typing import Dict, List
+
+from config.settings import Config
+from src.pipeline.runner import PipelineContext, PipelineRunner, Step
+
+CLEANED_CSV_PATH = Config.PROCESSED_DATA_DIR / "cleaned_data.csv"
+DOCUMENTS_PATH = Config.PROCESSED_DATA_DIR / "documents.json"
+CHUNKS_PATH = Config.PROCESSED_DATA_DIR / "chunks.json"
+EMBEDDINGS_PATH = Config.PROCESSED_DATA_DIR / "embeddings.pkl"
+STATE_PATH = Config.PROCESSED_DATA_DIR / "pipeline_state.json"
+
+SMOKE_TEST_QUERIES = ["vali 20 inch", "balo laptop", "túi xách"]
+
+# Heavy imports stay inside the steps so a fully skipped run never loads torch
+
+def embedding_client(context: PipelineContext):
+    """One SentenceTransformer model for every step of the run"""
+    from src.embedding.sentence_transformer_client import SentenceTransformerClient
+    return context.get_or_create("embedding_client", lambda: SentenceTransformerClient(Config.EMBEDDING_MODEL))
+
+def chroma_indexer(context: PipelineContext):
+    from src.indexing.chroma_indexer import ChromaIndexer
+    return context.get_or_create("chroma_indexer", ChromaIndexer)
+
+def rag_engine(context: PipelineContext):
+    def create():
+        from src.query.rag_engine import RAGEngine
+        rag = RAGEngine(chroma_indexer=chroma_indexer(context), embedding_client=embedding_client(context))
+        rag.templates.stop_watching()
+        rag.initialize()
+        return rag
+    return context.get_or_create("rag_engine", create)
+
+def latest_csv() -> List:
+    try:
+        return [Config.get_latest_csv()]
+    except FileNotFoundError:
+        return [Config.CSV_PATH]
+
+def preprocess(context: PipelineContext) -> Dict:
+    from src.preprocessing.data_cleaner import DataCleaner
+    from src.preprocessing.text_processor import TextProcessor
+    from src.preprocessing.chunking import DocumentChunker
+
+    Config.create_directories()
+    cleaner = DataCleaner(latest_csv()[0])
+    cleaned_df = cleaner.clean_data()
+    cleaner.save_cleaned_data(CLEANED_CSV_PATH)
+
+    documents = [TextProcessor.create_product_document(row) for _, row in cleaned_df.iterrows()]
+    with open(DOCUMENTS_PATH, 'w', encoding='utf-8') as f:
+        json.dump(documents, f, ensure_ascii=False, indent=2)
+
+    chunker = DocumentChunker(chunk_size=Config.CHUNK_SIZE, chunk_overlap=Config.CHUNK_OVERLAP)
+    chunks = chunker.chunk_documents(documents)
+    chunker.save_chunks(chunks, CHUNKS_PATH)
+    return {"records": len(cleaned_df), "documents": len(documents), "chunks": len(chunks)}
+
+def embed(context: PipelineContext) -> Dict:
+    from src.embedding.embedding_generator import EmbeddingGenerator
+
+    generator = EmbeddingGenerator(client=embedding_client(context))
+    embedding_data = generator.generate_embeddings(generator.load_documents(DOCUMENTS_PATH))
+    generator.save_embeddings(embedding_data, EMBEDDINGS_PATH)
+    context.shared["embedding_data"] = embedding_data
+    return {"documents": embedding_data['metadata']['num_documents']}
+
+def index(context: PipelineContext) -> Dict:
+    embedding_data = context.shared.get("embedding_data")
+    if embedding_data is None:
+        with open(EMBEDDINGS_PATH, 'rb') as f:
+            embedding_data = pickle.load(f)
+
+    indexer = chroma_indexer(context)
+    indexer.create_collection(reset=True)
+    indexer.index_documents(embedding_data)
+    info = indexer.get_collection_info()
+    if info['status'] != 'ready':
+        raise RuntimeError(f"ChromaDB not ready after indexing: {info}")
+    return {"indexed": info['document_count']}
+
+def precompute_answers(context: PipelineContext) -> Dict:
+    from src.query.precomputed_answers import PrecomputedAnswers
+    return {"answers": PrecomputedAnswers(rag_engine(context)).build()}
+
+def smoke_test(context: PipelineContext) -> Dict:
+    """Vector search must return products for a few basic queries (no LLM)"""
+    rag = rag_engine(context)
+    for query in SMOKE_TEST_QUERIES:
+        results = rag.query_vector_only(query, n_results=3)
+        if not results['documents'][0]:
+            raise RuntimeError(f"Smoke test query returned nothing: {query}")
+    return {"queries": len(SMOKE_TEST_QUERIES)}
+
+def build_steps() -> List[Step]:
+    """preprocess -> embed -> index -> {smoke_test, answers}"""
+    from src.query.precomputed_answers import fixed_questions
+
+    return [
+        Step("preprocess", preprocess,
+             inputs=latest_csv,
+             outputs=[CLEANED_CSV_PATH, DOCUMENTS_PATH, CHUNKS_PATH],
+             params=lambda: {"chunk_size": Config.CHUNK_SIZE, "chunk_overlap": Config.CHUNK_OVERLAP}),
+        Step("embed", embed,
+             inputs=lambda: [DOCUMENTS_PATH],
+             outputs=[EMBEDDINGS_PATH],
+             params=lambda: {"model": Config.EMBEDDING_MODEL, "normalize": Config.EMBEDDING_NORMALIZE},
+             deps=["preprocess"]),
+        Step("index", index,
+             inputs=lambda: [EMBEDDINGS_PATH],
+             outputs=[Config.VECTORSTORE_DIR],
+             params=lambda: {"collection": Config.COLLECTION_NAME, "distance": Config.VECTORSTORE_DISTANCE},
+             deps=["embed"]),
+        Step("smoke_test", smoke_test, deps=["index"],
+             params=lambda: {"queries": SMOKE_TEST_QUERIES}),
+        Step("answers", precompute_answers, deps=["index"],
+             outputs=[Config.PRECOMPUTED_ANSWERS_PATH],
+             params=lambda: {"questions": fixed_questions(), "model": Config.LLM_MODEL}),
+    ]
+
+def create_runner(force: bool = False) -> PipelineRunner:
+    return PipelineRunner(build_steps(), STATE_PATH, force=force)
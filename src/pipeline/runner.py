@@ -0,0 +1,169 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger("pipeline")
+
+def file_fingerprint(path: Path) -> str:
+    """sha256 of a file's content ('missing' if it doesn't exist)"""
+    path = Path(path)
+    if not path.is_file():
+        return "missing"
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class Step:
+    """One pipeline node: a function plus what it reads, writes and depends on
+
+    ``inputs`` are files whose content is fingerprinted, ``params`` any
+    configuration that changes the result, ``outputs`` files or directories
+    that must exist for the step to count as done.
+    """
+
+    def __init__(self, name: str, func: Callable[["PipelineContext"], Optional[Dict]],
+                 inputs: Callable[[], List[Path]] = None, outputs: List[Path] = None,
+                 params: Callable[[], Dict] = None, deps: List[str] = None):
+        self.name = name
+        self.func = func
+        self.inputs = inputs or (lambda: [])
+        self.outputs = outputs or []
+        self.params = params or (lambda: {})
+        self.deps = deps or []
+
+class PipelineContext:
+    """State shared by the steps of one run (loaded models, clients, results)"""
+
+    def __init__(self):
+        self.shared: Dict[str, object] = {}
+        self.results: Dict[str, Dict] = {}
+
+    def get_or_create(self, key: str, factory: Callable[[], object]):
+        if key not in self.shared:
+            self.shared[key] = factory()
+        return self.shared[key]
+
+class PipelineRunner:
+    """Run steps in dependency order in this process, skipping unchanged ones
+
+    A step's fingerprint covers its input files, params and its dependencies'
+    fingerprints. It is skipped when that fingerprint matches the last
+    successful run and its outputs are still present and unchanged.
+    """
+
+    def __init__(self, steps: List[Step], state_path: Path, force: bool = False):
+        self.steps = {step.name: step for step in steps}
+        self.state_path = Path(state_path)
+        self.force = force
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict:
+        if self.state_path.exists():
+            try:
+                return json.loads(self.state_path.read_text(encoding="utf-8"))
+            except ValueError:
+                logger.warning(f"Ignoring unreadable pipeline state {self.state_path}")
+        return {}
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.state_path.write_text(json.dumps(self.state, indent=2), encoding="utf-8")
+
+    def order(self, targets: List[str] = None) -> List[str]:
+        """Topological order of the targets and everything they depend on"""
+        ordered, visiting = [], set()
+
+        def visit(name):
+            if name in ordered:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle at step {name}")
+            if name not in self.steps:
+                raise ValueError(f"Unknown step {name}")
+            visiting.add(name)
+            for dep in self.steps[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for name in targets or list(self.steps):
+            visit(name)
+        return ordered
+
+    def fingerprint(self, step: Step, fingerprints: Dict[str, str]) -> str:
+        digest = hashlib.sha256(step.name.encode("utf-8"))
+        for path in step.inputs():
+            digest.update(f"{path}:{file_fingerprint(path)}".encode("utf-8"))
+        digest.update(json.dumps(step.params(), sort_keys=True, default=str).encode("utf-8"))
+        for dep in step.deps:
+            digest.update(fingerprints[dep].encode("utf-8"))
+        return digest.hexdigest()
+
+    def _outputs_intact(self, step: Step, recorded: Dict) -> bool:
+        for path in step.outputs:
+            path = Path(path)
+            if not path.exists():
+                return False
+            if path.is_file() and recorded.get("outputs", {}).get(str(path)) != file_fingerprint(path):
+                return False
+        return True
+
+    def run(self, targets: List[str] = None, context: PipelineContext = None) -> List[Dict]:
+        """Run (or skip) each step; a failed step skips everything depending on it"""
+        context = context or PipelineContext()
+        fingerprints: Dict[str, str] = {}
+        failed = set()
+        report = []
+
+        for name in self.order(targets):
+            step = self.steps[name]
+            if failed & set(step.deps):
+                failed.add(name)
+                report.append({"step": name, "status": "blocked", "seconds": 0.0})
+                continue
+
+            fingerprint = fingerprints[name] = self.fingerprint(step, fingerprints)
+            recorded = self.state.get(name, {})
+            if (not self.force and recorded.get("fingerprint") == fingerprint
+                    and self._outputs_intact(step, recorded)):
+                report.append({"step": name, "status": "skipped", "seconds": 0.0})
+                logger.info(f"Step {name} unchanged, skipping")
+                continue
+
+            logger.info(f"Running step {name}")
+            start = time.perf_counter()
+            try:
+                context.results[name] = step.func(context) or {}
+            except Exception as e:
+                elapsed = time.perf_counter() - start
+                logger.exception(f"Step {name} failed after {elapsed:.1f}s: {e}")
+                failed.add(name)
+                report.append({"step": name, "status": "failed", "seconds": elapsed, "error": str(e)})
+                continue
+            elapsed = time.perf_counter() - start
+
+            self.state[name] = {
+                "fingerprint": fingerprint,
+                "outputs": {str(path): file_fingerprint(path) for path in step.outputs if Path(path).is_file()},
+                "finished_at": time.time(),
+                "seconds": round(elapsed, 2),
+            }
+            self._save_state()
+            report.append({"step": name, "status": "ran", "seconds": elapsed, **context.results[name]})
+
+        return report
+
+def format_report(report: List[Dict]) -> str:
+    """Plain-text timing table"""
+    lines = [f"{'step':14s} {'status':8s} {'seconds':>8s}  details"]
+    for row in report:
+        details = ", ".join(f"{k}={v}" for k, v in row.items() if k not in ("step", "status", "seconds"))
+        lines.append(f"{row['step']:14s} {row['status']:8s} {row['seconds']:8.1f}  {details}")
+    lines.append(f"{'total':14s} {'':8s} {sum(row['seconds'] for row in report):8.1f}")
+    return "\n".join(lines)
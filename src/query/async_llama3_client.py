@@ -0,0 +1,152 @@
+import asyncio
+import time
+from typing import Dict, Optional, Set
+
+import httpx
+
+from config.settings import Config
+from src.query.llama3_client import Llama3Client, LLMError, LLMTimeout
+from src.utils.metrics import metrics
+from src.utils.slot_limiter import SlotLimiter
+
+class GenerationCancelled(Exception):
+    """Raised when a generation is superseded by a newer request with the same key"""
+
+class AsyncLlama3Client:
+    """Asyncio client for Llama3 via Ollama's HTTP API
+
+    One pooled httpx.AsyncClient is shared by all calls, and a slot limiter
+    caps in-flight generations at OLLAMA_NUM_PARALLEL so extra requests queue
+    here instead of inside Ollama; pass ``slots`` to share the limit with the
+    sync pipeline (RAGEngine.llm_slots). Passing ``key`` (e.g. the sender id) cancels that
+    key's previous generation; dropping the HTTP request makes Ollama stop it.
+    """
+
+    def __init__(self, model: str = None, host: str = None, keep_alive: str = None,
+                 max_concurrency: int = None, timeout: float = None, slots: SlotLimiter = None):
+        self.model = model or Config.LLM_MODEL
+        self.host = (host or Config.OLLAMA_HOST).rstrip("/")
+        self.keep_alive = keep_alive or Config.LLM_KEEP_ALIVE
+        self.slots = slots or SlotLimiter(max_concurrency or Config.OLLAMA_NUM_PARALLEL)
+        self.max_concurrency = self.slots.slots
+        self.timeout = timeout or Config.LLM_TIMEOUT
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._superseded: Set[asyncio.Task] = set()  # cancelled by cancel(), not by the caller
+        self.waiting = 0
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.host,
+                timeout=httpx.Timeout(None, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency + 2,
+                    max_keepalive_connections=self.max_concurrency + 2
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        self._ensure_client()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def cancel(self, key: str) -> bool:
+        """Drop the in-flight generation for a key (e.g. the user sent a newer message)"""
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            self._superseded.add(task)
+            task.cancel()
+            metrics.inc("llm_cancelled")
+            return True
+        return False
+
+    async def generate(self, prompt: str, system_prompt: str = None, key: str = None,
+                       timeout: float = None, timings: Dict = None, **kwargs) -> str:
+        """Generate a chat response; same options and errors (LLMError, LLMTimeout) as Llama3Client.generate
+
+        Raises GenerationCancelled when a newer call with the same key supersedes
+        it. A ``timings`` dict receives this call's queue_wait and generate seconds.
+        """
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "options": self._options(kwargs),
+            "keep_alive": self.keep_alive,
+            "stream": False,
+        }
+        return await self._run(payload, key, timeout or self.timeout, timings)
+
+    async def generate_with_prefix(self, static_prefix: str, dynamic_suffix: str, **kwargs) -> str:
+        """Static system prefix + per-request suffix (see Llama3Client.generate_with_prefix)"""
+        return await self.generate(prompt=dynamic_suffix, system_prompt=static_prefix, **kwargs)
+
+    async def _run(self, payload: Dict, key: Optional[str], timeout: float, timings: Dict = None) -> str:
+        if key is not None:
+            self.cancel(key)
+
+        task = asyncio.create_task(self._chat(payload, timeout, timings if timings is not None else {}))
+        if key is not None:
+            self._inflight[key] = task
+
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if task not in self._superseded:
+                raise  # the caller itself was cancelled (or the client closed)
+            raise GenerationCancelled(f"Generation for {key} superseded by a newer request")
+        except asyncio.TimeoutError as e:
+            metrics.inc("llm_timeouts")
+            raise LLMTimeout(f"Phản hồi bị timeout sau {timeout:.0f}s") from e
+        except Exception as e:
+            raise LLMError(f"Lỗi khi tạo phản hồi: {e!r}") from e
+        finally:
+            self._superseded.discard(task)
+            if key is not None and self._inflight.get(key) is task:
+                del self._inflight[key]
+
+    async def _chat(self, payload: Dict, timeout: float, timings: Dict) -> str:
+        client = self._ensure_client()
+
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self.slots.acquire_async()
+        finally:
+            self.waiting -= 1
+        timings["queue_wait"] = time.perf_counter() - queued
+        metrics.observe("llm.queue_wait", timings["queue_wait"])
+
+        start = time.perf_counter()
+        try:
+            with metrics.span("llm.generate"):
+                response = await asyncio.wait_for(client.post("/api/chat", json=payload), timeout)
+                response.raise_for_status()
+                data = response.json()
+        finally:
+            timings["generate"] = time.perf_counter() - start
+            self.slots.release()
+
+        self._record_load(data, "generate")
+        return data["message"]["content"]
+
+    # Same option defaults and cold-load reporting as the sync client
+    _options = Llama3Client._options
+    _record_load = Llama3Client._record_load
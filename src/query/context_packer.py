@@ -0,0 +1,172 @@
+import math
+import re
+from typing import Callable, Dict, List, Optional
+
+from config.settings import Config
+from src.utils.logger import get_logger
+from src.query.variant_grouping import group_by_parent, base_product_name
+
+logger = get_logger("context_packer")
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Per-variant fields shown as table columns when a product has several sizes
+VARIANT_COLUMNS = ("kích thước", "chi tiết", "trọng lượng", "dung tích")
+
+# Base priority of document fields when ranking what to keep (higher first)
+FIELD_PRIORITY = {
+    "kích thước": 3.0,
+    "chất liệu": 2.5,
+    "tính năng": 2.0,
+    "danh mục": 1.5,
+    "trọng lượng": 1.5,
+    "dung tích": 1.5,
+    "chi tiết": 1.0,
+}
+
+def approx_token_count(text: str) -> int:
+    """Fast llama3 token estimate: ~1 token per 3 UTF-8 bytes for Vietnamese text"""
+    return max(1, math.ceil(len(text.encode("utf-8")) / 3))
+
+class ContextPacker:
+    """Pack retrieved products into the prompt under a token budget
+
+    Variants of the same product are merged into one entry (with a compact
+    per-size table), fields are ranked by priority and overlap with the
+    question, and products are added best-first until the budget is spent.
+    """
+
+    def __init__(self, token_budget: int = None, count_tokens: Callable[[str], int] = None):
+        self.token_budget = token_budget or Config.CONTEXT_TOKEN_BUDGET
+        self.count_tokens = count_tokens or self._load_tokenizer() or approx_token_count
+
+    @staticmethod
+    def _load_tokenizer() -> Optional[Callable[[str], int]]:
+        """Exact counting with a HuggingFace llama3 tokenizer when configured and installed"""
+        if not Config.CONTEXT_TOKENIZER:
+            return None
+        try:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(Config.CONTEXT_TOKENIZER)
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+        except Exception as e:
+            logger.warning(f"Tokenizer {Config.CONTEXT_TOKENIZER} unavailable, using approximation: {e}")
+            return None
+
+    def pack(self, search_results: Dict, question: str, token_budget: int = None) -> str:
+        """Render retrieved products as prompt text within the token budget"""
+        budget = token_budget or self.token_budget
+        products = self._merge_variants(search_results)
+        question_terms = set(_WORD_RE.findall(question.lower()))
+
+        parts = []
+        used = 0
+        for i, product in enumerate(products, 1):
+            header = f"Sản phẩm {i}: {product['name']}"
+            header_tokens = self.count_tokens(header) + 1
+            if used + header_tokens > budget:
+                if parts:
+                    break
+                # Never leave the LLM without context: keep the best product, cut to fit
+                header = self._truncate(header, budget - 1)
+                header_tokens = self.count_tokens(header) + 1
+
+            lines = [header]
+            used += header_tokens
+            for line in self._rank_fields(product, question_terms):
+                line_tokens = self.count_tokens(line) + 1
+                if used + line_tokens > budget:
+                    continue  # a shorter, lower-ranked field may still fit
+                lines.append(line)
+                used += line_tokens
+
+            parts.append("\n".join(lines))
+
+        logger.debug(f"Packed {len(parts)}/{len(products)} products into ~{used}/{budget} tokens")
+        return "\n\n".join(parts)
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of text (plus an ellipsis) within max_tokens"""
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.count_tokens(text[:mid] + "…") <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        return text[:low].rstrip() + "…"
+
+    def _merge_variants(self, search_results: Dict) -> List[Dict]:
+        """One entry per parent product, ordered by its best-ranked variant"""
+        products = []
+        for group in group_by_parent(search_results):
+            # Variants collapsed at retrieval time travel in the metadata
+            variants = group["metadata"].get("variants") or group["variants"]
+            if not isinstance(variants, list):
+                variants = group["variants"]
+            name = group["metadata"].get("name", "N/A")
+            products.append({
+                "name": base_product_name(name) or name,
+                "fields": self._parse_fields(group["document"]),
+                "variants": [
+                    {"size": variant.get("size") or (variant.get("metadata") or {}).get("size", ""),
+                     "fields": self._parse_fields(variant["document"])}
+                    for variant in variants
+                ],
+                "url": group["metadata"].get("url", ""),
+                "distance": group["distance"],
+            })
+        return products
+
+    @staticmethod
+    def _parse_fields(doc: str) -> Dict[str, str]:
+        """Split 'Key: value' lines of a product document into fields"""
+        fields = {}
+        for line in doc.splitlines():
+            line = line.strip().lstrip("-• ").strip()
+            if ":" not in line:
+                continue
+            key, value = line.split(":", 1)
+            key, value = key.strip().lower(), value.strip()
+            if value and key != "tên sản phẩm":
+                fields[key] = value
+        return fields
+
+    def _rank_fields(self, product: Dict, question_terms: set) -> List[str]:
+        fields = dict(product["fields"])
+        variants = product["variants"]
+        if len(variants) > 1:
+            # Size-specific fields move into one table; shared fields stay as lines
+            for column in VARIANT_COLUMNS:
+                fields.pop(column, None)
+            fields["phiên bản"] = self._variant_table(variants)
+
+        def score(item):
+            key, value = item
+            if key == "phiên bản":
+                key = "kích thước"
+            overlap = len(question_terms & set(_WORD_RE.findall(f"{key} {value}".lower())))
+            return FIELD_PRIORITY.get(key, 0.5) + overlap
+
+        ranked = sorted(fields.items(), key=score, reverse=True)
+        return [
+            f"- {key.capitalize()}:{'' if value.startswith(chr(10)) else ' '}{value}"
+            for key, value in ranked
+        ]
+
+    @staticmethod
+    def _variant_table(variants: List[Dict]) -> str:
+        """Compact pipe table: one row per size, only columns that have data"""
+        rows = []
+        for variant in variants:
+            row = dict(variant["fields"])
+            if variant["size"]:
+                row["kích thước"] = variant["size"]
+            rows.append(row)
+
+        columns = [column for column in VARIANT_COLUMNS if any(row.get(column) for row in rows)]
+        if not columns:
+            return f"{len(variants)} phiên bản"
+        lines = [" | ".join(column.capitalize() for column in columns)]
+        lines.extend(" | ".join(row.get(column, "-") for column in columns) for row in rows)
+        return "\n  " + "\n  ".join(lines)
@@ -0,0 +1,237 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import List, Optional
+
+from config.settings import Config
+from src.utils.logger import get_logger
+from src.utils.metrics import metrics
+from src.utils.vietnamese_utils import fold_text
+
+logger = get_logger("conversations")
+
+# "cái đó giá bao nhiêu?", "mẫu này có màu đen không", "size 24 thì sao?" (accent-folded)
+_ANAPHORA_RE = re.compile(
+    r"\b(?:(?:cai|san pham|mau|loai|chiec|con|em) (?:do|nay|kia|tren|vua roi|vua nay|ban noi)"
+    r"|ca hai|hai cai|2 cai|thi sao|con gi nua|no co|cua no"
+    r"|(?:cai|mau|san pham|so) (?:thu )?(?:\d|nhat|hai|ba|dau tien|cuoi))\b"
+)
+# "loại nào rẻ hơn?", "còn mẫu khác không" - a new search in the same context
+_ALTERNATIVES_RE = re.compile(r"\b(?:khac|hon|loai nao|mau nao|cai nao|con (?:loai|mau|cai) nao)\b")
+_CATEGORY_RE = re.compile(r"\b(?:vali|va li|balo|ba lo|tui|xach|cap|tui xach)\b")
+_ORDINALS = {"1": 0, "nhat": 0, "dau tien": 0, "2": 1, "hai": 1, "3": 2, "ba": 2, "cuoi": -1}
+_ORDINAL_RE = re.compile(r"\b(?:cai|mau|san pham|so) (?:thu )?(\d|nhat|hai|ba|dau tien|cuoi)\b")
+
+# "màu" (colour) folds to the same "mau" as "mẫu" (model): "màu đỏ" would read as "mẫu đó"
+_COLOUR_RE = re.compile(r"\bm[àầ]u\b")
+
+def _fold_references(question: str) -> str:
+    """fold_text, with the colour word kept apart from "mẫu" """
+    return fold_text(_COLOUR_RE.sub("colour", unicodedata.normalize("NFC", question or "").lower()))
+
+def refers_to_previous(question: str) -> bool:
+    """Explicit reference to products shown before ("cái đó", "mẫu thứ 2", "thì sao")"""
+    return bool(_ANAPHORA_RE.search(_fold_references(question)))
+
+def names_category(question: str) -> bool:
+    return bool(_CATEGORY_RE.search(fold_text(question)))
+
+def asks_for_alternatives(question: str) -> bool:
+    return bool(_ALTERNATIVES_RE.search(fold_text(question)))
+
+def referenced_position(question: str) -> Optional[int]:
+    """Index of the product picked by an ordinal ("cái thứ 2" -> 1), if any"""
+    match = _ORDINAL_RE.search(_fold_references(question))
+    return _ORDINALS.get(match.group(1)) if match else None
+
+class Turn:
+    __slots__ = ("question", "answer", "at")
+
+    def __init__(self, question: str, answer: str, at: float):
+        self.question = question
+        self.answer = answer
+        self.at = at
+
+class Conversation:
+    """Recent turns and the products last shown to one sender"""
+    __slots__ = ("sender_id", "turns", "product_ids", "product_names", "last_embedding", "updated_at")
+
+    def __init__(self, sender_id: str, max_turns: int):
+        self.sender_id = sender_id
+        self.turns = deque(maxlen=max_turns)
+        self.product_ids: List[str] = []
+        self.product_names: List[str] = []
+        self.last_embedding = None  # query embedding of the last searched turn (memory only)
+        self.updated_at = 0.0
+
+class SQLiteConversationBackend:
+    """Write-through persistence so conversations survive a restart"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.reopen()
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "sender_id TEXT PRIMARY KEY, updated_at REAL, data TEXT)"
+            )
+
+    def reopen(self) -> None:
+        """Open a new connection (a connection must not be shared across fork())"""
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+        # WAL: readers in other worker processes don't block the writer
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+
+    def save(self, conversation: Conversation) -> None:
+        data = json.dumps({
+            "turns": [[turn.question, turn.answer, turn.at] for turn in conversation.turns],
+            "product_ids": conversation.product_ids,
+            "product_names": conversation.product_names,
+        }, ensure_ascii=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO conversations (sender_id, updated_at, data) VALUES (?, ?, ?)",
+                (conversation.sender_id, conversation.updated_at, data)
+            )
+
+    def load(self, sender_id: str, max_turns: int) -> Optional[Conversation]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT updated_at, data FROM conversations WHERE sender_id = ?", (sender_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[1])
+        conversation = Conversation(sender_id, max_turns)
+        conversation.turns.extend(Turn(*turn) for turn in data["turns"])
+        conversation.product_ids = data["product_ids"]
+        conversation.product_names = data.get("product_names", [])
+        conversation.updated_at = row[0]
+        return conversation
+
+    def purge(self, older_than: float) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM conversations WHERE updated_at < ?", (older_than,))
+
+class ConversationStore:
+    """Bounded per-sender memory: LRU order, TTL expiry, optional SQLite backing
+
+    The OrderedDict is kept in last-update order, so expired conversations are
+    always at the front and eviction is a cheap pop from the left. With
+    read_through (pre-fork workers), the SQLite copy wins when another
+    process updated the conversation more recently.
+    """
+
+    def __init__(self, max_turns: int = None, ttl_seconds: float = None,
+                 max_senders: int = None, sqlite_path: Path = None, read_through: bool = False):
+        settings = Config.CONVERSATION
+        self.max_turns = max_turns or settings.get("max_turns", 5)
+        self.ttl = ttl_seconds or settings.get("ttl_minutes", 30) * 60
+        self.max_senders = max_senders or settings.get("max_senders", 10000)
+        sqlite_path = sqlite_path or settings.get("sqlite_path")
+        self.backend = SQLiteConversationBackend(Config.PROJECT_ROOT / sqlite_path) if sqlite_path else None
+        self.read_through = read_through
+
+        self._lock = threading.Lock()
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._writes = 0
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def get(self, sender_id: str) -> Optional[Conversation]:
+        if not sender_id:
+            return None
+        now = time.time()
+        with self._lock:
+            conversation = self._conversations.get(sender_id)
+        if self.backend is not None and (conversation is None or self.read_through):
+            stored = self.backend.load(sender_id, self.max_turns)
+            if (stored is not None and now - stored.updated_at <= self.ttl
+                    and (conversation is None or stored.updated_at > conversation.updated_at)):
+                conversation = stored
+                with self._lock:
+                    self._insert_in_order(conversation)
+                    self._evict(now)
+        if conversation is None or now - conversation.updated_at > self.ttl:
+            return None
+        return conversation
+
+    def use_backend(self, sqlite_path: Path, read_through: bool = True) -> None:
+        """Persist to SQLite from now on (pre-fork mode: workers share conversations)"""
+        if self.backend is None:
+            self.backend = SQLiteConversationBackend(sqlite_path)
+        self.read_through = read_through
+
+    def after_fork(self) -> None:
+        self._lock = threading.Lock()
+        if self.backend is not None:
+            self.backend.reopen()
+
+    def record(self, sender_id: str, question: str, answer: str,
+               product_ids: List[str] = None, product_names: List[str] = None, embedding=None) -> None:
+        """Append a turn; product_ids / embedding replace the remembered ones when given"""
+        if not sender_id:
+            return
+        now = time.time()
+        with self._lock:
+            conversation = self._conversations.get(sender_id)
+            if conversation is None:
+                conversation = self._conversations[sender_id] = Conversation(sender_id, self.max_turns)
+            conversation.turns.append(Turn(question, answer, now))
+            if product_ids:
+                conversation.product_ids = list(product_ids)
+                conversation.product_names = list(product_names or [])
+            if embedding is not None:
+                conversation.last_embedding = embedding
+            conversation.updated_at = now
+            self._conversations.move_to_end(sender_id)
+            self._evict(now)
+
+        if self.backend is not None:
+            try:
+                self.backend.save(conversation)
+                self._writes += 1
+                if self._writes % 1000 == 0:
+                    self.backend.purge(now - self.ttl)
+            except Exception as e:
+                logger.warning(f"Could not persist conversation: {e}")
+
+    def _insert_in_order(self, conversation: Conversation) -> None:
+        """Place a conversation loaded from SQLite by its (older) updated_at
+
+        Appending it would put an older entry behind newer ones and stop
+        _evict's pop-left scan early; only the entries updated after it,
+        usually a handful at the end, are moved behind it.
+        """
+        sender_id = conversation.sender_id
+        self._conversations[sender_id] = conversation
+        self._conversations.move_to_end(sender_id)
+        newer = []
+        for key in reversed(self._conversations):
+            if key == sender_id:
+                continue
+            if self._conversations[key].updated_at <= conversation.updated_at:
+                break
+            newer.append(key)
+        for key in reversed(newer):
+            self._conversations.move_to_end(key)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired conversations, then least recently updated ones over the bound"""
+        evicted = 0
+        while self._conversations:
+            oldest = next(iter(self._conversations.values()))
+            if now - oldest.updated_at <= self.ttl and len(self._conversations) <= self.max_senders:
+                break
+            self._conversations.popitem(last=False)
+            evicted += 1
+        if evicted:
+            metrics.inc("conversations_evicted", evicted)
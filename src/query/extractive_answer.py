@@ -0,0 +1,68 @@
+import json
+import re
+from typing import Dict, List
+
+from src.query.variant_grouping import group_by_parent, base_product_name
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+MAX_FEATURES = 3
+
+def _features(metadata: Dict, document: str) -> List[str]:
+    """Feature list from metadata (JSON list written by the indexer) or the document text"""
+    raw = metadata.get("features")
+    if isinstance(raw, str) and raw.startswith("["):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raw = None
+    if isinstance(raw, list) and raw:
+        return [str(feature).strip() for feature in raw if str(feature).strip()]
+
+    for line in document.splitlines():
+        if line.lower().startswith("tính năng:"):
+            return [part.strip() for part in line.split(":", 1)[1].split(",") if part.strip()]
+    return []
+
+def _pick_features(features: List[str], question_terms: set) -> List[str]:
+    """Features sharing words with the question first, then in listed order"""
+    ranked = sorted(
+        enumerate(features),
+        key=lambda item: (-len(question_terms & set(_WORD_RE.findall(item[1].lower()))), item[0])
+    )
+    return [feature for _, feature in ranked[:MAX_FEATURES]]
+
+def extractive_answer(search_results: Dict, question: str, max_products: int = 3) -> str:
+    """Vietnamese answer assembled from retrieved metadata, no LLM involved
+
+    Used when the LLM is overloaded or failing: one entry per product (all
+    sizes merged) with size, material, the most relevant features and link.
+    """
+    groups = group_by_parent(search_results)[:max_products] if search_results["documents"][0] else []
+    if not groups:
+        return "Xin lỗi, tôi không tìm thấy thông tin phù hợp với câu hỏi của bạn."
+
+    question_terms = set(_WORD_RE.findall(question.lower()))
+    lines = [f"Dạ, bên mình có {len(groups)} sản phẩm phù hợp với nhu cầu của bạn:"]
+
+    for i, group in enumerate(groups, 1):
+        metadata = group["metadata"]
+        variants = metadata.get("variants") if isinstance(metadata.get("variants"), list) else group["variants"]
+        sizes = [variant.get("size") or (variant.get("metadata") or {}).get("size", "") for variant in variants]
+        sizes = list(dict.fromkeys(size for size in sizes if size))
+
+        lines.append("")
+        lines.append(f"{i}. {base_product_name(metadata.get('name', '')) or metadata.get('name', 'Sản phẩm')}")
+        if sizes:
+            lines.append(f"   • Kích thước: {', '.join(sizes)}")
+        if metadata.get("material"):
+            lines.append(f"   • Chất liệu: {metadata['material']}")
+        features = _pick_features(_features(metadata, group["document"]), question_terms)
+        if features:
+            lines.append(f"   • Nổi bật: {', '.join(features)}")
+        if metadata.get("url"):
+            lines.append(f"   • Xem chi tiết: {metadata['url']}")
+
+    lines.append("")
+    lines.append("Bạn muốn mình tư vấn kỹ hơn về sản phẩm nào không ạ?")
+    return "\n".join(lines)
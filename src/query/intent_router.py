@@ -0,0 +1,181 @@
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from config.settings import Config
+from src.query.conversation_store import names_category
+from src.utils.logger import get_logger
+from src.utils.vietnamese_utils import fold_text
+
+logger = get_logger("intent_router")
+
+PRODUCT_INTENT = "product"
+
+# Rules run on accent-folded lowercase text, so "cảm ơn" and "cam on" match alike
+INTENT_RULES = [
+    ("thanks", re.compile(r"^(?:(?:da|ok|oke|vang)\s+)?(?:cam on|cam onn|cmon|thank(?:s| you| u)?|tks|thx|tk)\b(?:\s+\w+){0,4}\W*$")),
+    ("greeting", re.compile(r"^(?:xin chao|chao|hi|hello|helo|hey|alo|shop oi|ad oi|admin oi)\b(?:\s+\w+){0,3}\W*$")),
+    ("acknowledgement", re.compile(r"^(?:ok|oke|okay|okie|okela|uk|uh|um|vang|da|duoc|dc|roi|hieu roi|de minh xem)(?:\s+(?:ok|oke|vang|da|duoc|roi|a|nhe|nha|shop|ban))*\W*$")),
+    ("store_hours", re.compile(r"\b(?:gio mo cua|mo cua|dong cua|gio lam viec|thoi gian lam viec|lam viec (?:den|tu) may gio|may gio (?:mo|dong))\b")),
+    ("price_range", re.compile(r"\b(?:tam gia|khoang gia|muc gia|bang gia|gia ca|gia dao dong|gia tu bao nhieu|gia re nhat|gia (?:the nao|bao nhieu)|bao nhieu tien)\b")),
+]
+
+# A price question naming a size, brand or model code is a product search
+_SPECIFIC_PRODUCT_RE = re.compile(
+    r"\b\d+\s*(?:inch|in|\")|\b(?:hung phat|uzo|startup|travelking|marcello|pika)\b|\b[a-z]{1,3}\d{2,}\b"
+)
+
+# ... and so is a greeting or thanks naming one, a category or a size ("hello vali", "chào shop balo laptop")
+_SIZE_RE = re.compile(r"\b(?:size|kich thuoc|cabin|ky gui)\b")
+
+# Example phrasings per intent for the nearest-centroid fallback
+INTENT_EXAMPLES = {
+    "greeting": ["xin chào", "chào shop", "hello shop ơi", "chào bạn, cho mình hỏi chút", "alo shop"],
+    "thanks": ["cảm ơn shop", "cảm ơn bạn nhiều nha", "thanks nhé", "ok cảm ơn", "cám ơn đã tư vấn"],
+    "acknowledgement": ["ok", "oke bạn", "vâng ạ", "dạ được rồi", "mình hiểu rồi", "để mình suy nghĩ thêm"],
+    "store_hours": ["cửa hàng mở cửa lúc mấy giờ", "shop làm việc đến mấy giờ", "chủ nhật có mở cửa không",
+                    "giờ làm việc của cửa hàng"],
+    "price_range": ["giá khoảng bao nhiêu", "tầm giá các sản phẩm thế nào", "bảng giá vali", "giá balo từ bao nhiêu tiền"],
+    PRODUCT_INTENT: ["vali 20 inch khóa TSA", "balo laptop chống sốc", "túi xách da nữ đi làm", "vali nhựa nhẹ cho chuyến đi 1 tuần",
+                     "vali size cabin màu hồng", "balo học sinh cấp 2", "so sánh vali nhựa và vali vải"],
+}
+
+# Keyword (accent-folded) -> category name used in store.price_ranges
+_PRICE_CATEGORIES = [("vali", "Vali"), ("balo", "Balo"), ("tui", "Túi xách"), ("xach", "Túi xách")]
+
+class IntentRouter:
+    """Cheap intent classification in front of the RAG pipeline
+
+    Regex rules catch the common phrasings; short messages the rules miss are
+    compared to per-intent centroids of example embeddings (computed once and
+    cached on disk). Anything not confidently chit-chat is a product query.
+    """
+
+    def __init__(self, embedding_client=None, threshold: float = None, margin: float = None,
+                 max_words: int = None, cache_path: Path = None):
+        settings = Config.INTENT_ROUTER
+        self.embedding_client = embedding_client
+        self.threshold = threshold or settings.get("centroid_threshold", 0.7)
+        self.margin = margin or settings.get("centroid_margin", 0.05)
+        self.max_words = max_words or settings.get("max_words", 8)
+        self.cache_path = Path(cache_path or Config.PROCESSED_DATA_DIR / "intent_centroids.npz")
+        self._intents = None
+        self._centroids = None
+
+    def classify(self, question: str) -> str:
+        text = fold_text(question)
+        if not text:
+            return "greeting"
+
+        intent = self._match_rules(text)
+        if intent is not None:
+            return intent
+
+        if self.embedding_client is None or len(text.split()) > self.max_words:
+            return PRODUCT_INTENT
+        try:
+            return self._nearest_centroid(question)
+        except Exception as e:
+            logger.warning(f"Centroid classification failed, treating as product query: {e}")
+            return PRODUCT_INTENT
+
+    def is_small_talk(self, question: str) -> bool:
+        """Rule-matched chit-chat other than price questions (which may be about earlier products)"""
+        return self._match_rules(fold_text(question)) not in (None, PRODUCT_INTENT, "price_range")
+
+    def _match_rules(self, text: str) -> Optional[str]:
+        for intent, pattern in INTENT_RULES:
+            if pattern.search(text):
+                if intent == "price_range" and _SPECIFIC_PRODUCT_RE.search(text):
+                    return PRODUCT_INTENT
+                if intent in ("greeting", "thanks") and (names_category(text) or _SPECIFIC_PRODUCT_RE.search(text)
+                                                         or _SIZE_RE.search(text)):
+                    return PRODUCT_INTENT
+                return intent
+        return None
+
+    def route(self, question: str) -> Tuple[str, Optional[str]]:
+        """(intent, instant response); response is None for product queries"""
+        intent = self.classify(question)
+        if intent == PRODUCT_INTENT:
+            return intent, None
+        return intent, self.respond(intent, question)
+
+    def warm_up(self) -> None:
+        """Load the centroids now rather than on the first short question"""
+        if self.embedding_client is None or self._centroids is not None:
+            return
+        try:
+            self._load_centroids()
+        except Exception as e:
+            logger.warning(f"Could not load intent centroids: {e}")
+
+    def _nearest_centroid(self, question: str) -> str:
+        if self._centroids is None:
+            self._load_centroids()
+        embedding = self.embedding_client.encode(question, show_progress=False).reshape(-1)
+        similarities = self._centroids @ embedding
+        best = int(np.argmax(similarities))
+        intent = self._intents[best]
+        product_similarity = similarities[self._intents.index(PRODUCT_INTENT)]
+        if (intent != PRODUCT_INTENT and similarities[best] >= self.threshold
+                and similarities[best] - product_similarity >= self.margin):
+            return intent
+        return PRODUCT_INTENT
+
+    def _load_centroids(self) -> None:
+        """Centroids from the on-disk cache, recomputed when the model or examples change"""
+        intents = sorted(INTENT_EXAMPLES)
+        fingerprint = hashlib.sha256(repr((Config.EMBEDDING_MODEL, [INTENT_EXAMPLES[i] for i in intents])).encode("utf-8")).hexdigest()
+
+        if self.cache_path.exists():
+            cached = np.load(self.cache_path)
+            if str(cached["fingerprint"]) == fingerprint:
+                self._intents, self._centroids = intents, cached["centroids"]
+                return
+
+        centroids = []
+        for intent in intents:
+            embeddings = self.embedding_client.encode(INTENT_EXAMPLES[intent], show_progress=False)
+            centroid = embeddings.mean(axis=0)
+            centroids.append(centroid / np.linalg.norm(centroid))
+        self._intents, self._centroids = intents, np.vstack(centroids)
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(self.cache_path, fingerprint=fingerprint, centroids=self._centroids)
+        logger.info(f"Cached {len(intents)} intent centroids", extra={"path": str(self.cache_path)})
+
+    def respond(self, intent: str, question: str) -> str:
+        store: Dict = Config.STORE_INFO
+        if intent == "greeting":
+            return ("Dạ V-CUTE xin chào bạn nha~ Mình chuyên tư vấn vali, balo và túi xách Hùng Phát. "
+                    "Bạn đang tìm sản phẩm cho chuyến đi hay đi học, đi làm ạ?")
+        if intent == "thanks":
+            return "Dạ không có chi nha~ Khi nào cần tư vấn thêm vali, balo hay túi xách cứ nhắn V-CUTE nhé, hihi!"
+        if intent == "acknowledgement":
+            return "Dạ vâng ạ! Bạn cần mình tư vấn thêm sản phẩm nào cứ nhắn nha~"
+        if intent == "store_hours":
+            parts = [f"Dạ, cửa hàng Hùng Phát mở cửa {store.get('hours', 'tất cả các ngày trong tuần')} ạ."]
+            if store.get("address"):
+                parts.append(f"Địa chỉ: {store['address']}.")
+            if store.get("hotline"):
+                parts.append(f"Hotline: {store['hotline']}.")
+            return " ".join(parts)
+        if intent == "price_range":
+            return self._price_answer(question, store.get("price_ranges") or {})
+        raise ValueError(f"No canned response for intent {intent}")
+
+    @staticmethod
+    def _price_answer(question: str, price_ranges: Dict[str, str]) -> str:
+        text = fold_text(question)
+        asked = [category for keyword, category in _PRICE_CATEGORIES if keyword in text]
+        asked = list(dict.fromkeys(category for category in asked if category in price_ranges)) or list(price_ranges)
+        if not asked:
+            return "Dạ, bạn cho mình biết loại sản phẩm và kích thước để mình báo giá chính xác nha~"
+        lines = ["Dạ, tầm giá tham khảo bên mình nè:"]
+        lines.extend(f"- {category}: {price_ranges[category]}" for category in asked)
+        lines.append("Bạn cho mình biết ngân sách và nhu cầu để mình gợi ý mẫu phù hợp nhất nha~")
+        return "\n".join(lines)
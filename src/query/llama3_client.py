@@ -2,17 +2,56 @@
 
 import ollama
 import subprocess
+import threading
 import time
+from datetime import datetime
+from config.settings import Config
+from src.utils.metrics import metrics
+from src.utils.logger import get_logger
+
+logger = get_logger("llm")
+
+# A request whose load_duration exceeds this had to load the model from disk
+COLD_LOAD_THRESHOLD_SECONDS = 1.0
+
+# Llama3 chat format, used for raw /api/generate calls with a cached prefix context
+LLAMA3_SYSTEM_TURN = "<|start_header_id|>system<|end_header_id|>\n\n{system}<|eot_id|>"
+LLAMA3_USER_TURN = "<|start_header_id|>user<|end_header_id|>\n\n{prompt}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n"
+
+class LLMError(Exception):
+    """Generation failed (Ollama unreachable, HTTP error, bad response)"""
+
+class LLMTimeout(LLMError):
+    """Generation did not finish in time"""
 
 class Llama3Client:
     """Client for Llama3 via Ollama - IMPROVED VERSION"""
     
-    def __init__(self, model: str = "llama3:8b", host: str = "http://localhost:11434"):
+    def __init__(self, model: str = "llama3:8b", host: str = "http://localhost:11434",
+                 keep_alive: str = None):
         self.model = model
         self.host = host
         self.client = ollama.Client(host=host)
         self.ollama_executable = r"C:\Users\DELL\AppData\Local\Programs\Ollama\ollama.exe"
         
+        # Model lifecycle: keep the model resident between requests
+        self.keep_alive = keep_alive or Config.LLM_KEEP_ALIVE
+        self._ping_stop = threading.Event()
+        self._ping_thread = None
+        
+        # Static prefix -> Ollama context tokens (prefix_mode "context")
+        self.prefix_mode = Config.LLM_PREFIX_MODE
+        self._prefix_contexts = {}
+        
+    def after_fork(self) -> None:
+        """New HTTP client in a pre-forked worker
+
+        The master's warm-up leaves a keep-alive connection in ollama.Client's
+        pool; sharing that socket across workers would interleave requests and
+        hand one worker's response to another.
+        """
+        self.client = ollama.Client(host=self.host)
+    
     def _ensure_ollama_running(self):
         """Ensure Ollama server is running"""
         import requests
@@ -21,10 +60,10 @@ class Llama3Client:
             # Test if server is responding
             response = requests.get(f"{self.host}/api/version", timeout=5)
             if response.status_code == 200:
-                print("✅ Ollama server is running")
+                logger.debug("Ollama server is running")
                 return True
         except:
-            print("⚠️  Ollama server not responding, trying to start...")
+            logger.warning("Ollama server not responding, trying to start it")
             
         # Try to start Ollama server
         try:
@@ -38,27 +77,27 @@ class Llama3Client:
             # Test again
             response = requests.get(f"{self.host}/api/version", timeout=5)
             if response.status_code == 200:
-                print("✅ Ollama server started successfully")
+                logger.info("Ollama server started")
                 return True
         except Exception as e:
-            print(f"❌ Failed to start Ollama server: {e}")
+            logger.error(f"Failed to start Ollama server: {e}")
             
         return False
         
+    @metrics.timed("llm.generate")
     def generate(self, prompt: str, system_prompt: str = None, **kwargs) -> str:
-        """Generate response using Llama3 - IMPROVED"""
+        """Generate response using Llama3 - IMPROVED
+        
+        Raises LLMError (LLMTimeout for timeouts) instead of returning an error
+        text, so callers can fall back rather than send it to a customer.
+        """
         
         # Ensure server is running
         if not self._ensure_ollama_running():
-            return "❌ Ollama server không khả dụng. Vui lòng khởi động Ollama manually."
+            raise LLMError("Ollama server không khả dụng. Vui lòng khởi động Ollama manually.")
         
         # Default parameters with longer timeout
-        options = {
-            "temperature": kwargs.get("temperature", 0.7),
-            "top_p": kwargs.get("top_p", 0.9),
-            "top_k": kwargs.get("top_k", 40),
-            "num_predict": kwargs.get("max_tokens", 1000),
-        }
+        options = self._options(kwargs)
         
         # Build messages
         messages = []
@@ -67,25 +106,149 @@ class Llama3Client:
         messages.append({"role": "user", "content": prompt})
         
         try:
-            print(f"🤖 Generating response with {self.model}...")
+            logger.debug("Generating response", extra={"model": self.model})
             
             # Add timeout to prevent hanging
             response = self.client.chat(
                 model=self.model,
                 messages=messages,
                 options=options,
-                # Add timeout if supported
+                keep_alive=self.keep_alive,
             )
+            self._record_load(response, "generate")
             
-            print("✅ Response generated successfully")
+            logger.debug("Response generated", extra={"model": self.model})
             return response['message']['content']
             
         except Exception as e:
             error_msg = str(e)
-            if "timeout" in error_msg.lower():
-                return f"⏱️  Phản hồi bị timeout. Model có thể đang tải, vui lòng thử lại."
-            else:
-                return f"❌ Lỗi khi tạo phản hồi: {error_msg}"
+            if "timeout" in error_msg.lower() or "timed out" in error_msg.lower():
+                metrics.inc("llm_timeouts")
+                raise LLMTimeout(f"Phản hồi bị timeout. Model có thể đang tải: {error_msg}") from e
+            raise LLMError(f"Lỗi khi tạo phản hồi: {error_msg}") from e
+    
+    def _options(self, kwargs) -> dict:
+        return {
+            "temperature": kwargs.get("temperature", 0.7),
+            "top_p": kwargs.get("top_p", 0.9),
+            "top_k": kwargs.get("top_k", 40),
+            "num_predict": kwargs.get("max_tokens", 1000),
+        }
+    
+    def generate_with_prefix(self, static_prefix: str, dynamic_suffix: str, **kwargs) -> str:
+        """Generate with a byte-identical static prefix followed by a per-request suffix
+        
+        "chat" mode sends the prefix as the system message, which Ollama's runner
+        keeps in its prompt cache between calls. "context" mode evaluates the
+        prefix once, caches the returned context tokens and continues from them.
+        """
+        if self.prefix_mode == "context":
+            try:
+                return self._generate_from_prefix_context(static_prefix, dynamic_suffix, kwargs)
+            except Exception as e:
+                logger.warning(f"Prefix context unavailable, falling back to chat: {e}")
+        return self.generate(prompt=dynamic_suffix, system_prompt=static_prefix, **kwargs)
+    
+    def _prefix_context(self, static_prefix: str) -> list:
+        """Context tokens for the static prefix alone (evaluated once per prefix)"""
+        context = self._prefix_contexts.get(static_prefix)
+        if context is None:
+            response = self.client.generate(
+                model=self.model,
+                prompt="<|begin_of_text|>" + LLAMA3_SYSTEM_TURN.format(system=static_prefix),
+                raw=True,
+                options={"num_predict": 1},
+                keep_alive=self.keep_alive,
+            )
+            # Drop the generated token(s): keep only the prefix's own tokens
+            generated = response.get('eval_count') or 0
+            context = response['context'][:len(response['context']) - generated]
+            self._prefix_contexts[static_prefix] = context
+            metrics.inc("llm_prefix_context_builds")
+        return context
+    
+    @metrics.timed("llm.generate")
+    def _generate_from_prefix_context(self, static_prefix: str, dynamic_suffix: str, kwargs) -> str:
+        response = self.client.generate(
+            model=self.model,
+            prompt=LLAMA3_USER_TURN.format(prompt=dynamic_suffix),
+            context=self._prefix_context(static_prefix),
+            raw=True,
+            options=self._options(kwargs),
+            keep_alive=self.keep_alive,
+        )
+        self._record_load(response, "generate")
+        return response['response']
+    
+    def _record_load(self, response, source: str) -> None:
+        """Report model load time separately so cold starts show up in metrics"""
+        load_seconds = (response.get('load_duration') or 0) / 1e9
+        if load_seconds >= COLD_LOAD_THRESHOLD_SECONDS:
+            metrics.observe("llm.model_load", load_seconds)
+            metrics.inc("llm_model_loads", source=source)
+            logger.info("Model cold-loaded", extra={"model": self.model, "seconds": round(load_seconds, 1), "source": source})
+    
+    def warm_up(self) -> bool:
+        """Load the model into memory with a 1-token generation"""
+        try:
+            start = time.perf_counter()
+            response = self.client.generate(
+                model=self.model,
+                prompt="ok",
+                options={"num_predict": 1},
+                keep_alive=self.keep_alive,
+            )
+            self._record_load(response, "warmup")
+            metrics.observe("llm.warmup", time.perf_counter() - start)
+            logger.info("Model warm", extra={"model": self.model, "seconds": round(time.perf_counter() - start, 1)})
+            return True
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {e}")
+            return False
+    
+    def ping(self) -> bool:
+        """Refresh keep_alive without generating (empty prompt only loads the model)"""
+        try:
+            response = self.client.generate(model=self.model, prompt="", keep_alive=self.keep_alive)
+            self._record_load(response, "ping")
+            metrics.inc("llm_keepalive_pings")
+            return True
+        except Exception as e:
+            logger.warning(f"Keep-alive ping failed: {e}")
+            return False
+    
+    @staticmethod
+    def in_business_hours(now: datetime = None, hours: str = None) -> bool:
+        """Check a local time against an "HH:MM-HH:MM" window"""
+        now = now or datetime.now()
+        start_text, end_text = (hours or Config.LLM_BUSINESS_HOURS).split("-")
+        start = datetime.strptime(start_text.strip(), "%H:%M").time()
+        end = datetime.strptime(end_text.strip(), "%H:%M").time()
+        if start <= end:
+            return start <= now.time() < end
+        return now.time() >= start or now.time() < end  # window crosses midnight
+    
+    def start_lifecycle(self, warm_up: bool = None, ping_interval: float = None) -> None:
+        """Warm the model up and keep it loaded during business hours (background thread)"""
+        if self._ping_thread is not None and self._ping_thread.is_alive():
+            return
+        self._ping_stop.clear()  # restart after stop_lifecycle()
+        
+        warm_up = Config.LLM_WARMUP_ON_START if warm_up is None else warm_up
+        ping_interval = ping_interval or Config.LLM_PING_INTERVAL
+        
+        def run():
+            if warm_up:
+                self.warm_up()
+            while not self._ping_stop.wait(ping_interval):
+                if self.in_business_hours():
+                    self.ping()
+        
+        self._ping_thread = threading.Thread(target=run, name="llm-lifecycle", daemon=True)
+        self._ping_thread.start()
+    
+    def stop_lifecycle(self) -> None:
+        self._ping_stop.set()
     
     def check_model_availability(self) -> bool:
         """Check if model is available - IMPROVED"""
@@ -99,11 +262,11 @@ class Llama3Client:
                 available_models = result.stdout
                 return self.model in available_models
             else:
-                print(f"❌ Error checking models: {result.stderr}")
+                logger.error(f"Error checking models: {result.stderr}")
                 return False
                 
         except Exception as e:
-            print(f"❌ Error checking model availability: {e}")
+            logger.error(f"Error checking model availability: {e}")
             return False
 
 # 🧪 TEST: Quick test script
@@ -127,7 +290,11 @@ def test_ollama_integration():
         return
     
     # Test generation
-    response = client.generate("Hello, respond with just 'Hi there!'")
+    try:
+        response = client.generate("Hello, respond with just 'Hi there!'")
+    except LLMError as e:
+        print(f"❌ Generation failed: {e}")
+        return
     print(f"🤖 Response: {response}")
     
     if "Hi there" in response or len(response) > 0:
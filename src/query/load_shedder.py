@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config.settings import Config
+from src.utils.metrics import metrics
+from src.utils.logger import get_logger
+
+logger = get_logger("load_shedder")
+
+class LoadShedder:
+    """Decide when to skip the LLM and answer extractively
+
+    Sheds when recent LLM queue wait or p95 generation latency passes its
+    threshold, or as soon as a caller still waiting for a slot (see
+    waiting()) has waited longer than the queue wait threshold, so a sudden
+    burst is caught before its slow calls complete. While shedding, one probe request every probe_interval seconds
+    still goes to the LLM; once probes come back under recover_ratio x the
+    thresholds, normal mode resumes.
+    """
+
+    def __init__(self, queue_wait_threshold: float = None, p95_threshold: float = None,
+                 recover_ratio: float = None, window: int = None, min_samples: int = None,
+                 probe_interval: float = None, enabled: bool = None):
+        settings = Config.LOAD_SHEDDING
+        self.enabled = settings.get("enabled", True) if enabled is None else enabled
+        self.queue_wait_threshold = queue_wait_threshold or settings.get("queue_wait_seconds", 5.0)
+        self.p95_threshold = p95_threshold or settings.get("p95_seconds", 20.0)
+        self.recover_ratio = recover_ratio or settings.get("recover_ratio", 0.6)
+        self.min_samples = min_samples or settings.get("min_samples", 5)
+        self.probe_interval = probe_interval or settings.get("probe_interval_seconds", 15.0)
+
+        window = window or settings.get("window", 20)
+        self._latencies = deque(maxlen=window)
+        self._queue_waits = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.shedding = False
+        self._last_probe = 0.0
+        self._waiters = {}  # token -> monotonic time the caller started waiting for a slot
+
+    def record(self, queue_wait: float, latency: float) -> None:
+        """Feed one completed LLM call and update the mode"""
+        with self._lock:
+            self._queue_waits.append(queue_wait)
+            self._latencies.append(latency)
+            self._update()
+
+    @contextmanager
+    def waiting(self):
+        """Wrap the wait for an LLM slot so should_shed() sees callers still in the queue"""
+        token = object()
+        with self._lock:
+            self._waiters[token] = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._waiters[token]
+
+    def oldest_wait(self) -> float:
+        """Seconds the longest-waiting caller has been queued (0 when nobody waits)"""
+        with self._lock:
+            return time.monotonic() - min(self._waiters.values()) if self._waiters else 0.0
+
+    @staticmethod
+    def _p95(samples) -> float:
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+    def _update(self) -> None:
+        # Probes are sparse while shedding, so judge recovery on the last few only
+        needed = min(self.min_samples, 3) if self.shedding else self.min_samples
+        if len(self._latencies) < needed:
+            return
+        latencies = list(self._latencies)[-needed:] if self.shedding else self._latencies
+        queue_waits = list(self._queue_waits)[-needed:] if self.shedding else self._queue_waits
+        p95 = self._p95(latencies)
+        queue_wait = max(queue_waits)
+
+        if not self.shedding and (p95 > self.p95_threshold or queue_wait > self.queue_wait_threshold):
+            self._switch(True, p95, queue_wait)
+        elif (self.shedding
+                and p95 <= self.p95_threshold * self.recover_ratio
+                and queue_wait <= self.queue_wait_threshold * self.recover_ratio):
+            self._switch(False, p95, queue_wait)
+
+    def _switch(self, shedding: bool, p95: float, queue_wait: float) -> None:
+        self.shedding = shedding
+        # Judge the new mode only on calls made in it
+        self._latencies.clear()
+        self._queue_waits.clear()
+        metrics.inc("load_shedding_switches", mode="extractive" if shedding else "llm")
+        logger.warning("Load shedding " + ("on" if shedding else "off"),
+                       extra={"p95_s": round(p95, 2), "queue_wait_s": round(queue_wait, 2)})
+
+    def should_shed(self) -> bool:
+        """True to answer without the LLM; lets a periodic probe through while shedding"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if not self.shedding:
+                oldest = now - min(self._waiters.values()) if self._waiters else 0.0
+                if oldest <= self.queue_wait_threshold:
+                    return False
+                # Burst: callers are stuck in the queue before any slow call has completed
+                self._switch(True, self._p95(self._latencies) if self._latencies else 0.0, oldest)
+                self._last_probe = now
+                return True
+            if now - self._last_probe >= self.probe_interval:
+                self._last_probe = now
+                return False
+            return True
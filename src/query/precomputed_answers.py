@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process, the thread lock is enough
+    fcntl = None
+
+from config.settings import Config
+from src.utils.metrics import metrics
+from src.utils.logger import get_logger
+
+logger = get_logger("answers")
+
+def fixed_questions() -> List[str]:
+    """Quick-reply postback queries followed by the configured FAQ list"""
+    # Imported here so the indexing scripts don't need the bot's .env handling
+    from facebook_bot.config.facebook_config import BotSettings
+    questions = list(BotSettings.POSTBACK_QUERIES.values()) + list(Config.FAQ_QUESTIONS)
+    return list(dict.fromkeys(questions))
+
+class PrecomputedAnswers:
+    """Answers for fixed questions, generated after each index build and served from memory
+
+    Stored as JSON next to the processed data. An answer set is stale when it
+    is older than PRECOMPUTED_MAX_AGE_HOURS or older than the vector store;
+    stale answers are still served while refresh_async() regenerates them.
+    Pre-forked workers share the file: one of them rebuilds it (file lock),
+    the others pick the new answers up when is_stale() sees a newer file.
+    """
+
+    def __init__(self, rag_engine, path: Path = None, max_age_hours: float = None):
+        self.rag_engine = rag_engine
+        self.path = Path(path or Config.PRECOMPUTED_ANSWERS_PATH)
+        self.max_age = (max_age_hours or Config.PRECOMPUTED_MAX_AGE_HOURS) * 3600
+        self.answers: Dict[str, Dict] = {}
+        self.built_at = 0.0
+        self._mtime = 0.0
+        self._refreshing = threading.Lock()
+        # A failed build leaves the answers stale: don't retry it on every message
+        self.retry_seconds = 300
+        self._failed_at = 0.0
+
+    def _key(self, question: str) -> str:
+        return self.rag_engine.normalize_question(question)
+
+    def load(self) -> int:
+        """Load stored answers into memory; returns how many were loaded"""
+        if not self.path.exists():
+            return 0
+        try:
+            self._mtime = self.path.stat().st_mtime
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read precomputed answers {self.path}: {e}")
+            return 0
+        self.answers = data.get("answers", {})
+        self.built_at = data.get("built_at", 0.0)
+        logger.info(f"Loaded {len(self.answers)} precomputed answers", extra={"path": str(self.path)})
+        return len(self.answers)
+
+    def get(self, question: str) -> Optional[str]:
+        entry = self.answers.get(self._key(question))
+        return entry["answer"] if entry else None
+
+    def answer(self, question: str, sender_id: str = None) -> Optional[str]:
+        """Stored answer, recorded as the sender's turn so a follow-up sees its products"""
+        entry = self.answers.get(self._key(question))
+        if entry is None:
+            return None
+        self.rag_engine.conversations.record(sender_id, question, entry["answer"],
+                                             entry.get("product_ids"), entry.get("product_names"))
+        return entry["answer"]
+
+    def index_built_at(self) -> float:
+        store = Config.VECTORSTORE_DIR / "chroma.sqlite3"
+        return store.stat().st_mtime if store.exists() else 0.0
+
+    def reload_if_changed(self) -> bool:
+        """Load the file again if another process rebuilt it"""
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return False
+        return mtime > self._mtime and self.load() > 0
+
+    def is_stale(self) -> bool:
+        self.reload_if_changed()
+        return (time.time() - self.built_at > self.max_age
+                or self.index_built_at() > self.built_at)
+
+    def build(self, questions: Iterable[str] = None) -> int:
+        """Generate answers for all fixed questions and persist them
+
+        A fallback answer (LLM down or shedding) is never stored: the previous
+        answer for that question is kept, or the question is left to live RAG.
+        The file is still written but keeps the previous built_at, so it stays
+        stale and is retried; RuntimeError reports the failures so callers
+        (pipeline step, refresh) don't record a successful build.
+        """
+        questions = list(questions or fixed_questions())
+        if not self.answers:
+            self.load()
+        previous, previous_built_at = self.answers, self.built_at
+        answers, failed = {}, []
+        with metrics.span("answers.precompute"):
+            for question in questions:
+                key = self._key(question)
+                start = time.perf_counter()
+                plan = self.rag_engine.answer_plan(question)
+                if plan.degraded:
+                    failed.append(question)
+                    metrics.inc("answers_precompute_failed")
+                    if key in previous:
+                        answers[key] = previous[key]
+                    logger.warning("Fallback answer not precomputed", extra={
+                        "question": question, "kept_previous": key in previous})
+                    continue
+                product_ids, product_names = self.rag_engine.shown_products(plan.search_results)
+                answers[key] = {
+                    "question": question,
+                    "answer": plan.response,
+                    "product_ids": product_ids,
+                    "product_names": product_names,
+                    "seconds": round(time.perf_counter() - start, 2)
+                }
+                logger.info("Precomputed answer", extra={"question": question, "chars": len(plan.response)})
+
+        self.answers = answers
+        self.built_at = previous_built_at if failed else time.time()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"built_at": self.built_at, "answers": answers}, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(self.path)
+        metrics.inc("answers_precomputed", len(questions) - len(failed))
+        if failed:
+            raise RuntimeError(f"{len(failed)}/{len(questions)} answers fell back instead of using the LLM: "
+                               + ", ".join(failed))
+        return len(answers)
+
+    def refresh_async(self) -> bool:
+        """Rebuild in a background thread unless a refresh is already running (or just failed)"""
+        if time.time() - self._failed_at < self.retry_seconds:
+            return False
+        if not self._refreshing.acquire(blocking=False):
+            return False
+
+        def run():
+            lock_file = None
+            try:
+                if fcntl is not None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    lock_file = open(self.path.with_suffix(".lock"), "w")
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        logger.debug("Another process is refreshing precomputed answers", extra={"pid": os.getpid()})
+                        return
+                self.build()
+                self._mtime = self.path.stat().st_mtime
+            except Exception as e:
+                self._failed_at = time.time()
+                logger.exception(f"Precomputed answer refresh failed: {e}")
+            finally:
+                if lock_file is not None:
+                    lock_file.close()
+                self._refreshing.release()
+
+        threading.Thread(target=run, name="answers-refresh", daemon=True).start()
+        return True
@@ -0,0 +1,128 @@
+import re
+import string
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from config.settings import Config
+from src.utils.logger import get_logger
+
+logger = get_logger("templates")
+
+DEFAULT_TEMPLATE_NAME = "PRODUCT_RECOMMENDATION"
+
+DEFAULT_TEMPLATE = """{system_prompt}
+
+THÔNG TIN SẢN PHẨM LIÊN QUAN:
+{retrieved_products}
+
+CÂU HỎI: {user_question}
+
+Hãy phân tích thông tin trên và đưa ra lời khuyên phù hợp nhất cho khách hàng."""
+
+# Section headers look like "[PRODUCT_RECOMMENDATION]" on their own line
+_SECTION_RE = re.compile(r"^\[([A-Z0-9_]+)\]\s*$", re.MULTILINE)
+
+class CompiledTemplate:
+    """Prompt template pre-split into literal text and field names"""
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self.parts: List[Tuple[str, str]] = []
+        self.simple = True
+
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            if field is not None and (spec or conversion or not field.isidentifier()):
+                self.simple = False
+            self.parts.append((literal, field))
+        self.fields = {field for _, field in self.parts if field}
+
+    def render(self, **values) -> str:
+        if not self.simple:
+            return self.text.format(**values)
+        return "".join(
+            literal + (str(values[field]) if field else "")
+            for literal, field in self.parts
+        )
+
+class PromptTemplateRegistry:
+    """All sections of query_templates.txt, parsed once and hot-reloaded on change
+
+    Lookups never touch the filesystem; a daemon thread polls the file's mtime
+    and swaps in a freshly parsed set of templates when it changes.
+    """
+
+    def __init__(self, templates_file: Path = None, reload_interval: float = 5.0):
+        self.templates_file = Path(templates_file or Config.PROJECT_ROOT / "config" / "prompts" / "query_templates.txt")
+        self.reload_interval = reload_interval
+        self.templates: Dict[str, CompiledTemplate] = {}
+        self._mtime = None
+        self._stop = threading.Event()
+        self._watcher = None
+        self.load()
+
+    def load(self) -> None:
+        """(Re)parse the templates file into compiled templates"""
+        templates = {DEFAULT_TEMPLATE_NAME: CompiledTemplate(DEFAULT_TEMPLATE_NAME, DEFAULT_TEMPLATE)}
+
+        try:
+            mtime = self.templates_file.stat().st_mtime
+            content = self.templates_file.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            logger.warning(f"Templates file not found, using default: {self.templates_file}")
+            self._mtime = None
+            self.templates = templates
+            return
+
+        headers = list(_SECTION_RE.finditer(content))
+        for i, header in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(content)
+            body = content[header.end():end].strip()
+            if body:
+                templates[header.group(1)] = CompiledTemplate(header.group(1), body)
+
+        # Swap atomically so readers always see a complete set
+        self.templates = templates
+        self._mtime = mtime
+        logger.info(f"Loaded {len(templates)} prompt templates: {sorted(templates)}")
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime = self.templates_file.stat().st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        self.load()
+        return True
+
+    def start_watching(self) -> None:
+        """Poll the templates file for changes in a background thread"""
+        # (a watcher inherited through fork() isn't running: start a new one)
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(self.reload_interval):
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logger.error(f"Template reload failed, keeping previous templates: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="template-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self, wait: bool = False) -> None:
+        self._stop.set()
+        if wait and self._watcher is not None:
+            self._watcher.join()
+
+    def get(self, name: str = None) -> CompiledTemplate:
+        """Template for an intent, falling back to PRODUCT_RECOMMENDATION"""
+        templates = self.templates
+        return templates.get((name or DEFAULT_TEMPLATE_NAME).upper()) or templates[DEFAULT_TEMPLATE_NAME]
+
+    def render(self, name: str = None, **values) -> str:
+        return self.get(name).render(**values)
@@ -1,33 +1,106 @@
 # 🔧 FIX: Update src/query/rag_engine.py to use our embeddings
-import sys 
-from typing import Dict
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from config.settings import Config
 from src.indexing.chroma_indexer import ChromaIndexer
-from src.indexing.llamaindex_builder import LlamaIndexBuilder
-from src.query.llama3_client import Llama3Client
+from src.query.llama3_client import Llama3Client, LLMTimeout
+from src.query.prompt_templates import PromptTemplateRegistry
+from src.query.context_packer import ContextPacker
+from src.query.variant_grouping import collapse_variants, count_distinct_products
+from src.query.extractive_answer import extractive_answer
+from src.query.load_shedder import LoadShedder
+from src.query.intent_router import IntentRouter
+from src.query.reranker import CrossEncoderReranker
+from src.query.conversation_store import (
+    ConversationStore, refers_to_previous, names_category, referenced_position, asks_for_alternatives
+)
 from src.embedding.sentence_transformer_client import SentenceTransformerClient
+from src.utils.metrics import metrics
+from src.utils.logger import get_logger
+from src.utils.single_flight import SingleFlight
+from src.utils.slot_limiter import SlotLimiter
+
+logger = get_logger("rag")
+
+class AnswerPlan:
+    """One question's state around the LLM call (see RAGEngine.prepare / finish)
+
+    ``response`` is already set when no LLM call is needed (routed intent,
+    no results, load shedding, error fallback). ``degraded`` marks answers
+    that came from a fallback instead of the LLM (shed, LLM or query failed).
+    """
+    __slots__ = ("question", "sender_id", "intent", "search_results", "query_embedding",
+                 "static_prefix", "dynamic_suffix", "key", "response", "remember", "degraded")
+
+    def __init__(self, question: str, sender_id: str = None, intent: str = None):
+        self.question = question
+        self.sender_id = sender_id
+        self.intent = intent
+        self.search_results = None
+        self.query_embedding = None
+        self.static_prefix = self.dynamic_suffix = None
+        self.key = None
+        self.response: Optional[str] = None
+        self.remember = False
+        self.degraded = False
+
+    @property
+    def needs_llm(self) -> bool:
+        return self.response is None
 
 class RAGEngine:
     """Complete RAG system - FIXED to use our embeddings"""
     
-    def __init__(self):
-        # Components
-        self.chroma_indexer = ChromaIndexer()
-        self.llamaindex_builder = LlamaIndexBuilder()
-        self.llama3_client = Llama3Client()
+    def __init__(self, chroma_indexer: ChromaIndexer = None, embedding_client: SentenceTransformerClient = None):
+        # Components (pass existing ones to share a Chroma client / loaded model)
+        self.chroma_indexer = chroma_indexer or ChromaIndexer()
+        self.llama3_client = Llama3Client(host=Config.OLLAMA_HOST)
         
         # ✅ Use SAME embedding model as indexing
-        self.embedding_client = SentenceTransformerClient(Config.EMBEDDING_MODEL)
+        self.embedding_client = embedding_client or SentenceTransformerClient(Config.EMBEDDING_MODEL)
         
         # State
         self.is_initialized = False
+        self._init_lock = threading.Lock()
         
         # Load system prompt
         self.system_prompt = self._load_system_prompt()
 
+        # Parse all query templates once; watcher hot-reloads on file change
+        self.templates = PromptTemplateRegistry()
+        self.templates.start_watching()
+        self.context_packer = ContextPacker()
+        
+        # Identical concurrent questions share one LLM generation
+        self.generations = SingleFlight()
+        
+        # At most OLLAMA_NUM_PARALLEL generations at once (shared with the ASGI bot);
+        # waiting time drives load shedding
+        self.load_shedder = LoadShedder()
+        self.llm_slots = SlotLimiter(Config.OLLAMA_NUM_PARALLEL, waiting=self.load_shedder.waiting)
+        self.max_answer_tokens = Config.LLM_ANSWER_MAX_TOKENS
+        
+        # Per-sender turns and last shown products, for follow-up questions
+        self.conversations = ConversationStore()
+        
+        # Optional cross-encoder re-ranking of over-fetched hits
+        self.reranker = CrossEncoderReranker() if Config.RERANK.get("enabled", False) else None
+        
+        # Chit-chat, store hours and price range get instant answers without retrieval
+        self.intent_router = IntentRouter(self.embedding_client) if Config.INTENT_ROUTER.get("enabled", True) else None
+
     def initialize(self) -> None:
-        """Initialize all components"""
-        print("Initializing RAG Engine...")
+        """Initialize all components (once; concurrent callers wait for the first)"""
+        with self._init_lock:
+            if not self.is_initialized:
+                self._initialize()
+    
+    def _initialize(self) -> None:
+        logger.info("Initializing RAG Engine...")
         self.chroma_indexer.create_collection()
         
         # Check ChromaDB
@@ -35,24 +108,54 @@ class RAGEngine:
         if info['status'] != 'ready':
             raise Exception(f"ChromaDB not ready: {info}")
         
-        print(f"ChromaDB ready: {info['document_count']} documents")
+        logger.info(f"ChromaDB ready: {info['document_count']} documents")
         
         # ✅ Load OUR embedding model (not ChromaDB default)
-        print("Loading our embedding model...")
-        self.embedding_client.load_model()
-        print("Embedding model ready")
+        if self.embedding_client.model is None:
+            logger.info("Loading our embedding model...")
+            self.embedding_client.load_model()
+        logger.info("Embedding model ready")
+        
+        if self.reranker is not None:
+            self.reranker.load_async()
+        
+        if self.intent_router is not None:
+            self.intent_router.warm_up()
         
         # Check Llama3
         if not self.llama3_client.check_model_availability():
-            print(f"Warning: Llama3 model {self.llama3_client.model} not available")
+            logger.warning(f"Llama3 model {self.llama3_client.model} not available")
         else:
-            print("Llama3 model ready")
+            logger.info("Llama3 model ready")
         
         self.is_initialized = True
-        print("RAG Engine initialized successfully!")
+        logger.info("RAG Engine initialized successfully")
+    
+    def preload(self) -> None:
+        """Load everything read-only before forking workers, so they share it copy-on-write"""
+        if self.reranker is not None:
+            self.reranker.load()
+        self.initialize()
+        # The first search loads Chroma's HNSW index into memory
+        self.query_vector_only("vali", n_results=1)
+        # No threads across fork(): each worker starts its own watcher in after_fork
+        self.templates.stop_watching(wait=True)
     
-    def query_vector_only(self, question: str, n_results: int = None) -> Dict:
-        """Query using vector search only (no LLM) - FIXED"""
+    def after_fork(self) -> None:
+        """Restart per-process pieces in a freshly forked worker"""
+        self.llama3_client.after_fork()
+        self.templates.start_watching()
+        self.conversations.after_fork()
+    
+    @metrics.timed("rag.query_vector_only")
+    def query_vector_only(self, question: str, n_results: int = None, group_variants: bool = True,
+                          query_embedding: np.ndarray = None) -> Dict:
+        """Query using vector search only (no LLM) - FIXED
+
+        With group_variants, size variants of one product are collapsed into a
+        single hit (over-fetching as needed) so n_results distinct products come back.
+        A precomputed (e.g. contextualized) query_embedding skips encoding.
+        """
         if not self.is_initialized:
             self.initialize()
         
@@ -60,7 +163,9 @@ class RAGEngine:
         
         try:
             # ✅ Use OUR embedding model for query
-            query_embedding = self.embedding_client.encode(question)
+            if query_embedding is None:
+                with metrics.span("rag.embedding"):
+                    query_embedding = self.embedding_client.encode(question)
             
             # ✅ FIX: Flatten embedding properly
             if query_embedding.ndim > 1:
@@ -68,48 +173,234 @@ class RAGEngine:
             else:
                 query_embedding_flat = query_embedding
                 
-            print(f"Embedding shape: {query_embedding.shape} -> flattened: {query_embedding_flat.shape}")
+            logger.debug(f"Embedding shape: {query_embedding.shape} -> flattened: {query_embedding_flat.shape}")
             
             # ✅ Search with properly formatted embedding
-            search_results = self.chroma_indexer.search(
-                query_text=question,
-                query_embedding=query_embedding_flat.tolist(),  # Now 1D
-                n_results=n_results
-            )
+            fetch = n_results * Config.VARIANT_OVERFETCH if group_variants else n_results
+            while True:
+                with metrics.span("rag.chroma_search"):
+                    search_results = self.chroma_indexer.search(
+                        query_text=question,
+                        query_embedding=query_embedding_flat.tolist(),  # Now 1D
+                        n_results=fetch
+                    )
+                
+                if not group_variants:
+                    return search_results
+                
+                # Over-fetch again only if variants ate the top-k and more hits may exist
+                fetched = len(search_results['documents'][0])
+                if (count_distinct_products(search_results) >= n_results
+                        or fetched < fetch or fetch >= Config.VARIANT_MAX_FETCH):
+                    break
+                fetch = min(fetch * 2, Config.VARIANT_MAX_FETCH)
             
-            return search_results
+            return collapse_variants(search_results, n_results)
             
         except Exception as e:
-            print(f"Vector search error: {e}")
+            logger.exception(f"Vector search error: {e}")
             return {"documents": [[]], "metadatas": [[]], "distances": [[]]}
     
-    def query_with_llm(self, question: str, n_results: int = None) -> str:
-        """Query with vector search + LLM generation"""
+    def query_with_llm(self, question: str, n_results: int = None, intent: str = None,
+                       sender_id: str = None) -> str:
+        """Query with vector search + LLM generation
+        
+        With a sender_id, follow-ups ("cái đó giá bao nhiêu?") are answered
+        from the products last shown to that sender instead of a new search.
+        """
+        plan = AnswerPlan(question, sender_id, intent)
+        # Step 1: Vector search (or the remembered products for a follow-up)
+        plan.search_results, plan.query_embedding = self.retrieve(question, n_results, sender_id)
+        plan.remember = True
+        
+        self.plan_answer(plan, plan.search_results)
+        if plan.needs_llm:
+            plan.response = self._complete(plan)
+        return self.finish(plan)
+    
+    def retrieve(self, question: str, n_results: int = None, sender_id: str = None) -> Tuple[Dict, Optional[np.ndarray]]:
+        """(search results, query embedding): remembered products for a follow-up, else a search"""
         if not self.is_initialized:
             self.initialize()
         
-        # Step 1: Vector search
-        search_results = self.query_vector_only(question, n_results)
+        conversation = self.conversations.get(sender_id)
+        query_embedding = None
+        search_results = self._resolve_follow_up(question, conversation)
+        if search_results is None:
+            query_embedding = self._contextualized_embedding(question, conversation)
+            if self.reranker is None:
+                search_results = self.query_vector_only(question, n_results, query_embedding=query_embedding)
+            else:
+                # Over-fetch candidates, keep the cross-encoder's best few (smaller prompt)
+                n_candidates = (n_results or Config.TOP_K_RESULTS) * Config.RERANK.get("overfetch", 4)
+                candidates = self.query_vector_only(question, n_candidates, query_embedding=query_embedding)
+                search_results = self.reranker.rerank(question, candidates)
+        return search_results, query_embedding
+    
+    def _remember(self, sender_id: str, question: str, response: str,
+                  search_results: Dict, query_embedding: Optional[np.ndarray]) -> None:
+        ids, names = self.shown_products(search_results)
+        self.conversations.record(sender_id, question, response, ids, names, embedding=query_embedding)
+    
+    def _contextualized_embedding(self, question: str, conversation) -> np.ndarray:
+        """Query embedding, blended with the previous turn's for short context-dependent questions
+        
+        "blend" mode mixes the embeddings (weight on the current question);
+        "rewrite" mode appends the remembered product type to the question text.
+        Either way it's a single encode, no LLM call.
+        """
+        settings = Config.CONTEXTUALIZE
+        previous = conversation.last_embedding if conversation is not None else None
+        contextual = (previous is not None and settings.get("mode", "blend") != "off"
+                      and len(question.split()) <= settings.get("max_words", 8)
+                      and not names_category(question))
+        
+        text = question
+        if contextual and settings.get("mode") == "rewrite" and conversation.product_names:
+            text = f"{question} {self._product_type(conversation.product_names[0])}"
+        
+        with metrics.span("rag.embedding"):
+            embedding = self.embedding_client.encode(text).reshape(-1)
+        
+        if contextual and settings.get("mode", "blend") == "blend":
+            weight = settings.get("weight", 0.65)
+            embedding = weight * embedding + (1 - weight) * previous
+            embedding = embedding / np.linalg.norm(embedding)
+        if contextual:
+            metrics.inc("rag_contextualized", mode=settings.get("mode", "blend"))
+        return embedding
+    
+    @staticmethod
+    def _product_type(name: str) -> str:
+        """'Vali nhựa HUNG PHAT 2103 (20 inch)' -> 'Vali nhựa'"""
+        return " ".join(name.split()[:2])
+    
+    def _resolve_follow_up(self, question: str, conversation) -> Optional[Dict]:
+        """Remembered products (all variants) for a follow-up question, else None"""
+        if conversation is None or not conversation.product_ids or not self.is_follow_up(question, conversation):
+            return None
+        try:
+            with metrics.span("rag.follow_up"):
+                results = self.chroma_indexer.get_by_ids(conversation.product_ids)
+                if not results['documents'][0]:
+                    return None
+                products = collapse_variants(results, len(results['ids'][0]))
+        except Exception as e:
+            logger.warning(f"Could not load remembered products, searching instead: {e}")
+            return None
+        
+        # "cái thứ 2" narrows to one product
+        position = referenced_position(question)
+        if position is not None and -len(products['ids'][0]) <= position < len(products['ids'][0]):
+            products = {key: [values[0][position:position + 1 or None]] for key, values in products.items()}
         
+        metrics.inc("rag_follow_ups_resolved")
+        return products
+    
+    def is_follow_up(self, question: str, conversation) -> bool:
+        """Explicit reference ("cái đó", "thì sao"), or a short question, naming no product type
+        
+        Asking for alternatives ("loại nào rẻ hơn?") or naming a category ("có vali màu đỏ không?")
+        is a new, contextualized search instead.
+        """
+        if (conversation is None or not conversation.product_ids or asks_for_alternatives(question)
+                or names_category(question)):
+            return False
+        return refers_to_previous(question) or len(question.split()) <= 6
+    
+    @staticmethod
+    def _shown_product_ids(search_results: Dict) -> List[str]:
+        """Ids of every variant behind the products in the answer"""
+        ids = []
+        metadatas = (search_results.get('metadatas') or [[]])[0]
+        for doc_id, metadata in zip((search_results.get('ids') or [[]])[0], metadatas):
+            variants = (metadata or {}).get('variants')
+            if isinstance(variants, list):
+                ids.extend(variant['id'] for variant in variants)
+            else:
+                ids.append(doc_id)
+        return ids
+    
+    @classmethod
+    def shown_products(cls, search_results: Dict) -> Tuple[List[str], List[str]]:
+        """(variant ids, product names) an answer showed, remembered for follow-ups"""
+        if not search_results:
+            return [], []
+        names = [(metadata or {}).get('name', '') for metadata in (search_results.get('metadatas') or [[]])[0]]
+        return cls._shown_product_ids(search_results), names
+    
+    def plan_answer(self, plan: AnswerPlan, search_results: Dict) -> AnswerPlan:
+        """Answer without the LLM if possible, otherwise build its prompt"""
+        question = plan.question
+        plan.search_results = search_results
         if not search_results['documents'][0]:
-            return "Xin lỗi, tôi không tìm thấy thông tin phù hợp với câu hỏi của bạn."
+            plan.response = "Xin lỗi, tôi không tìm thấy thông tin phù hợp với câu hỏi của bạn."
+            return plan
         
-        # Step 2: Build context
-        context = self._build_context(search_results, question)
+        # Overloaded LLM: answer from retrieved metadata in milliseconds
+        if self.load_shedder.should_shed():
+            metrics.inc("rag_answers", mode="extractive")
+            plan.response = extractive_answer(search_results, question)
+            plan.degraded = True
+            return plan
         
-        # Step 3: Generate response with Llama3
+        # Step 2: Build prompt as static prefix (system instructions) + dynamic suffix
+        plan.static_prefix, plan.dynamic_suffix = self._build_prompt_parts(search_results, question, plan.intent)
+        plan.key = self._generation_key(question, search_results, plan.intent)
+        return plan
+    
+    def _complete(self, plan: AnswerPlan) -> str:
+        """Step 3: Generate response with Llama3 (byte-identical prefix lets Ollama reuse its KV cache)"""
+        # Concurrent requests with the same question and retrieval share one generation
         try:
-            response = self.llama3_client.generate(
-                prompt=question,
-                system_prompt=context,
-                temperature=0.3,  # Lower for more focused response
-                max_tokens=300    # Shorter to avoid timeout
-            )
+            response, shared = self.generations.do(
+                plan.key, lambda: self._generate(plan.static_prefix, plan.dynamic_suffix))
+            if shared:
+                metrics.inc("rag_coalesced")
+            metrics.inc("rag_answers", mode="llm")
             return response
         except Exception as e:
-            # Fallback: return vector search results
-            print(f"LLM error: {e}")
-            return self._format_vector_results(search_results)
+            return self.llm_fallback(plan, e)
+    
+    def llm_fallback(self, plan: AnswerPlan, error: Exception) -> str:
+        """Answer from the vector search results when the LLM call failed (turn not remembered)"""
+        logger.error(f"LLM error: {error}")
+        metrics.inc("rag_answers", mode="extractive")
+        plan.degraded = True
+        plan.remember = False
+        return extractive_answer(plan.search_results, plan.question)
+    
+    def _generate(self, static_prefix: str, dynamic_suffix: str) -> str:
+        """One LLM call through the slot limiter, reporting queue wait and latency to the shedder"""
+        queued = time.perf_counter()
+        with self.llm_slots:
+            queue_wait = time.perf_counter() - queued
+            metrics.observe("llm.queue_wait", queue_wait)
+            start = time.perf_counter()
+            try:
+                response = self.llama3_client.generate_with_prefix(
+                    static_prefix,
+                    dynamic_suffix,
+                    temperature=0.3,  # Lower for more focused response
+                    max_tokens=self.max_answer_tokens  # Shorter to avoid timeout
+                )
+            except LLMTimeout:
+                # As slow as an answer gets: counts toward shedding
+                self.load_shedder.record(queue_wait, time.perf_counter() - start)
+                raise
+            # Other failures (Ollama down) say nothing about generation latency
+            self.load_shedder.record(queue_wait, time.perf_counter() - start)
+            return response
+    
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """Case/whitespace/Unicode-form insensitive form used to match identical questions"""
+        text = unicodedata.normalize("NFC", question or "").lower()
+        return re.sub(r"\s+", " ", text).strip(" ?!.")
+    
+    def _generation_key(self, question: str, search_results: Dict, intent: str = None) -> Tuple:
+        ids = (search_results.get('ids') or [[]])[0] or search_results['documents'][0]
+        return (self.normalize_question(question), intent, tuple(ids))
     
     def _format_vector_results(self, search_results: Dict) -> str:
         """Format vector search results as fallback"""
@@ -127,60 +418,35 @@ class RAGEngine:
         
         return "\n".join(response_parts)
     
-    def _build_context(self, search_results: Dict, question: str) -> str:
-        """Build context from search results using query templates"""
-        try:
-            from config.settings import Config
-            
-            # Load template file
-            templates_file = Config.PROJECT_ROOT / "config" / "prompts" / "query_templates.txt"
-            
-            # Default template fallback
-            default_template = """{system_prompt}
-
-            THÔNG TIN SẢN PHẨM LIÊN QUAN:
-            {retrieved_products}
-
-            CÂU HỎI: {user_question}
-
-            Hãy phân tích thông tin trên và đưa ra lời khuyên phù hợp nhất cho khách hàng."""
+    def _build_prompt_parts(self, search_results: Dict, question: str, intent: str = None) -> Tuple[str, str]:
+        """Split the prompt into a static prefix and a per-request suffix
 
-            # Try to load template from file
-            template = default_template
-            if templates_file.exists():
-                with open(templates_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Extract PRODUCT_RECOMMENDATION template
-                    if '[PRODUCT_RECOMMENDATION]' in content:
-                        start = content.find('[PRODUCT_RECOMMENDATION]') + len('[PRODUCT_RECOMMENDATION]')
-                        end = content.find('[', start)
-                        if end == -1:
-                            end = len(content)
-                        template = content[start:end].strip()
-                        print("Loaded template from file")
-                    else:
-                        print("PRODUCT_RECOMMENDATION template not found, using default")
-            else:
-                print("Templates file not found, using default")
-            
-            # Format products data
-            documents = search_results['documents'][0]
-            metadatas = search_results['metadatas'][0] if 'metadatas' in search_results else [{}] * len(documents)
-            distances = search_results['distances'][0] if 'distances' in search_results else [0.5] * len(documents)
-            
-            product_parts = []
-            for i, (doc, metadata, distance) in enumerate(zip(documents, metadatas, distances), 1):
-                product_info = f"""Sản phẩm {i}:
-                - Tên: {metadata.get('name', 'N/A')}
-                - Danh mục: {metadata.get('category', 'N/A')}
-                - Chi tiết: {doc[:200]}{'...' if len(doc) > 200 else ''}
-                - Độ liên quan: {1-distance:.2f}"""
-                product_parts.append(product_info)
-            
-            formatted_products = '\n\n'.join(product_parts)
+        The prefix is exactly self.system_prompt on every call, so Ollama can
+        keep its prefill in the KV cache; products and question go in the suffix.
+        """
+        try:
+            formatted_products = self.context_packer.pack(search_results, question)
+            dynamic_suffix = self.templates.render(
+                intent,
+                system_prompt="",
+                retrieved_products=formatted_products,
+                user_question=question
+            ).strip()
+        except Exception as e:
+            logger.error(f"Error with template: {e}, using fallback")
+            dynamic_suffix = self._build_context(search_results, question, intent)[len(self.system_prompt):].strip()
+        
+        return self.system_prompt, dynamic_suffix
+    
+    def _build_context(self, search_results: Dict, question: str, intent: str = None) -> str:
+        """Build context from search results using the preloaded query templates"""
+        try:
+            # Pack products data into the token budget (variants merged, best fields first)
+            formatted_products = self.context_packer.pack(search_results, question)
             
-            # Use template to build context
-            context = template.format(
+            # Use template to build context (no file I/O: templates are parsed at startup)
+            context = self.templates.render(
+                intent,
                 system_prompt=self.system_prompt,
                 retrieved_products=formatted_products,
                 user_question=question
@@ -189,7 +455,7 @@ class RAGEngine:
             return context
             
         except Exception as e:
-            print(f"Error with template: {e}, using fallback")
+            logger.error(f"Error with template: {e}, using fallback")
             
             # Fallback to original logic
             context_parts = [self.system_prompt]
@@ -226,12 +492,12 @@ class RAGEngine:
                     system_prompt = f.read().strip()
                     
                 if system_prompt:  # Check if file is not empty
-                    print(f"Loaded system prompt from: {prompt_file}")
+                    logger.info(f"Loaded system prompt from: {prompt_file}")
                     return system_prompt
                 else:
-                    print(f"System prompt file is empty: {prompt_file}")
+                    logger.warning(f"System prompt file is empty: {prompt_file}")
             else:
-                print(f"System prompt file not found: {prompt_file}")
+                logger.warning(f"System prompt file not found: {prompt_file}")
                 # Auto-create the prompt file
                 Config.create_default_prompts()
                 
@@ -240,18 +506,18 @@ class RAGEngine:
                     with open(prompt_file, 'r', encoding='utf-8') as f:
                         system_prompt = f.read().strip()
                     if system_prompt:
-                        print(f"Created and loaded system prompt from: {prompt_file}")
+                        logger.info(f"Created and loaded system prompt from: {prompt_file}")
                         return system_prompt
                 
         except Exception as e:
-            print(f"Error loading system prompt file: {e}")
+            logger.error(f"Error loading system prompt file: {e}")
         
         # Fallback to default prompt
         fallback_prompt = """Bạn là chuyên gia tư vấn sản phẩm vali, balo của Công ty Cổ phần Hùng Phát. 
     Hãy tư vấn sản phẩm phù hợp nhất cho khách hàng dựa trên thông tin được cung cấp. 
     Trả lời bằng tiếng Việt, ngắn gọn và thực tế, tập trung vào 1-2 sản phẩm tốt nhất."""
         
-        print("Using fallback system prompt")
+        logger.warning("Using fallback system prompt")
         return fallback_prompt
     
     def _simple_fallback(self, question: str) -> str:
@@ -279,25 +545,60 @@ class RAGEngine:
         else:
             return "Xin chao! Toi tu van vali, balo, tui xach Hung Phat. Ban can san pham gi cu the?"
     
-    def query(self, question: str) -> str:
+    def query(self, question: str, sender_id: str = None) -> str:
         """Main query method - simple addition to existing RAG Engine"""
+        return self.answer_plan(question, sender_id).response
+    
+    def answer_plan(self, question: str, sender_id: str = None) -> AnswerPlan:
+        """query() returning the finished plan, to tell LLM answers from fallbacks"""
+        plan = self.prepare(question, sender_id)
+        if plan.needs_llm:
+            plan.response = self._complete(plan)
+        self.finish(plan)
+        return plan
+    
+    def prepare(self, question: str, sender_id: str = None) -> AnswerPlan:
+        """Everything before the LLM call: intent routing, retrieval, prompt
+        
+        Split from query() so the ASGI server can run this part on a worker
+        thread and await the LLM on the event loop.
+        """
+        plan = AnswerPlan(question, sender_id)
+        
+        # A follow-up on earlier products ("cái đó giá bao nhiêu?", "giá sao?") skips the router,
+        # unless it is plainly chit-chat ("cảm ơn shop")
+        if self.intent_router is None or (self.is_follow_up(question, self.conversations.get(sender_id))
+                                          and not self.intent_router.is_small_talk(question)):
+            return self._prepare_rag(plan)
+        
+        with metrics.span("intent.classify"):
+            intent, response = self.intent_router.route(question)
+        metrics.inc("intent_routed", intent=intent)
+        with metrics.span(f"intent.{intent}"):
+            if response is not None:
+                plan.response = response
+                return plan
+            return self._prepare_rag(plan)
+    
+    def _prepare_rag(self, plan: AnswerPlan) -> AnswerPlan:
+        """Product queries: retrieval + prompt, with simple fallbacks"""
         try:
-            # Use existing methods if available
-            if hasattr(self, 'query_with_llm'):
-                print("Using query_with_llm")
-                sys.stdout.flush()
-                return self.query_with_llm(question)
-            elif hasattr(self, 'query_vector_only'):
-                print("Using query_vector_only")
-                search_results = self.query_vector_only(question)
-                return self._format_vector_results(search_results)
-            else:
-                print("No method found, using fallback")
-                return self._simple_fallback(question)
-                
+            plan.search_results, plan.query_embedding = self.retrieve(plan.question, sender_id=plan.sender_id)
+            plan.remember = True
+            return self.plan_answer(plan, plan.search_results)
         except Exception as e:
-            print(f"Exception: {e}")
-            return self._simple_fallback(question)
+            logger.exception(f"Query failed, using simple fallback: {e}")
+            plan.response = self._simple_fallback(plan.question)
+            plan.remember = False
+            plan.degraded = True
+            return plan
+    
+    def finish(self, plan: AnswerPlan) -> str:
+        """Remember the turn for follow-ups; returns the answer"""
+        if plan.remember:
+            self._remember(plan.sender_id, plan.question, plan.response,
+                           plan.search_results, plan.query_embedding)
+        return plan.response
 
 # 🧪 TEST: Create comprehensive test
 
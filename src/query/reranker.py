@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, List
+
+from config.settings import Config
+from src.embedding.model_registry import model_registry
+from src.utils.metrics import metrics
+from src.utils.logger import get_logger
+
+logger = get_logger("reranker")
+
+class CrossEncoderReranker:
+    """Re-rank bi-encoder hits with a small multilingual cross-encoder on CPU
+
+    All uncached (question, product) pairs are scored in one batch; scores are
+    cached per pair. If the model isn't loaded yet, is busy, or misses the time
+    budget, the bi-encoder order is kept - a request never waits past the budget.
+    """
+
+    def __init__(self, model_name: str = None, keep: int = None, time_budget_ms: float = None,
+                 cache_size: int = None, max_doc_chars: int = None):
+        settings = Config.RERANK
+        self.model_name = model_name or settings.get("model", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+        self.keep = keep or settings.get("keep", 3)
+        self.time_budget = (time_budget_ms or settings.get("time_budget_ms", 150)) / 1000
+        self.cache_size = cache_size or settings.get("cache_size", 4096)
+        self.max_doc_chars = max_doc_chars or settings.get("max_doc_chars", 512)
+
+        self.model = None
+        self._loading = threading.Lock()
+        self._busy = threading.Lock()
+        self._scorer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._cache: "OrderedDict[tuple, float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def load(self) -> None:
+        """Load the model now (waits for a load already in progress)"""
+        with self._loading:
+            self._load()
+
+    def load_async(self) -> None:
+        """Load the model in the background (requests fall back until it's ready)"""
+        if self.model is not None or not self._loading.acquire(blocking=False):
+            return
+
+        def load():
+            try:
+                self._load()
+            finally:
+                self._loading.release()
+
+        threading.Thread(target=load, name="rerank-load", daemon=True).start()
+
+    def _load(self) -> None:
+        if self.model is not None:
+            return
+        try:
+            start = time.perf_counter()
+            self.model = model_registry.get(self.model_name, backend="cross_encoder",
+                                            device="cpu", max_length=256)
+            logger.info(f"Cross-encoder {self.model_name} loaded in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"Cross-encoder unavailable, keeping bi-encoder order: {e}")
+
+    def rerank(self, question: str, search_results: Dict, keep: int = None) -> Dict:
+        """Best `keep` hits by cross-encoder score (bi-encoder order on fallback)"""
+        keep = keep or self.keep
+        ids = (search_results.get('ids') or [[]])[0]
+        if len(ids) <= 1:
+            return search_results
+
+        order = None
+        if self.model is None:
+            self.load_async()
+            metrics.inc("rerank_fallbacks", reason="not_loaded")
+        elif not self._busy.acquire(blocking=False):
+            # A timed-out batch is still running; don't queue behind it
+            metrics.inc("rerank_fallbacks", reason="busy")
+        else:
+            future = self._scorer.submit(self._scores, question, search_results)
+            future.add_done_callback(lambda _: self._busy.release())
+            try:
+                with metrics.span("rag.rerank"):
+                    scores = future.result(timeout=self.time_budget)
+                order = sorted(range(len(ids)), key=lambda i: -scores[i])
+            except FutureTimeout:
+                metrics.inc("rerank_fallbacks", reason="timeout")
+            except Exception as e:
+                logger.warning(f"Re-ranking failed, keeping bi-encoder order: {e}")
+                metrics.inc("rerank_fallbacks", reason="error")
+
+        order = (order or list(range(len(ids))))[:keep]
+        reranked = {
+            key: [[values[0][i] for i in order]]
+            for key, values in search_results.items()
+            if isinstance(values, list) and values and isinstance(values[0], list)
+        }
+        # Downstream code orders products by distance: make it follow the new rank
+        if reranked.get('distances'):
+            reranked['distances'] = [sorted(reranked['distances'][0])]
+        return reranked
+
+    def _scores(self, question: str, search_results: Dict) -> List[float]:
+        ids = search_results['ids'][0]
+        documents = search_results['documents'][0]
+        metadatas = (search_results.get('metadatas') or [[{}] * len(ids)])[0]
+        question_key = " ".join(question.lower().split())
+
+        with self._cache_lock:
+            scores = [self._cache.get((question_key, doc_id)) for doc_id in ids]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        metrics.inc("rerank_pairs", len(ids) - len(missing), cache="hit")
+
+        if missing:
+            pairs = [
+                (question, f"{(metadatas[i] or {}).get('name', '')}\n{documents[i][:self.max_doc_chars]}")
+                for i in missing
+            ]
+            # One forward pass over all uncached pairs
+            batch_scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+            metrics.inc("rerank_pairs", len(missing), cache="miss")
+            with self._cache_lock:
+                for i, score in zip(missing, batch_scores):
+                    scores[i] = float(score)
+                    self._cache[(question_key, ids[i])] = float(score)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
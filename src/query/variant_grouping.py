@@ -0,0 +1,64 @@
+import re
+from typing import Dict, List
+
+# Variant rows are written as "<product id>_V<n>" by the crawler
+_VARIANT_ID_RE = re.compile(r"_V\d+$")
+# "Vali ABC (24 inch)" -> "Vali ABC"
+_VARIANT_NAME_RE = re.compile(r"\s*\([^)]*\)\s*$")
+
+def parent_product_id(product_id: str) -> str:
+    return _VARIANT_ID_RE.sub("", product_id or "")
+
+def base_product_name(name: str) -> str:
+    return _VARIANT_NAME_RE.sub("", name or "").strip()
+
+def group_by_parent(search_results: Dict) -> List[Dict]:
+    """Group Chroma hits by parent product, best-ranked variant first
+
+    Returns one entry per parent: the best hit's id/document/metadata/distance
+    plus a ``variants`` list of every hit of that product in rank order.
+    """
+    documents = search_results["documents"][0]
+    metadatas = (search_results.get("metadatas") or [[{}] * len(documents)])[0]
+    distances = (search_results.get("distances") or [[0.5] * len(documents)])[0]
+    ids = (search_results.get("ids") or [[""] * len(documents)])[0]
+
+    groups = {}
+    for doc, metadata, distance, doc_id in zip(documents, metadatas, distances, ids):
+        metadata = metadata or {}
+        key = parent_product_id(doc_id) or base_product_name(metadata.get("name", "")).lower()
+        variant = {"id": doc_id, "document": doc, "metadata": metadata, "distance": distance}
+        if key not in groups:
+            groups[key] = {**variant, "parent_id": key, "variants": []}
+        groups[key]["variants"].append(variant)
+
+    return sorted(groups.values(), key=lambda group: group["distance"])
+
+def collapse_variants(search_results: Dict, k: int) -> Dict:
+    """Keep the k best distinct products, in Chroma result format
+
+    Each kept metadata gets a ``variants`` list (id, size, document, distance)
+    so the prompt can show all sizes of a product in one entry.
+    """
+    groups = group_by_parent(search_results)[:k]
+
+    return {
+        "ids": [[group["id"] for group in groups]],
+        "documents": [[group["document"] for group in groups]],
+        "metadatas": [[
+            {**group["metadata"], "parent_id": group["parent_id"], "variants": [
+                {
+                    "id": variant["id"],
+                    "size": variant["metadata"].get("size", ""),
+                    "document": variant["document"],
+                    "distance": variant["distance"]
+                }
+                for variant in group["variants"]
+            ]}
+            for group in groups
+        ]],
+        "distances": [[group["distance"] for group in groups]],
+    }
+
+def count_distinct_products(search_results: Dict) -> int:
+    return len(group_by_parent(search_results))
@@ -0,0 +1,109 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from typing import Any, Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg + any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue records with exc_info intact (the stock prepare() folds the traceback into msg)"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def setup_logging(level: str = None, json_lines: bool = None, stream=None) -> logging.handlers.QueueListener:
+    """Route the `vcute` logger tree through a queue drained by a background thread
+
+    Callers only pay for putting the record on an in-memory queue; formatting
+    and writing to stdout happen on the listener thread. Safe to call more
+    than once (later calls only adjust the level).
+    """
+    global _listener
+    from config.settings import Config
+
+    level = (level or Config.LOG_LEVEL).upper()
+    json_lines = Config.LOG_JSON if json_lines is None else json_lines
+
+    root = logging.getLogger("vcute")
+    root.setLevel(level)
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if json_lines else
+                        logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    root.addHandler(_QueueHandler(log_queue))
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(before=_stop_listener, after_in_parent=_restart_listener,
+                            after_in_child=_restart_listener)
+    return _listener
+
+def _stop_listener() -> None:
+    """Drain and join the listener before fork(), so no thread holds the queue or stream locks"""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+def _restart_listener() -> None:
+    """After fork(): the parent resumes its listener, a pre-forked worker gets its own"""
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the `vcute` tree, configuring logging on first use"""
+    if _listener is None:
+        setup_logging()
+    return logging.getLogger(f"vcute.{name}")
+
+def log_payload(logger: logging.Logger, msg: str, payload: Any, sample_rate: float = None, max_chars: int = 2000) -> None:
+    """Log a verbose payload at DEBUG for a sampled fraction of calls only"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+
+    if sample_rate is None:
+        from config.settings import Config
+        sample_rate = Config.LOG_PAYLOAD_SAMPLE_RATE
+    if random.random() >= sample_rate:
+        return
+
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    if len(text) > max_chars:
+        text = text[:max_chars] + f"...(+{len(text) - max_chars} chars)"
+    logger.debug(msg, extra={"payload": text, "sample_rate": sample_rate})
@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional
+
+from src.utils.logger import get_logger
+
+# Stage durations of the request currently being handled (per thread / task)
+_current_trace: ContextVar[Optional[Dict]] = ContextVar("current_trace", default=None)
+
+class LatencyHistogram:
+    """Rolling latency samples for one stage (bounded, quantiles on demand)"""
+
+    def __init__(self, max_samples: int = 2048):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+        return ordered[index]
+
+class Metrics:
+    """In-process latency histograms and counters for the serving path"""
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, prefix: str = "vcute"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._counters: Dict[tuple, float] = {}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record one duration for a stage (and the current request trace)"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.observe(seconds)
+
+        trace = _current_trace.get()
+        if trace is not None:
+            trace["stages"][stage] = trace["stages"].get(stage, 0.0) + seconds
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increment a counter, optionally labelled"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time a block of code as one stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage: str):
+        """Decorator form of span()"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def request(self, kind: str, **fields):
+        """Collect stage timings for one bot request and emit a single structured line"""
+        trace = {"stages": {}, "fields": fields, "ok": True}
+        token = _current_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        except Exception:
+            trace["ok"] = False
+            raise
+        finally:
+            total = time.perf_counter() - start
+            _current_trace.reset(token)
+            self.observe(f"request.{kind}", total)
+            self.log_request(kind, total, trace)
+
+    def log_request(self, kind: str, total: float, trace: Dict) -> None:
+        record = {
+            "event": "request",
+            "kind": kind,
+            **trace["fields"],
+            "ok": trace["ok"],
+            "total_ms": round(total * 1000, 1),
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in trace["stages"].items()}
+        }
+        get_logger("metrics").info("request", extra=record)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Per-stage count/sum/p50/p95/p99 (seconds)"""
+        with self._lock:
+            return {
+                stage: {
+                    "count": histogram.count,
+                    "sum": histogram.total,
+                    **{f"p{int(q * 100)}": histogram.quantile(q) for q in self.QUANTILES}
+                }
+                for stage, histogram in self._histograms.items()
+            }
+
+    def render_prometheus(self) -> str:
+        """Render histograms (as summaries) and counters in Prometheus text format"""
+        name = f"{self.prefix}_stage_latency_seconds"
+        lines = [
+            f"# HELP {name} Latency of bot pipeline stages.",
+            f"# TYPE {name} summary"
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                for q in self.QUANTILES:
+                    lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {histogram.quantile(q):.6f}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+            counter_names = sorted({counter_name for counter_name, _ in self._counters})
+            for counter_name in counter_names:
+                full_name = f"{self.prefix}_{counter_name}_total"
+                lines.append(f"# TYPE {full_name} counter")
+                for (key_name, labels), value in sorted(self._counters.items()):
+                    if key_name != counter_name:
+                        continue
+                    label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                    lines.append(f"{full_name}{{{label_text}}} {value:g}" if label_text else f"{full_name} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry used by the bot, RAG engine and server
+metrics = Metrics()
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from collections import deque
+from contextlib import nullcontext
+from typing import Callable, ContextManager
+
+class SlotLimiter:
+    """Counting semaphore shared by threads and event loops
+
+    The sync pipeline (worker threads) and the ASGI bot (coroutines) draw
+    from the same slots, so together they never run more than ``slots``
+    calls. Waiters are served first come, first served; ``waiting`` (e.g.
+    LoadShedder.waiting) wraps every wait that actually blocks.
+    """
+
+    def __init__(self, slots: int, waiting: Callable[[], ContextManager] = None):
+        self.slots = slots
+        self._waiting = waiting or nullcontext
+        self._lock = threading.Lock()
+        self._free = slots
+        self._waiters = deque()  # threading.Event (threads) or asyncio.Future (coroutines)
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        with self._waiting():
+            event.wait()  # release() hands its slot straight to us
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return
+            future = loop.create_future()
+            self._waiters.append(future)
+        try:
+            with self._waiting():
+                await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if future in self._waiters:
+                    self._waiters.remove(future)
+                    raise
+            # Handed a slot just as we were cancelled: pass it on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self._free += 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter)
+
+    def _hand_over(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()  # its caller gave up after being picked
+        else:
+            future.set_result(None)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def in_use(self) -> int:
+        with self._lock:
+            return self.slots - self._free
@@ -0,0 +1,14 @@
+import re
+import unicodedata
+
+_SPACE_RE = re.compile(r"\s+")
+
+def strip_accents(text: str) -> str:
+    """'Cảm ơn đã hỗ trợ' -> 'Cam on da ho tro' (đ/Đ have no combining form)"""
+    decomposed = unicodedata.normalize("NFD", text or "")
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return stripped.replace("đ", "d").replace("Đ", "D")
+
+def fold_text(text: str) -> str:
+    """Lowercase, accent-free, single-spaced form for keyword matching"""
+    return _SPACE_RE.sub(" ", strip_accents(text).lower()).strip()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Flask (server/app.py) vs. ASGI (server/asgi_app.py) webhook server
+under many concurrent conversations.
+
+Each server runs in turn on the webhook port with the same stand-ins for the
+two slow network dependencies:
+
+- an Ollama stub that answers /api/chat and /api/generate after --llm-delay
+  seconds with unlimited parallelism (OLLAMA_NUM_PARALLEL is raised to match),
+  so the server, not the model, is what saturates;
+- a Graph API sink that answers after --graph-latency seconds and records when
+  each sender's reply arrives.
+
+Virtual users run closed-loop: post a Messenger text event, wait for the
+reply to reach the sink, repeat. Latency is end to end (event posted -> reply
+delivered), since the ASGI server acknowledges the webhook before answering.
+Every question is unique so no answer is shared between senders.
+
+    python testing/benchmark_asgi_vs_flask.py [--users 16 64 256] [--seconds 20] [--llm-delay 2]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(parent_dir))
+
+from facebook_bot.config.facebook_config import FacebookConfig
+from testing.load_test_prefork import QUESTIONS, event, wait_ready
+
+SERVERS = {
+    "flask": "server/app.py",
+    "asgi": "server/asgi_app.py",
+}
+
+class Replies:
+    """Reply arrivals per recipient, filled by the Graph sink"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._counts = {}
+
+    def add(self, recipient_id: str):
+        with self._cond:
+            self._counts[recipient_id] = self._counts.get(recipient_id, 0) + 1
+            self._cond.notify_all()
+
+    def wait(self, recipient_id: str, count: int, timeout: float) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._counts.get(recipient_id, 0) >= count, timeout)
+
+def start_stub(handler_class, **attrs) -> ThreadingHTTPServer:
+    handler = type(handler_class.__name__, (handler_class,), attrs)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+
+    def reply(self, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self) -> dict:
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            return json.loads(raw or b"{}")
+        except ValueError:
+            return {}
+
+    def log_message(self, *args):
+        pass
+
+class GraphSink(_JSONHandler):
+    """Send API stand-in: counts delivered messages (not typing indicators) per recipient"""
+    latency = 0.0
+    replies: Replies = None
+
+    def do_POST(self):
+        payload = self.read_json()
+        time.sleep(self.latency)
+        if "message" in payload:
+            self.replies.add(payload.get("recipient", {}).get("id"))
+        self.reply({"recipient_id": "0", "message_id": "m_benchmark"})
+
+class OllamaStub(_JSONHandler):
+    """Ollama stand-in: fixed generation time, any number of parallel requests"""
+    delay = 0.0
+    calls = None  # [count], shared across handler threads
+
+    def do_GET(self):
+        self.reply({"version": "0.0.0", "models": []})
+
+    def do_POST(self):
+        self.read_json()
+        if self.path in ("/api/chat", "/api/generate"):
+            self.calls[0] += 1
+            time.sleep(self.delay)
+        answer = "Vali 20 inch khung nhôm, khóa TSA, giá 1.290.000đ."
+        self.reply({
+            "model": "stub", "done": True,
+            "message": {"role": "assistant", "content": answer},
+            "response": answer, "context": [1, 2, 3],
+        })
+
+def run_users(port: int, replies: Replies, users: int, seconds: float, tag: str):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def user(index: int):
+        sender_id = f"{tag}-{index}"
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        sent = 0
+        while time.perf_counter() < stop_at:
+            text = f"{QUESTIONS[(index + sent) % len(QUESTIONS)]} (khách {index}, câu {sent})"
+            start = time.perf_counter()
+            try:
+                conn.request("POST", FacebookConfig.WEBHOOK_PATH, event(sender_id, text),
+                             {"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+            sent += 1
+            ok = ok and replies.wait(sender_id, sent, timeout=120)
+            with lock:
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors[0] += 1
+            if not ok:
+                return  # counts are out of step now; stop this user
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0], time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=["flask", "asgi"])
+    parser.add_argument("--users", type=int, nargs="+", default=[16, 64, 256], help="Concurrent conversations")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--llm-delay", type=float, default=2.0, help="Seconds per stub LLM call")
+    parser.add_argument("--graph-latency", type=float, default=0.05, help="Seconds per Graph API call")
+    args = parser.parse_args()
+
+    replies = Replies()
+    calls = [0]
+    sink = start_stub(GraphSink, latency=args.graph_latency, replies=replies)
+    ollama = start_stub(OllamaStub, delay=args.llm_delay, calls=calls)
+
+    env = dict(os.environ)
+    env.update({
+        "FACEBOOK_GRAPH_API_URL": f"http://127.0.0.1:{sink.server_address[1]}",
+        "OLLAMA_HOST": f"http://127.0.0.1:{ollama.server_address[1]}",
+        "OLLAMA_NUM_PARALLEL": str(max(args.users) * 2),
+        "BOT_MESSAGE_MODE": "truncate",  # one message per reply
+        "VCUTE_LOG_LEVEL": "WARNING",
+    })
+    env.setdefault("FACEBOOK_PAGE_ACCESS_TOKEN", "benchmark")
+
+    port = FacebookConfig.WEBHOOK_PORT
+    print(f"⚡ Flask vs. ASGI: LLM {args.llm_delay:.1f}s, Graph API {args.graph_latency * 1000:.0f} ms, "
+          f"{args.seconds:.0f}s per run")
+    print("=" * 60)
+    for name in args.servers:
+        server = subprocess.Popen([sys.executable, SERVERS[name]], cwd=parent_dir, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_ready(port, timeout=300):
+                print(f"❌ {name}: server not healthy")
+                continue
+            run_users(port, replies, 4, 3, f"{name}-warmup")
+            for users in args.users:
+                calls[0] = 0
+                latencies, errors, elapsed = run_users(port, replies, users, args.seconds, f"{name}-{users}")
+                if not latencies:
+                    print(f"❌ {name:5s} users={users:4d}: no replies ({errors} errors)")
+                    continue
+                latencies.sort()
+                print(f"{name:5s} users={users:4d}  {len(latencies) / elapsed:7.1f} replies/s  "
+                      f"p50 {statistics.median(latencies):6.2f}s  "
+                      f"p95 {latencies[int(0.95 * (len(latencies) - 1))]:6.2f}s  "
+                      f"LLM calls {calls[0]}  errors {errors}")
+        finally:
+            server.terminate()
+            server.wait()
+
+    sink.shutdown()
+    ollama.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark ResponseFormatter throughput: compiled single-pass tone/emoji
+conversion vs. the previous per-entry re.sub loop.
+
+Corpus: built-in sample Llama3 answers, or pass a file with one answer per
+line, or a JSON log file (bot logs "RAG response" payloads at DEBUG):
+    python testing/benchmark_formatter.py [answers.txt | bot.log]
+"""
+
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(parent_dir))
+
+from facebook_bot.core.response_formatter import ResponseFormatter, TONE_MAPPINGS, EMOJI_MAP
+
+SAMPLE_ANSWERS = [
+    "Chào bạn! Dựa trên nhu cầu đi công tác 2-3 ngày của bạn, tôi khuyên bạn nên chọn Vali nhựa HUNG PHAT 2103 (20 inch). "
+    "Sản phẩm có chất liệu ABS+PC rất bền, khóa TSA an toàn khi bay quốc tế và bánh xe spinner 360 độ di chuyển nhẹ nhàng. "
+    "Nếu bạn cần thêm không gian, bản 24 inch cũng là lựa chọn tốt. Bạn có muốn tôi so sánh thêm không ạ?",
+    "Dạ, mình gợi ý cho bạn 2 mẫu balo laptop chất lượng:\n"
+    "1. Balo Laptop MARCELLO M602: ngăn laptop 15.6 inch, chống sốc, có cổng USB sạc tiện lợi.\n"
+    "2. Balo Laptop StartUp SU05: nhẹ, vải chống nước, phù hợp đi học và đi làm.\n"
+    "Cả hai đều có giá hợp lý và được khách hàng đánh giá tốt nhé.",
+    "Xin chào! Vali vải UZO 88 (28 inch) phù hợp cho chuyến đi dài ngày. Vali có thể mở rộng thể tích, khóa số chắc chắn, "
+    "bánh xe êm. Tuy nhiên nếu bạn cần vali không có nhiều ngăn phụ thì Vali nhựa PC sẽ gọn hơn. Cảm ơn bạn đã quan tâm ạ!",
+    "Túi xách da thật của Hùng Phát có nhiều mẫu công sở thanh lịch, giá từ 200k đến 2 triệu. "
+    "Mình nghĩ bạn sẽ thích mẫu túi xách nữ dáng hộp, vừa laptop 13 inch, chất lượng da bền đẹp. "
+    "Bạn có thể cho mình biết ngân sách để tư vấn chính xác hơn được không?",
+    "Dạ được ạ. Vali size cabin (18-20 inch) được mang lên máy bay. Tôi khuyên Vali HUNG PHAT 2103 vì trọng lượng nhẹ, "
+    "bền và có khóa TSA. Anh chị có thể chọn màu hồng hoặc xanh rồi nhé.",
+]
+
+def legacy_convert_tone(text, tone="friendly"):
+    """The previous implementation: one re.sub (and pattern build) per mapping entry"""
+    mapping = TONE_MAPPINGS.get(tone, TONE_MAPPINGS["friendly"])
+    for formal, casual in mapping.items():
+        text = re.sub(r'\b' + re.escape(formal) + r'\b', casual, text)
+    return text
+
+def legacy_add_emojis(text):
+    for keyword, emoji in EMOJI_MAP.items():
+        if keyword.lower() in text.lower():
+            text = text.replace(keyword, f"{keyword} {emoji}", 1)
+    return text
+
+def load_corpus(path):
+    answers = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("msg") == "RAG response" and record.get("payload"):
+                answers.append(record["payload"])
+        else:
+            answers.append(line)
+    return answers
+
+def bench(name, func, corpus, min_seconds=1.0):
+    calls = 0
+    chars = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        for text in corpus:
+            func(text)
+            chars += len(text)
+        calls += len(corpus)
+    elapsed = time.perf_counter() - start
+    print(f"{name:28s} {calls / elapsed:10.0f} answers/s  {chars / elapsed / 1e6:6.2f} MB/s  "
+          f"{elapsed / calls * 1e6:8.1f} µs/answer")
+    return calls / elapsed
+
+def main():
+    corpus = load_corpus(sys.argv[1]) if len(sys.argv) > 1 else SAMPLE_ANSWERS
+    if not corpus:
+        print("❌ No answers found in corpus")
+        return
+
+    formatter = ResponseFormatter()
+    print(f"=== Formatter benchmark: {len(corpus)} answers, avg {sum(map(len, corpus)) // len(corpus)} chars ===\n")
+
+    for tone in ("friendly", "playful", "casual"):
+        old = bench(f"tone[{tone}] legacy", lambda t: legacy_convert_tone(t, tone), corpus)
+        new = bench(f"tone[{tone}] compiled", lambda t: formatter._convert_tone(t, tone), corpus)
+        print(f"{'':28s} speedup x{new / old:.1f}\n")
+
+    old = bench("emojis legacy", legacy_add_emojis, corpus)
+    new = bench("emojis compiled", formatter._add_emojis, corpus)
+    print(f"{'':28s} speedup x{new / old:.1f}\n")
+
+    random.seed(0)
+    bench("format_for_facebook", lambda t: formatter.format_for_facebook(t, tone="friendly"), corpus)
+
+    # Longest-match-first changes multi-word entries the old loop never reached
+    changed = sum(
+        legacy_convert_tone(text, tone) != formatter._convert_tone(text, tone)
+        for text in corpus for tone in TONE_MAPPINGS
+    )
+    print(f"\nTone outputs differing from legacy: {changed}/{len(corpus) * len(TONE_MAPPINGS)} "
+          f"(e.g. 'không có' -> 'hơm có' now applied)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Import-time regression check for the serving path.
+
+Runs `python -X importtime` on the modules the webhook server imports at
+startup, prints the slowest imports and fails (exit 1) if:
+  - any entry module takes longer than its budget to import, or
+  - a heavy dependency (torch, sentence_transformers, chromadb, llama_index)
+    is imported eagerly - those must only load when a model is needed.
+
+With --serve it also starts server/app.py and checks that /health answers
+within HEALTH_BUDGET seconds of process start (models keep loading after).
+
+    python testing/benchmark_import_time.py [--runs 3] [--top 15] [--serve]
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+parent_dir = Path(__file__).resolve().parent.parent
+
+# Entry module -> cumulative import budget in seconds (best of --runs)
+BUDGETS = {
+    "server.app": 1.0,
+    "facebook_bot.core.bot_handler": 1.0,
+    "src.query.rag_engine": 0.8,
+}
+
+# Must not be imported until a model / the vector store is actually loaded
+HEAVY_MODULES = ("torch", "sentence_transformers", "chromadb", "llama_index", "transformers")
+
+HEALTH_BUDGET = 1.0
+HEALTH_URL = "http://localhost:5000/health"
+
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def import_times(module: str):
+    """(total seconds, {module: cumulative seconds}) from one fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=parent_dir, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        tail = result.stderr.strip().splitlines()[-1:] or ["?"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2)) / 1e6
+    return cumulative.get(module, 0.0), cumulative
+
+def time_to_health(timeout: float = 30.0) -> float:
+    """Seconds from starting server/app.py until /health answers"""
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "server/app.py"], cwd=parent_dir,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(HEALTH_URL, timeout=0.5) as response:
+                    elapsed = time.perf_counter() - start
+                    print(f"   /health: {json.loads(response.read())}")
+                    return elapsed
+            except OSError:
+                time.sleep(0.02)
+        raise RuntimeError(f"/health did not answer within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3, help="Take the best of N fresh interpreters")
+    parser.add_argument("--top", type=int, default=15, help="Show the N slowest imports")
+    parser.add_argument("--serve", action="store_true", help="Also time server start until /health answers")
+    args = parser.parse_args()
+
+    failures, measured = [], 0
+    for module, budget in BUDGETS.items():
+        try:
+            runs = [import_times(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"⚠️  {e} (missing dependency?) - skipped")
+            continue
+        total, cumulative = min(runs, key=lambda run: run[0])
+        measured += 1
+
+        print(f"\n📦 {module}: {total * 1000:.0f} ms (budget {budget * 1000:.0f} ms)")
+        top_level = {name: t for name, t in cumulative.items() if "." not in name and name != module}
+        for name, seconds in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"   {seconds * 1000:8.1f} ms  {name}")
+
+        if total > budget:
+            failures.append(f"{module} imports in {total:.2f}s > {budget:.2f}s")
+        eager = sorted(name for name in cumulative if name.split(".")[0] in HEAVY_MODULES and "." not in name)
+        if eager:
+            failures.append(f"{module} eagerly imports {', '.join(eager)}")
+
+    if args.serve:
+        print("\n🚀 Starting server/app.py")
+        try:
+            elapsed = time_to_health()
+            measured += 1
+            print(f"   /health answered after {elapsed * 1000:.0f} ms (budget {HEALTH_BUDGET * 1000:.0f} ms)")
+            if elapsed > HEALTH_BUDGET:
+                failures.append(f"/health took {elapsed:.2f}s > {HEALTH_BUDGET:.2f}s after start")
+        except RuntimeError as e:
+            failures.append(str(e))
+
+    print()
+    if not measured:
+        print("❌ Nothing measured - install the serving dependencies first")
+        return 1
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ Import times within budget, no heavy modules imported eagerly")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Resident memory of the embedding model consumers: one independent copy per
+consumer (the previous behaviour) vs. the shared model registry.
+
+Each mode runs in a fresh interpreter. The consumers are the ones that used
+to load their own weights: RAGEngine's SentenceTransformerClient,
+EmbeddingGenerator's client and LlamaIndexBuilder's embedding model
+(LlamaIndex adapter only when llama_index is installed).
+
+    python testing/benchmark_model_memory.py
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(parent_dir))
+
+def measure(mode: str) -> dict:
+    from config.settings import Config
+    from src.embedding.model_registry import model_registry, rss_mb
+
+    rss_before = rss_mb()
+    consumers = []
+    if mode == "separate":
+        from sentence_transformers import SentenceTransformer
+        consumers = [SentenceTransformer(Config.EMBEDDING_MODEL, device="cpu") for _ in range(3)]
+    else:
+        from src.embedding.sentence_transformer_client import SentenceTransformerClient
+        for _ in range(2):
+            client = SentenceTransformerClient(Config.EMBEDDING_MODEL, device="cpu")
+            client.load_model()
+            consumers.append(client)
+        try:
+            from src.embedding.llamaindex_embedding import SharedSentenceTransformerEmbedding
+            embedding = SharedSentenceTransformerEmbedding(client=SentenceTransformerClient(Config.EMBEDDING_MODEL, device="cpu"))
+            embedding.get_query_embedding("vali 20 inch")
+            consumers.append(embedding)
+        except ImportError:
+            client = SentenceTransformerClient(Config.EMBEDDING_MODEL, device="cpu")
+            client.encode("vali 20 inch", show_progress=False)
+            consumers.append(client)
+
+    return {
+        "mode": mode,
+        "consumers": len(consumers),
+        "models_loaded": len(consumers) if mode == "separate" else len(model_registry.loaded()),
+        "rss_before_mb": round(rss_before, 1),
+        "rss_after_mb": round(rss_mb(), 1),
+    }
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        print(json.dumps(measure(sys.argv[2])))
+        return
+
+    print("🧠 Embedding model memory: separate copies vs. shared registry")
+    print("=" * 60)
+    for mode in ("separate", "registry"):
+        result = subprocess.run([sys.executable, __file__, "--mode", mode],
+                                cwd=parent_dir, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"❌ {mode}: {result.stderr.strip().splitlines()[-1:]}")
+            continue
+        row = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{mode:9s} consumers={row['consumers']} models={row['models_loaded']} "
+              f"RSS {row['rss_before_mb']:.0f} -> {row['rss_after_mb']:.0f} MB "
+              f"(+{row['rss_after_mb'] - row['rss_before_mb']:.0f} MB)")
+
+if __name__ == "__main__":
+    main()
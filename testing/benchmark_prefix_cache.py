@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark prompt prefill with a static system-prompt prefix vs. the legacy assembly.
+
+Starts a stub Ollama server that simulates llama.cpp prompt caching (one slot,
+longest common prefix with the previous prompt is free, the rest costs
+PREFILL_SECONDS_PER_TOKEN), then sends the same questions through Llama3Client
+using:
+  1. legacy:  system = full rendered template (instructions + products + question), user = question
+  2. chat:    system = static instructions only, user = products + question
+  3. context: static prefix evaluated once, later calls continue from its context tokens
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(parent_dir))
+
+from src.query.llama3_client import Llama3Client, LLAMA3_SYSTEM_TURN, LLAMA3_USER_TURN
+from src.query.prompt_templates import PromptTemplateRegistry
+from src.query.context_packer import ContextPacker
+
+PREFILL_SECONDS_PER_TOKEN = 0.002   # ~500 tok/s prefill, a CPU box running llama3:8b
+CHARS_PER_TOKEN = 4
+
+SAMPLE_PRODUCTS = [
+    ("HP2103_V1", "Vali nhựa HUNG PHAT 2103 (20 inch)", "20 inch", "ABS+PC", "Khóa TSA|Bánh xe spinner 360|Tay kéo nhôm"),
+    ("HP2103_V2", "Vali nhựa HUNG PHAT 2103 (24 inch)", "24 inch", "ABS+PC", "Khóa TSA|Bánh xe spinner 360|Tay kéo nhôm"),
+    ("M602", "Balo Laptop MARCELLO M602", "", "Polyester", "Ngăn laptop 15.6 inch|Chống sốc|Cổng USB"),
+    ("UZO88_V1", "Vali vải UZO 88 (28 inch)", "28 inch", "Vải Nylon", "Mở rộng thể tích|Khóa số"),
+    ("TK15", "Túi du lịch TravelKing TK15", "", "Vải dù", "Chống nước|Quai đeo vai"),
+]
+
+QUESTIONS = [
+    "Vali 20 inch có khóa TSA",
+    "Balo laptop chống sốc",
+    "Vali nào cho chuyến đi 1 tuần?",
+    "Túi du lịch chống nước",
+    "So sánh vali nhựa ABS và PC",
+    "Vali 24 inch nhẹ nhất",
+]
+
+class StubOllama(BaseHTTPRequestHandler):
+    """Minimal /api/chat + /api/generate with single-slot prefix caching"""
+
+    cached_tokens = []
+    lock = threading.Lock()
+    stats = {"prompt_tokens": 0, "prefill_tokens": 0, "prefill_seconds": 0.0, "calls": 0}
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply({"version": "stub"})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        if self.path == "/api/chat":
+            prompt = "<|begin_of_text|>" + "".join(
+                (LLAMA3_SYSTEM_TURN.format(system=m["content"]) if m["role"] == "system"
+                 else LLAMA3_USER_TURN.format(prompt=m["content"]))
+                for m in request["messages"]
+            )
+        else:
+            prompt = "".join(map(chr, request.get("context") or [])) + request.get("prompt", "")
+
+        prefill_seconds = self._prefill(prompt)
+        answer = "Dạ, cậu tham khảo vali HUNG PHAT 2103 nha~"
+        generated = 1 if (request.get("options") or {}).get("num_predict") == 1 else len(answer) // CHARS_PER_TOKEN
+        body = {
+            "model": request["model"],
+            "done": True,
+            "load_duration": 0,
+            "prompt_eval_duration": int(prefill_seconds * 1e9),
+            "eval_count": generated,
+        }
+        if self.path == "/api/chat":
+            body["message"] = {"role": "assistant", "content": answer}
+        else:
+            body["response"] = answer
+            body["context"] = [ord(c) for c in prompt] + [0] * generated
+        self._reply(body)
+
+    def _prefill(self, prompt):
+        """Charge only for the part of the prompt not shared with the cached slot"""
+        with self.lock:
+            common = 0
+            for a, b in zip(self.cached_tokens, prompt):
+                if a != b:
+                    break
+                common += 1
+            uncached_tokens = (len(prompt) - common) / CHARS_PER_TOKEN
+            StubOllama.cached_tokens = prompt
+            self.stats["calls"] += 1
+            self.stats["prompt_tokens"] += len(prompt) / CHARS_PER_TOKEN
+            self.stats["prefill_tokens"] += uncached_tokens
+            self.stats["prefill_seconds"] += uncached_tokens * PREFILL_SECONDS_PER_TOKEN
+        time.sleep(uncached_tokens * PREFILL_SECONDS_PER_TOKEN)
+        return uncached_tokens * PREFILL_SECONDS_PER_TOKEN
+
+def search_results_for(question):
+    """Fake retrieval result: rotate products so every question sees different context"""
+    offset = hash(question) % len(SAMPLE_PRODUCTS)
+    hits = (SAMPLE_PRODUCTS[offset:] + SAMPLE_PRODUCTS[:offset])[:3]
+    return {
+        "ids": [[h[0] for h in hits]],
+        "documents": [[
+            f"Tên sản phẩm: {name}\nThông số kỹ thuật:\n- Chất liệu: {material}\n- Kích thước: {size}\nTính năng: {features.replace('|', ', ')}"
+            for _, name, size, material, features in hits
+        ]],
+        "metadatas": [[{"name": h[1], "size": h[2]} for h in hits]],
+        "distances": [[0.2, 0.3, 0.4]],
+    }
+
+def run_scenario(name, client, system_prompt, templates, packer):
+    StubOllama.cached_tokens = []
+    StubOllama.stats.update({"prompt_tokens": 0, "prefill_tokens": 0, "prefill_seconds": 0.0, "calls": 0})
+    client._prefix_contexts.clear()
+
+    start = time.perf_counter()
+    for question in QUESTIONS:
+        products = packer.pack(search_results_for(question), question)
+        if name == "legacy":
+            context = templates.render(system_prompt=system_prompt, retrieved_products=products, user_question=question)
+            client.generate(prompt=question, system_prompt=context, max_tokens=300)
+        else:
+            client.prefix_mode = name
+            suffix = templates.render(system_prompt="", retrieved_products=products, user_question=question).strip()
+            client.generate_with_prefix(system_prompt, suffix, max_tokens=300)
+    elapsed = time.perf_counter() - start
+
+    stats = dict(StubOllama.stats)
+    print(f"{name:8s} calls={stats['calls']:2d}  prompt={stats['prompt_tokens']:7.0f} tok  "
+          f"prefilled={stats['prefill_tokens']:7.0f} tok  "
+          f"prefill/request={stats['prefill_seconds'] / len(QUESTIONS) * 1000:7.1f} ms  wall={elapsed:.2f}s")
+    return stats
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+
+    system_prompt = (parent_dir / "config" / "prompts" / "system_prompt.txt").read_text(encoding="utf-8").strip()
+    templates = PromptTemplateRegistry()
+    packer = ContextPacker()
+    client = Llama3Client(host=host)
+
+    print("=== Prefix cache benchmark (stub Ollama) ===")
+    print(f"{len(QUESTIONS)} questions, system prompt ~{len(system_prompt) // CHARS_PER_TOKEN} tokens\n")
+
+    results = {name: run_scenario(name, client, system_prompt, templates, packer)
+               for name in ("legacy", "chat", "context")}
+
+    baseline = results["legacy"]["prefill_seconds"] / len(QUESTIONS)
+    for name in ("chat", "context"):
+        saved = baseline - results[name]["prefill_seconds"] / len(QUESTIONS)
+        print(f"\n{name}: {saved * 1000:+.1f} ms prefill saved per request vs legacy")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Load test: webhook throughput of the pre-fork server vs. number of workers.
+
+For each worker count, starts `gunicorn -c server/gunicorn.conf.py`, waits
+until /health reports the models loaded, then POSTs Messenger text events
+from many concurrent senders for a fixed duration.
+
+Outgoing Graph API calls go to a local sink (FACEBOOK_GRAPH_API_URL). By
+default Ollama points at a closed port: every LLM call fails fast with
+LLMError and the answer is the extractive fallback, so the run measures the
+CPU-bound path (embedding, retrieval, formatting) that pre-forking is meant
+to scale. --with-llm keeps the
+configured Ollama host.
+
+    python testing/load_test_prefork.py [--workers 1 2 4] [--concurrency 32] [--seconds 20]
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(parent_dir))
+
+from facebook_bot.config.facebook_config import FacebookConfig
+
+QUESTIONS = [
+    "vali 20 inch màu hồng",
+    "balo laptop 15.6 inch chống nước",
+    "túi xách nữ công sở",
+    "vali nhựa khóa TSA",
+    "balo học sinh cấp 2",
+    "vali size cabin đi máy bay",
+    "túi du lịch cỡ lớn",
+    "vali vải 28 inch",
+]
+
+class GraphSink(BaseHTTPRequestHandler):
+    """Accepts Send API calls like graph.facebook.com would"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"recipient_id": "0", "message_id": "m_load_test"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_sink() -> ThreadingHTTPServer:
+    sink = ThreadingHTTPServer(("127.0.0.1", 0), GraphSink)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    return sink
+
+def wait_ready(port: int, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            health = json.loads(conn.getresponse().read())
+            if health.get("status") == "healthy":
+                return True
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.5)
+    return False
+
+def event(sender_id: str, text: str) -> bytes:
+    return json.dumps({
+        "object": "page",
+        "entry": [{"messaging": [{"sender": {"id": sender_id}, "message": {"mid": "m", "text": text}}]}],
+    }).encode("utf-8")
+
+def run_load(port: int, concurrency: int, seconds: float):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def client(index: int):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        i = 0
+        while time.perf_counter() < stop_at:
+            body = event(f"load-{index}", QUESTIONS[(index + i) % len(QUESTIONS)])
+            start = time.perf_counter()
+            try:
+                conn.request("POST", FacebookConfig.WEBHOOK_PATH, body, {"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            with lock:
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors[0] += 1
+            i += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0], time.perf_counter() - start
+
+def main():
+    cores = multiprocessing.cpu_count()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, max(1, cores // 2), cores}))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--with-llm", action="store_true", help="Use the configured Ollama instead of a closed port")
+    args = parser.parse_args()
+
+    sink = start_sink()
+    env = dict(os.environ)
+    env["FACEBOOK_GRAPH_API_URL"] = f"http://127.0.0.1:{sink.server_address[1]}"
+    env.setdefault("FACEBOOK_PAGE_ACCESS_TOKEN", "load-test")
+    env["VCUTE_LOG_LEVEL"] = "WARNING"
+    if not args.with_llm:
+        env["OLLAMA_HOST"] = "http://127.0.0.1:9"
+
+    print(f"🔥 Pre-fork load test: {args.concurrency} concurrent senders, {args.seconds:.0f}s per run, {cores} cores")
+    print("=" * 60)
+    rows = []
+    for workers in args.workers:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "server/gunicorn.conf.py"],
+            cwd=parent_dir, env={**env, "VCUTE_WORKERS": str(workers)},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_ready(FacebookConfig.WEBHOOK_PORT, timeout=300):
+                print(f"❌ {workers} workers: server not healthy")
+                continue
+            run_load(FacebookConfig.WEBHOOK_PORT, args.concurrency, 3)  # warm the workers up
+            latencies, errors, elapsed = run_load(FacebookConfig.WEBHOOK_PORT, args.concurrency, args.seconds)
+        finally:
+            server.terminate()
+            server.wait()
+
+        if not latencies:
+            print(f"❌ {workers} workers: no successful requests ({errors} errors)")
+            continue
+        latencies.sort()
+        rps = len(latencies) / elapsed
+        rows.append((workers, rps))
+        print(f"workers={workers:2d}  {rps:7.1f} req/s  p50 {statistics.median(latencies) * 1000:6.0f} ms  "
+              f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:6.0f} ms  errors {errors}  "
+              f"speedup x{rps / rows[0][1]:.2f}")
+
+    sink.shutdown()
+
+if __name__ == "__main__":
+    main()